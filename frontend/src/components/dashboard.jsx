@@ -163,7 +163,7 @@ export default function PodcastPlusDashboard() {
       case 'mediaLibrary':
         return <MediaLibrary onBack={handleBackToDashboard} token={token} />;
       case 'episodeHistory':
-        return <EpisodeHistory onBack={handleBackToDashboard} token={token} />;
+        return <EpisodeHistory onBack={handleBackToDashboard} token={token} podcasts={podcasts} />;
       case 'podcastManager':
         return <PodcastManager onBack={handleBackToDashboard} token={token} podcasts={podcasts} setPodcasts={setPodcasts}/>;
       case 'rssImporter':
@@ -1,6 +1,6 @@
 "use client"
 
-import { useState, useEffect, useCallback } from "react";
+import { useState, useEffect } from "react";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
@@ -21,18 +21,37 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@
 import { Textarea } from "@/components/ui/textarea";
 import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogDescription } from "@/components/ui/dialog";
 import { useToast } from "@/hooks/use-toast";
+import { usePagedList } from "@/hooks/use-paged-list";
 import { Checkbox } from "@/components/ui/checkbox";
 
 
-export default function EpisodeHistory({ onBack, token }) {
-  const [episodes, setEpisodes] = useState([]);
-  const [isLoading, setIsLoading] = useState(true);
-  const [error, setError] = useState(null);
+// Each view is a server-side status filter; "" is every status
+const STATUS_VIEWS = [
+  { value: "", label: "All" },
+  { value: "processed", label: "Processed" },
+  { value: "published", label: "Published" },
+  { value: "processing", label: "Processing" },
+  { value: "error", label: "Errors" },
+];
+
+export default function EpisodeHistory({ onBack, token, podcasts = [] }) {
+  const [statusFilter, setStatusFilter] = useState("");
+  const [podcastFilter, setPodcastFilter] = useState("");
+  const [order, setOrder] = useState("newest");
+  const {
+    items: episodes,
+    isLoading,
+    isLoadingMore,
+    error,
+    hasMore,
+    loadMore,
+    reload: fetchEpisodes,
+    refresh,
+  } = usePagedList('/api/episodes/', token, { status: statusFilter, podcast_id: podcastFilter, order });
   const [playingId, setPlayingId] = useState(null);
   const [shareEpisode, setShareEpisode] = useState(null);
   const [isShareDialogOpen, setIsShareDialogOpen] = useState(false);
   const [copied, setCopied] = useState(false);
-  const [showErrorProcessingView, setShowErrorProcessingView] = useState(false);
   const [selectedEpisodes, setSelectedEpisodes] = useState(new Set());
   const [isPublishDialogOpen, setIsPublishDialogOpen] = useState(false);
   const [episodeToPublish, setEpisodeToPublish] = useState(null);
@@ -46,31 +65,6 @@ export default function EpisodeHistory({ onBack, token }) {
   });
   const { toast } = useToast();
 
-  const fetchEpisodes = useCallback(async (isPolling = false) => {
-    if (!isPolling) setIsLoading(true);
-    try {
-      const response = await fetch('/api/episodes/', {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-      if (!response.ok) throw new Error('Failed to fetch episode history.');
-      let data = await response.json();
-      data.sort((a, b) => {
-        const dateA = new Date(a.publish_at || a.processed_at || a.created_at);
-        const dateB = new Date(b.publish_at || b.processed_at || b.created_at);
-        if (isNaN(dateA.getTime())) return 1;
-        if (isNaN(dateB.getTime())) return -1;
-        return dateB.getTime() - dateA.getTime();
-      });
-      setEpisodes(data);
-      return data;
-    } catch (err) {
-      setError(err.message);
-      return [];
-    } finally {
-      if (!isPolling) setIsLoading(false);
-    }
-  }, [token]);
-
   const fetchSpreakerShows = async () => {
     setIsFetchingShows(true);
     try {
@@ -98,33 +92,20 @@ export default function EpisodeHistory({ onBack, token }) {
     }
   };
 
+  // Episodes still processing change status on their own, so the first page is re-read until none are left
+  const hasProcessingEpisodes = episodes.some(ep => ep.status === "processing");
   useEffect(() => {
-    let intervalId = null;
-    const startPolling = () => {
-      if (!intervalId) {
-        intervalId = setInterval(() => fetchEpisodes(true), 15000);
-      }
-    };
-    const stopPolling = () => {
-      if (intervalId) {
-        clearInterval(intervalId);
-        intervalId = null;
-      }
-    };
-    const initFetchAndPoll = async () => {
-      if (token) {
-        const data = await fetchEpisodes(false);
-        const hasProcessingOrErrorEpisodes = data.some(ep => ep.status === "processing" || ep.status === "error");
-        if (hasProcessingOrErrorEpisodes) {
-          startPolling();
-        } else {
-          stopPolling();
-        }
-      }
-    };
-    initFetchAndPoll();
-    return () => stopPolling();
-  }, [token, fetchEpisodes]);
+    if (!hasProcessingEpisodes) return;
+    const intervalId = setInterval(refresh, 15000);
+    return () => clearInterval(intervalId);
+  }, [hasProcessingEpisodes, refresh]);
+
+  // Selection is for a filter's own page of results
+  useEffect(() => {
+    setSelectedEpisodes(new Set());
+  }, [statusFilter, podcastFilter, order]);
+
+  const canSelect = statusFilter === "processing" || statusFilter === "error";
 
   const getStatusBadge = (status) => {
     switch (status) {
@@ -292,15 +273,6 @@ export default function EpisodeHistory({ onBack, token }) {
     }
   };
 
-  const filteredEpisodes = episodes
-    .filter(episode => {
-      if (showErrorProcessingView) {
-        return episode.status === "processing" || episode.status === "error";
-      } else {
-        return episode.status === "processed" || episode.status === "scheduled";
-      }
-    });
-
   return (
     <div className="p-6 bg-white rounded-xl shadow-md">
       <Button onClick={onBack} variant="ghost" className="mb-6 text-gray-700 hover:bg-gray-100">
@@ -311,20 +283,33 @@ export default function EpisodeHistory({ onBack, token }) {
       <Card className="border-none shadow-none">
         <CardHeader className="border-b pb-4">
           <CardTitle className="text-2xl font-bold text-gray-800">Episode History</CardTitle>
-          <div className="flex space-x-2 mt-4">
-            <Button
-              variant={!showErrorProcessingView ? "default" : "outline"}
-              onClick={() => setShowErrorProcessingView(false)}
-            >
-              Processed & Scheduled
-            </Button>
-            <Button
-              variant={showErrorProcessingView ? "default" : "outline"}
-              onClick={() => setShowErrorProcessingView(true)}
-            >
-              Processing & Errors
-            </Button>
-            {showErrorProcessingView && (
+          <div className="flex flex-wrap items-center gap-2 mt-4">
+            {STATUS_VIEWS.map(view => (
+              <Button
+                key={view.value || "all"}
+                variant={statusFilter === view.value ? "default" : "outline"}
+                onClick={() => setStatusFilter(view.value)}
+              >
+                {view.label}
+              </Button>
+            ))}
+            {podcasts.length > 1 && (
+              <Select value={podcastFilter || "all"} onValueChange={(v) => setPodcastFilter(v === "all" ? "" : v)}>
+                <SelectTrigger className="w-48"><SelectValue /></SelectTrigger>
+                <SelectContent>
+                  <SelectItem value="all">All shows</SelectItem>
+                  {podcasts.map(podcast => <SelectItem key={podcast.id} value={podcast.id}>{podcast.name}</SelectItem>)}
+                </SelectContent>
+              </Select>
+            )}
+            <Select value={order} onValueChange={setOrder}>
+              <SelectTrigger className="w-40"><SelectValue /></SelectTrigger>
+              <SelectContent>
+                <SelectItem value="newest">Newest first</SelectItem>
+                <SelectItem value="oldest">Oldest first</SelectItem>
+              </SelectContent>
+            </Select>
+            {canSelect && (
               <Button
                 variant="destructive"
                 onClick={handleMassDelete}
@@ -348,11 +333,11 @@ export default function EpisodeHistory({ onBack, token }) {
 
           {!isLoading && !error && (
             <div className="space-y-4">
-              {filteredEpisodes.length > 0 ? (
-                filteredEpisodes.map(episode => (
+              {episodes.length > 0 ? (
+                episodes.map(episode => (
                   <Card key={episode.id} className="hover:bg-gray-50 transition-all duration-200">
                     <CardContent className="p-4 flex items-center justify-between">
-                      {showErrorProcessingView && (
+                      {canSelect && (
                         <Checkbox
                           checked={selectedEpisodes.has(episode.id)}
                           onCheckedChange={(isChecked) => handleCheckboxChange(episode.id, isChecked)}
@@ -454,6 +439,14 @@ export default function EpisodeHistory({ onBack, token }) {
                   No episodes found. Import a podcast to see its history here!
                 </p>
               )}
+              {hasMore && (
+                <div className="flex justify-center pt-2">
+                  <Button variant="outline" onClick={loadMore} disabled={isLoadingMore}>
+                    {isLoadingMore ? <Loader2 className="w-4 h-4 mr-2 animate-spin" /> : null}
+                    Load more
+                  </Button>
+                </div>
+              )}
             </div>
           )}
         </CardContent>
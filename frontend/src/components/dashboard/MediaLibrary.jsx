@@ -4,39 +4,22 @@ import { Input } from "@/components/ui/input";
 import { Label } from "@/components/ui/label";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
 import { ArrowLeft, Loader2, Music, Trash2, Upload, Edit, Save, XCircle } from "lucide-react";
-import { useState, useEffect, useMemo } from "react";
+import { useState } from "react";
 import { useToast } from "@/hooks/use-toast";
+import { usePagedList } from "@/hooks/use-paged-list";
+
+// Each category is listed a page at a time with the server's category filter
+const MEDIA_CATEGORIES = ["intro", "outro", "music", "commercial", "sfx", "main_content", "podcast_cover", "episode_cover"];
 
 export default function MediaLibrary({ onBack, token }) {
-  const [mediaFiles, setMediaFiles] = useState([]);
-  const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
   const [uploadFiles, setUploadFiles] = useState([]);
   const [selectedCategory, setSelectedCategory] = useState("music");
   const [isUploading, setIsUploading] = useState(false);
-  
-  const [editingId, setEditingId] = useState(null);
-  const [editingName, setEditingName] = useState("");
+  // Bumped for a category after an upload to it, which remounts its section so it reloads
+  const [uploadCounts, setUploadCounts] = useState({});
   const { toast } = useToast();
 
-  const fetchMedia = async () => {
-    setIsLoading(true);
-    try {
-      const response = await fetch("/api/media/", { headers: { "Authorization": `Bearer ${token}` } });
-      if (!response.ok) throw new Error("Failed to fetch media files.");
-      const data = await response.json();
-      setMediaFiles(data);
-    } catch (err) {
-      setError(err.message);
-    } finally {
-      setIsLoading(false);
-    }
-  };
-
-  useEffect(() => {
-    if (token) fetchMedia();
-  }, [token]);
-
   const handleFileSelect = (e) => {
     const files = Array.from(e.target.files);
     const filesWithNames = files.map(file => ({
@@ -76,7 +59,7 @@ export default function MediaLibrary({ onBack, token }) {
       setUploadFiles([]);
       document.getElementById("media-upload").value = "";
       toast({ title: "Success!", description: "Media uploaded successfully."});
-      fetchMedia();
+      setUploadCounts(prev => ({ ...prev, [selectedCategory]: (prev[selectedCategory] || 0) + 1 }));
     } catch (err) {
       setError(err.message);
     } finally {
@@ -84,6 +67,53 @@ export default function MediaLibrary({ onBack, token }) {
     }
   };
 
+  return (
+    <div className="p-6">
+      <Button onClick={onBack} variant="ghost" className="mb-4"><ArrowLeft className="w-4 h-4 mr-2" />Back to Dashboard</Button>
+      <Card className="mb-6">
+        <CardHeader><CardTitle>Upload New Media</CardTitle></CardHeader>
+        <CardContent className="space-y-4">
+            <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
+                <div className="space-y-2"><Label htmlFor="media-category">Category</Label><Select value={selectedCategory} onValueChange={setSelectedCategory}><SelectTrigger id="media-category"><SelectValue /></SelectTrigger><SelectContent>{["intro", "outro", "music", "commercial", "sfx"].map(cat => <SelectItem key={cat} value={cat}>{cat.charAt(0).toUpperCase() + cat.slice(1)}</SelectItem>)}</SelectContent></Select></div>
+                <div className="space-y-2 md:col-span-2"><Label htmlFor="media-upload">File(s)</Label><Input id="media-upload" type="file" multiple onChange={handleFileSelect} /></div>
+            </div>
+
+            {uploadFiles.length > 0 && (
+                <div className="space-y-2 pt-4 border-t">
+                    <Label>Files to Upload:</Label>
+                    {uploadFiles.map((fileWithName, index) => (
+                        <div key={index} className="flex items-center gap-2">
+                            <Input 
+                                value={fileWithName.friendly_name} 
+                                onChange={(e) => handleUploadNameChange(index, e.target.value)}
+                                className="flex-grow"
+                                placeholder="Enter a friendly name"
+                            />
+                            <p className="text-sm text-gray-500 truncate">{fileWithName.file.name}</p>
+                        </div>
+                    ))}
+                </div>
+            )}
+          <Button onClick={handleUpload} disabled={isUploading || uploadFiles.length === 0} className="w-full mt-4">{isUploading ? <><Loader2 className="mr-2 h-4 w-4 animate-spin" /> Uploading...</> : <><Upload className="w-4 h-4 mr-2" /> Upload {uploadFiles.length} File(s)</>}</Button>
+        </CardContent>
+        {error && <p className="text-sm text-red-500 p-6 pt-0">{error}</p>}
+      </Card>
+      <div className="space-y-6">
+        {MEDIA_CATEGORIES.map(category => (
+          <MediaCategorySection key={`${category}-${uploadCounts[category] || 0}`} category={category} token={token} />
+        ))}
+      </div>
+    </div>
+  );
+};
+
+function MediaCategorySection({ category, token }) {
+  const { items: files, setItems: setFiles, isLoading, isLoadingMore, error, hasMore, loadMore } =
+    usePagedList("/api/media/", token, { category });
+  const [editingId, setEditingId] = useState(null);
+  const [editingName, setEditingName] = useState("");
+  const { toast } = useToast();
+
   const startEditing = (file) => {
     setEditingId(file.id);
     setEditingName(file.friendly_name || file.filename.split('_').slice(1).join('_'));
@@ -104,7 +134,7 @@ export default function MediaLibrary({ onBack, token }) {
         if (!response.ok) throw new Error('Failed to save name.');
         
         toast({ title: "Name saved!" });
-        setMediaFiles(prev => prev.map(f => f.id === fileId ? {...f, friendly_name: editingName} : f));
+        setFiles(prev => prev.map(f => f.id === fileId ? {...f, friendly_name: editingName} : f));
         cancelEditing();
 
       } catch (err) {
@@ -121,86 +151,51 @@ export default function MediaLibrary({ onBack, token }) {
         });
         if (!response.ok) throw new Error("Failed to delete the file.");
         
-        setMediaFiles(prevFiles => prevFiles.filter(file => file.id !== mediaId));
+        setFiles(prevFiles => prevFiles.filter(file => file.id !== mediaId));
         toast({ description: "File deleted." });
     } catch (err) {
-        setError(err.message);
+        toast({ title: "Error", description: err.message, variant: 'destructive'});
     }
   };
 
-  const groupedMedia = useMemo(() => {
-    return mediaFiles.reduce((acc, file) => {
-      (acc[file.category] = acc[file.category] || []).push(file);
-      return acc;
-    }, {});
-  }, [mediaFiles]);
+  if (error) return <p className="text-sm text-red-500">{error}</p>;
+  if (isLoading || files.length === 0) return null;
 
   return (
-    <div className="p-6">
-      <Button onClick={onBack} variant="ghost" className="mb-4"><ArrowLeft className="w-4 h-4 mr-2" />Back to Dashboard</Button>
-      <Card className="mb-6">
-        <CardHeader><CardTitle>Upload New Media</CardTitle></CardHeader>
-        <CardContent className="space-y-4">
-            <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
-                <div className="space-y-2"><Label htmlFor="media-category">Category</Label><Select value={selectedCategory} onValueChange={setSelectedCategory}><SelectTrigger id="media-category"><SelectValue /></SelectTrigger><SelectContent>{["intro", "outro", "music", "commercial", "sfx"].map(cat => <SelectItem key={cat} value={cat}>{cat.charAt(0).toUpperCase() + cat.slice(1)}</SelectItem>)}</SelectContent></Select></div>
-                <div className="space-y-2 md:col-span-2"><Label htmlFor="media-upload">File(s)</Label><Input id="media-upload" type="file" multiple onChange={handleFileSelect} /></div>
-            </div>
-
-            {uploadFiles.length > 0 && (
-                <div className="space-y-2 pt-4 border-t">
-                    <Label>Files to Upload:</Label>
-                    {uploadFiles.map((fileWithName, index) => (
-                        <div key={index} className="flex items-center gap-2">
-                            <Input 
-                                value={fileWithName.friendly_name} 
-                                onChange={(e) => handleUploadNameChange(index, e.target.value)}
-                                className="flex-grow"
-                                placeholder="Enter a friendly name"
-                            />
-                            <p className="text-sm text-gray-500 truncate">{fileWithName.file.name}</p>
-                        </div>
-                    ))}
-                </div>
-            )}
-          <Button onClick={handleUpload} disabled={isUploading || uploadFiles.length === 0} className="w-full mt-4">{isUploading ? <><Loader2 className="mr-2 h-4 w-4 animate-spin" /> Uploading...</> : <><Upload className="w-4 h-4 mr-2" /> Upload {uploadFiles.length} File(s)</>}</Button>
-        </CardContent>
-        {error && <p className="text-sm text-red-500 p-6 pt-0">{error}</p>}
-      </Card>
-      {isLoading && <p>Loading media library...</p>}
-      <div className="space-y-6">
-        {Object.entries(groupedMedia).map(([category, files]) => (
-          <Card key={category}>
-            <CardHeader><CardTitle className="capitalize">{category.replace("_", " ")}</CardTitle></CardHeader>
-            <CardContent>
-              <div className="space-y-2">
-                {files.map(file => (
-                  <div key={file.id} className="flex items-center justify-between p-2 rounded-md hover:bg-gray-50">
-                    <div className="flex items-center gap-3">
-                        <Music className="w-4 h-4 text-gray-500 flex-shrink-0" />
-                        {editingId === file.id ? (
-                            <Input value={editingName} onChange={(e) => setEditingName(e.target.value)} className="h-8"/>
-                        ) : (
-                            <span className="text-sm">{file.friendly_name || file.filename.split('_').slice(1).join('_')}</span>
-                        )}
-                    </div>
-                    <div className="flex items-center gap-1">
-                        {editingId === file.id ? (
-                           <>
-                            <Button onClick={() => handleSaveName(file.id)} variant="ghost" size="icon" className="h-8 w-8 text-green-600 hover:text-green-700"><Save className="w-4 h-4" /></Button>
-                            <Button onClick={cancelEditing} variant="ghost" size="icon" className="h-8 w-8 text-gray-500 hover:text-gray-700"><XCircle className="w-4 h-4" /></Button>
-                           </>
-                        ) : (
-                            <Button onClick={() => startEditing(file)} variant="ghost" size="icon" className="h-8 w-8 text-gray-500 hover:text-gray-700"><Edit className="w-4 h-4" /></Button>
-                        )}
-                        <Button onClick={() => handleDelete(file.id)} variant="ghost" size="icon" className="h-8 w-8 text-red-500 hover:text-red-700"><Trash2 className="w-4 h-4" /></Button>
-                    </div>
-                  </div>
-                ))}
+    <Card>
+      <CardHeader><CardTitle className="capitalize">{category.replace("_", " ")}</CardTitle></CardHeader>
+      <CardContent>
+        <div className="space-y-2">
+          {files.map(file => (
+            <div key={file.id} className="flex items-center justify-between p-2 rounded-md hover:bg-gray-50">
+              <div className="flex items-center gap-3">
+                  <Music className="w-4 h-4 text-gray-500 flex-shrink-0" />
+                  {editingId === file.id ? (
+                      <Input value={editingName} onChange={(e) => setEditingName(e.target.value)} className="h-8"/>
+                  ) : (
+                      <span className="text-sm">{file.friendly_name || file.filename.split('_').slice(1).join('_')}</span>
+                  )}
               </div>
-            </CardContent>
-          </Card>
-        ))}
-      </div>
-    </div>
+              <div className="flex items-center gap-1">
+                  {editingId === file.id ? (
+                     <>
+                      <Button onClick={() => handleSaveName(file.id)} variant="ghost" size="icon" className="h-8 w-8 text-green-600 hover:text-green-700"><Save className="w-4 h-4" /></Button>
+                      <Button onClick={cancelEditing} variant="ghost" size="icon" className="h-8 w-8 text-gray-500 hover:text-gray-700"><XCircle className="w-4 h-4" /></Button>
+                     </>
+                  ) : (
+                      <Button onClick={() => startEditing(file)} variant="ghost" size="icon" className="h-8 w-8 text-gray-500 hover:text-gray-700"><Edit className="w-4 h-4" /></Button>
+                  )}
+                  <Button onClick={() => handleDelete(file.id)} variant="ghost" size="icon" className="h-8 w-8 text-red-500 hover:text-red-700"><Trash2 className="w-4 h-4" /></Button>
+              </div>
+            </div>
+          ))}
+        </div>
+        {hasMore && (
+          <Button onClick={loadMore} disabled={isLoadingMore} variant="outline" size="sm" className="mt-2">
+            {isLoadingMore && <Loader2 className="mr-2 h-4 w-4 animate-spin" />}Load more
+          </Button>
+        )}
+      </CardContent>
+    </Card>
   );
-};
\ No newline at end of file
+}
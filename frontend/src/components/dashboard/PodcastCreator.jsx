@@ -5,6 +5,7 @@ import { Label } from "../ui/label"
 import { Textarea } from "../ui/textarea"
 import { Progress } from "../ui/progress"
 import { toast } from "../../hooks/use-toast";
+import { fetchPage } from "../../lib/api";
 import {
   ArrowLeft,
   Upload,
@@ -53,22 +54,21 @@ export default function PodcastCreator({ onBack, token, templates, podcasts }) {
   const coverArtInputRef = useRef(null)
 
   useEffect(() => {
-    const fetchMedia = async () => {
-      try {
-        const response = await fetch('/api/media/', {
-          headers: { 'Authorization': `Bearer ${token}` },
-        });
-        if (!response.ok) throw new Error('Failed to fetch media library');
-        const data = await response.json();
-        setMediaLibrary(data);
-      } catch (err) {
-        setError(err.message);
-      }
-    };
-    fetchMedia();
     fetchSpreakerShows(); // Fetch Spreaker shows on mount
   }, [token]);
 
+  // Friendly names for the selected template's static files: one page of each category it uses,
+  // not the whole library. Files past that page show their filename.
+  useEffect(() => {
+    const categories = [...new Set((selectedTemplate?.segments || [])
+      .filter(segment => segment.source?.source_type === 'static')
+      .map(segment => segment.segment_type))];
+    if (!token || categories.length === 0) return;
+    Promise.all(categories.map(category => fetchPage('/api/media/', token, { category, limit: 200 })))
+      .then(pages => setMediaLibrary(pages.flatMap(page => page.items)))
+      .catch(() => setError('Failed to fetch media library'));
+  }, [selectedTemplate, token]);
+
   const fetchSpreakerShows = async () => {
     try {
       const response = await fetch('/api/spreaker/shows', {
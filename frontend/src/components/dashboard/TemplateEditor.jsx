@@ -18,7 +18,8 @@ import {
   Bot,
   Settings2,
 } from "lucide-react";
-import { useState, useEffect, useMemo } from "react";
+import { useState, useEffect } from "react";
+import { usePagedList } from "@/hooks/use-paged-list";
 
 // --- Helper Functions & Constants ---
 const DEFAULT_VOICE_ID = "19B4gjtpL5m876wS3Dfg"; // A default voice for TTS/AI
@@ -55,25 +56,20 @@ export default function TemplateEditor({ templateId, onBack, token, onTemplateSa
   const [isLoading, setIsLoading] = useState(true);
   const [isSaving, setIsSaving] = useState(false);
   const [error, setError] = useState(null);
-  const [mediaFiles, setMediaFiles] = useState([]);
   const isNewTemplate = templateId === 'new';
 
-  // --- Memoized lists for filtered media files ---
-  const introFiles = useMemo(() => mediaFiles.filter(mf => mf.category === 'intro'), [mediaFiles]);
-  const outroFiles = useMemo(() => mediaFiles.filter(mf => mf.category === 'outro'), [mediaFiles]);
-  const musicFiles = useMemo(() => mediaFiles.filter(mf => mf.category === 'music'), [mediaFiles]);
-  const commercialFiles = useMemo(() => mediaFiles.filter(mf => mf.category === 'commercial'), [mediaFiles]);
+  // --- Media files, a page of each category at a time ---
+  const introFiles = usePagedList('/api/media/', token, { category: 'intro' });
+  const outroFiles = usePagedList('/api/media/', token, { category: 'outro' });
+  const musicFiles = usePagedList('/api/media/', token, { category: 'music' });
+  const commercialFiles = usePagedList('/api/media/', token, { category: 'commercial' });
+  const mediaError = [introFiles, outroFiles, musicFiles, commercialFiles].find(media => media.error)?.error;
 
   // --- Data Fetching ---
   useEffect(() => {
     const fetchInitialData = async () => {
       setIsLoading(true);
       try {
-        const mediaResponse = await fetch('/api/media/', { headers: { 'Authorization': `Bearer ${token}` } });
-        if (!mediaResponse.ok) throw new Error('Failed to fetch media files');
-        const mediaData = await mediaResponse.json();
-        setMediaFiles(mediaData);
-
         if (isNewTemplate) {
           setTemplate({
             name: 'My New Podcast Template',
@@ -209,7 +205,7 @@ export default function TemplateEditor({ templateId, onBack, token, onTemplateSa
 
   // --- Render Logic ---
   if (isLoading) return <div className="flex justify-center items-center p-10"><Loader2 className="w-8 h-8 animate-spin" /></div>;
-  if (error) return <p className="text-red-500 p-4">Error: {error}</p>;
+  if (error || mediaError) return <p className="text-red-500 p-4">Error: {error || mediaError}</p>;
   if (!template) return null;
 
   const hasContentSegment = template.segments.some(s => s.segment_type === 'content');
@@ -283,7 +279,7 @@ export default function TemplateEditor({ templateId, onBack, token, onTemplateSa
                                 <SelectItem value="content">Content Section</SelectItem>
                                 <SelectItem value="outro">Outro Section</SelectItem>
                             </SelectContent></Select></div>
-                            <div><Label>Music File</Label><Select value={rule.music_filename} onValueChange={(v) => handleBackgroundMusicChange(index, 'music_filename', v)}><SelectTrigger><SelectValue placeholder="Select music..." /></SelectTrigger><SelectContent>{musicFiles.map(f => <SelectItem key={f.id} value={f.filename}>{f.friendly_name || f.filename.split('_').slice(1).join('_')}</SelectItem>)}</SelectContent></Select></div>
+                            <div><Label>Music File</Label><MediaFileSelect media={musicFiles} value={rule.music_filename} onValueChange={(v) => handleBackgroundMusicChange(index, 'music_filename', v)} placeholder="Select music..." /></div>
                         </div>
                         <div className="grid grid-cols-2 md:grid-cols-4 gap-4">
                             <div><Label>Start Offset (sec)</Label><Input type="number" step="0.5" value={rule.start_offset_s} onChange={(e) => handleBackgroundMusicChange(index, 'start_offset_s', parseFloat(e.target.value || 0))} /></div>
@@ -320,8 +316,29 @@ export default function TemplateEditor({ templateId, onBack, token, onTemplateSa
   );
 }
 
+const mediaLabel = (filename, file) => (file && file.friendly_name) || filename.split('_').slice(1).join('_');
+
+// Lists one category's files a page at a time. A saved choice that isn't on a loaded page yet is still shown.
+const MediaFileSelect = ({ media, value, onValueChange, placeholder, className }) => {
+    const isLoaded = media.items.some(mf => mf.filename === value);
+    return (
+        <Select value={value} onValueChange={onValueChange}>
+            <SelectTrigger className={className}><SelectValue placeholder={placeholder} /></SelectTrigger>
+            <SelectContent>
+                {value && !isLoaded && <SelectItem value={value}>{mediaLabel(value)}</SelectItem>}
+                {media.items.map(mf => <SelectItem key={mf.id} value={mf.filename}>{mediaLabel(mf.filename, mf)}</SelectItem>)}
+                {media.hasMore && (
+                    <Button variant="ghost" size="sm" className="w-full" onClick={media.loadMore} disabled={media.isLoadingMore}>
+                        {media.isLoadingMore && <Loader2 className="mr-2 h-4 w-4 animate-spin" />}Load more
+                    </Button>
+                )}
+            </SelectContent>
+        </Select>
+    );
+};
+
 const SegmentEditor = ({ segment, onDelete, onSourceChange, mediaFiles, isDragging }) => {
-    const filesForType = mediaFiles[segment.segment_type] || [];
+    const filesForType = mediaFiles[segment.segment_type] || { items: [], hasMore: false };
 
     const handleSourceChangeLocal = (field, value) => {
         const newSource = { ...segment.source, [field]: value };
@@ -384,10 +401,7 @@ const SegmentEditor = ({ segment, onDelete, onSourceChange, mediaFiles, isDraggi
                     {segment.source.source_type === 'static' && (
                         <div>
                             <Label>Audio File</Label>
-                            <Select value={segment.source.filename} onValueChange={(v) => handleSourceChangeLocal('filename', v)}>
-                                <SelectTrigger className="w-full mt-1"><SelectValue placeholder={`Select a ${segment.segment_type} file...`} /></SelectTrigger>
-                                <SelectContent>{filesForType.map(mf => <SelectItem key={mf.id} value={mf.filename}>{mf.friendly_name || mf.filename.split('_').slice(1).join('_')}</SelectItem>)}</SelectContent>
-                            </Select>
+                            <MediaFileSelect media={filesForType} value={segment.source.filename} onValueChange={(v) => handleSourceChangeLocal('filename', v)} placeholder={`Select a ${segment.segment_type} file...`} className="w-full mt-1" />
                         </div>
                     )}
                     {segment.source.source_type === 'ai_generated' && (
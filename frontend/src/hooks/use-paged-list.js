@@ -0,0 +1,81 @@
+import { useCallback, useEffect, useRef, useState } from "react"
+import { fetchPage } from "@/lib/api"
+
+// A list endpoint a page at a time: the first page whenever path, token or params change,
+// the next one on loadMore. params are the endpoint's filters (status, podcast_id, category,
+// order), so the server does the filtering and a page costs the same however long the list is.
+export function usePagedList(path, token, params = {}) {
+  const query = JSON.stringify(params)
+  const [items, setItems] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [isLoading, setIsLoading] = useState(true)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
+  const [error, setError] = useState(null)
+  // Bumped on every reload, so a page that arrives after its query was replaced is dropped
+  const generation = useRef(0)
+  const pagesLoaded = useRef(0)
+
+  const reload = useCallback(async () => {
+    if (!token) return
+    const current = ++generation.current
+    setIsLoading(true)
+    try {
+      const page = await fetchPage(path, token, JSON.parse(query))
+      if (current !== generation.current) return
+      pagesLoaded.current = 1
+      setItems(page.items)
+      setNextCursor(page.nextCursor)
+      setError(null)
+    } catch (err) {
+      if (current === generation.current) setError(err.message)
+    } finally {
+      if (current === generation.current) setIsLoading(false)
+    }
+  }, [path, token, query])
+
+  const loadMore = useCallback(async () => {
+    if (!nextCursor || isLoadingMore) return
+    const current = generation.current
+    setIsLoadingMore(true)
+    try {
+      const page = await fetchPage(path, token, { ...JSON.parse(query), cursor: nextCursor })
+      if (current !== generation.current) return
+      pagesLoaded.current += 1
+      setItems(prev => [...prev, ...page.items])
+      setNextCursor(page.nextCursor)
+    } catch (err) {
+      if (current === generation.current) setError(err.message)
+    } finally {
+      setIsLoadingMore(false)
+    }
+  }, [path, token, query, nextCursor, isLoadingMore])
+
+  // Re-reads the first page, for polling. Once more pages are loaded they're kept: items the
+  // first page returns are updated in place and new ones are added at the top.
+  const refresh = useCallback(async () => {
+    if (!token) return
+    const current = generation.current
+    try {
+      const page = await fetchPage(path, token, JSON.parse(query))
+      if (current !== generation.current) return
+      if (pagesLoaded.current <= 1) {
+        setItems(page.items)
+        setNextCursor(page.nextCursor)
+        return
+      }
+      const fresh = new Map(page.items.map(item => [item.id, item]))
+      setItems(prev => {
+        const known = new Set(prev.map(item => item.id))
+        return [...page.items.filter(item => !known.has(item.id)), ...prev.map(item => fresh.get(item.id) || item)]
+      })
+    } catch (err) {
+      if (current === generation.current) setError(err.message)
+    }
+  }, [path, token, query])
+
+  useEffect(() => {
+    reload()
+  }, [reload])
+
+  return { items, setItems, isLoading, isLoadingMore, error, hasMore: Boolean(nextCursor), loadMore, reload, refresh }
+}
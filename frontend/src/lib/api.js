@@ -0,0 +1,14 @@
+// List endpoints (/api/episodes/, /api/media/) return one page at a time, filtered and
+// ordered on the server, and send X-Next-Cursor while there are more pages.
+export async function fetchPage(path, token, params = {}) {
+  const query = new URLSearchParams();
+  for (const [key, value] of Object.entries(params)) {
+    if (value !== undefined && value !== null && value !== '') query.set(key, value);
+  }
+  const search = query.toString();
+  const response = await fetch(search ? `${path}?${search}` : path, {
+    headers: { 'Authorization': `Bearer ${token}` },
+  });
+  if (!response.ok) throw new Error(`Request to ${path} failed with status ${response.status}`);
+  return { items: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') };
+}
@@ -1,11 +1,13 @@
 from sqlmodel import Session, select, func
-from typing import Optional, List, Dict, Any
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Optional, List, Dict, Any, Tuple
 from uuid import UUID
 import json
 
+from .pagination import SortOrder, keyset_page, split_page
 from .security import get_password_hash
 from ..models.user import User, UserCreate, UserPublic
-from ..models.podcast import Podcast, PodcastTemplate, PodcastTemplateCreate, Episode
+from ..models.podcast import Podcast, PodcastTemplate, PodcastTemplateCreate, Episode, EpisodeStatus, EpisodeSummary, MediaItem, MediaCategory
 
 # --- User CRUD ---
 def get_user_by_email(session: Session, email: str) -> Optional[User]:
@@ -61,74 +63,9 @@ def create_user_template(session: Session, template_in: PodcastTemplateCreate, u
     db_template = PodcastTemplate(
         name=template_in.name, user_id=user_id, segments_json=segments_json_str,
         background_music_rules_json=music_rules_json_str,
-        timing_json=template_in.timing.model_dump_json()
-    )
-    session.add(db_template)
-    session.commit()
-    from sqlmodel import Session, select, func
-from typing import Optional, List, Dict, Any
-from uuid import UUID
-import json
-
-from .security import get_password_hash
-from ..models.user import User, UserCreate, UserPublic
-from ..models.podcast import Podcast, PodcastTemplate, PodcastTemplateCreate, Episode
-
-# --- User CRUD ---
-def get_user_by_email(session: Session, email: str) -> Optional[User]:
-    statement = select(User).where(User.email == email)
-    return session.exec(statement).first()
-
-def get_user_by_id(session: Session, user_id: UUID) -> Optional[User]:
-    statement = select(User).where(User.id == user_id)
-    return session.exec(statement).first()
-
-def create_user(session: Session, user_create: UserCreate) -> User:
-    hashed_password = get_password_hash(user_create.password)
-    db_user = User.model_validate(user_create, update={"hashed_password": hashed_password})
-    session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
-    return db_user
-
-def get_all_users(session: Session) -> List[User]:
-    statement = select(User)
-    return session.exec(statement).all()
-
-# --- Stats CRUD ---
-def get_user_stats(session: Session, user_id: UUID) -> Dict[str, Any]:
-    episode_count_statement = select(func.count(Episode.id)).where(Episode.user_id == user_id)
-    total_episodes = session.exec(episode_count_statement).one_or_none() or 0
-    return { "total_episodes": total_episodes, "total_downloads": 1567, "monthly_listeners": 342, "avg_rating": 4.8 }
-
-# --- NEW: Podcast (Show) CRUD ---
-def create_podcast(session: Session, podcast_in: Podcast, user_id: UUID) -> Podcast:
-    db_podcast = Podcast.model_validate(podcast_in, update={"user_id": user_id})
-    session.add(db_podcast)
-    session.commit()
-    session.refresh(db_podcast)
-    return db_podcast
-
-def get_podcasts_by_user(session: Session, user_id: UUID) -> List[Podcast]:
-    statement = select(Podcast).where(Podcast.user_id == user_id)
-    return session.exec(statement).all()
-
-# --- Template CRUD ---
-def get_template_by_id(session: Session, template_id: UUID) -> Optional[PodcastTemplate]:
-    statement = select(PodcastTemplate).where(PodcastTemplate.id == template_id)
-    return session.exec(statement).first()
-
-def get_templates_by_user(session: Session, user_id: UUID) -> List[PodcastTemplate]:
-    statement = select(PodcastTemplate).where(PodcastTemplate.user_id == user_id)
-    return session.exec(statement).all()
-
-def create_user_template(session: Session, template_in: PodcastTemplateCreate, user_id: UUID) -> PodcastTemplate:
-    segments_json_str = json.dumps([s.model_dump(mode='json') for s in template_in.segments])
-    music_rules_json_str = json.dumps([r.model_dump(mode='json') for r in template_in.background_music_rules])
-    db_template = PodcastTemplate(
-        name=template_in.name, user_id=user_id, segments_json=segments_json_str,
-        background_music_rules_json=music_rules_json_str,
-        timing_json=template_in.timing.model_dump_json()
+        timing_json=template_in.timing.model_dump_json(),
+        renderer=template_in.renderer,
+        cleanup_json=template_in.cleanup.model_dump_json()
     )
     session.add(db_template)
     session.commit()
@@ -138,4 +75,38 @@ def create_user_template(session: Session, template_in: PodcastTemplateCreate, u
 # --- Episode CRUD ---
 def get_episode_by_id(session: Session, episode_id: UUID) -> Optional[Episode]:
     statement = select(Episode).where(Episode.id == episode_id)
-    return session.exec(statement).first()
\ No newline at end of file
+    return session.exec(statement).first()
+
+# --- Media CRUD ---
+def list_media_items(
+    session: Session, user_id: UUID, limit: int, cursor: Optional[str] = None,
+    order: SortOrder = SortOrder.newest, category: Optional[MediaCategory] = None
+) -> Tuple[List[MediaItem], Optional[str]]:
+    """One page of a user's media items by upload time, and the cursor for the next page."""
+    statement = select(MediaItem).where(MediaItem.user_id == user_id)
+    if category is not None:
+        statement = statement.where(MediaItem.category == category)
+    statement = keyset_page(statement, MediaItem.created_at, MediaItem.id, order, cursor, limit)
+    return split_page(session.exec(statement).all(), limit, "created_at")
+
+# --- Async CRUD (for endpoints on get_async_session) ---
+async def get_user_by_email_async(session: AsyncSession, email: str) -> Optional[User]:
+    statement = select(User).where(User.email == email)
+    return (await session.exec(statement)).first()
+
+async def list_episodes_async(
+    session: AsyncSession, user_id: UUID, limit: int, cursor: Optional[str] = None,
+    order: SortOrder = SortOrder.newest, status: Optional[EpisodeStatus] = None, podcast_id: Optional[UUID] = None
+) -> Tuple[List[EpisodeSummary], Optional[str]]:
+    """
+    One page of a user's episodes by processed_at, and the cursor for the next page.
+    Only the EpisodeSummary columns are selected.
+    """
+    statement = select(*(getattr(Episode, name) for name in EpisodeSummary.model_fields)).where(Episode.user_id == user_id)
+    if status is not None:
+        statement = statement.where(Episode.status == status)
+    if podcast_id is not None:
+        statement = statement.where(Episode.podcast_id == podcast_id)
+    statement = keyset_page(statement, Episode.processed_at, Episode.id, order, cursor, limit)
+    rows, next_cursor = split_page((await session.exec(statement)).all(), limit, "processed_at")
+    return [EpisodeSummary.model_validate(dict(row._mapping)) for row in rows], next_cursor
@@ -1,35 +1,131 @@
+from typing import Any, AsyncIterator, Dict, Optional
+
 from sqlmodel import create_engine, SQLModel, Session
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.event import listen
-from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from .config import settings
+from .migrations import run_migrations
 # This ensures the models are registered before the database is created
-from ..models import user, podcast 
+from ..models import user, podcast
+
+DATABASE_URL = settings.DATABASE_URL
+# Async drivers for the sync URL's dialect, used when DATABASE_ASYNC_URL isn't set
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+class DatabaseConfigurationError(Exception):
+    """Custom exception for database settings that can't be used."""
+    pass
+
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
 
-DATABASE_URL = "sqlite:///database.db"
 
-engine = create_engine(
-    DATABASE_URL, 
-    echo=True, 
-    connect_args={"check_same_thread": False}
-)
+def _engine_options(url: str) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"echo": settings.DATABASE_ECHO}
+    if _is_sqlite(url):
+        # Connections are handed between threads (FastAPI's threadpool, Celery); the timeout is how long a writer waits for the lock
+        options["connect_args"] = {"check_same_thread": False, "timeout": settings.DATABASE_SQLITE_BUSY_TIMEOUT_MS / 1000.0}
+        if make_url(url).database in (None, "", ":memory:"):
+            # In-memory databases live in a single connection, so there's no pool to size
+            return options
+    else:
+        options.update(pool_recycle=settings.DATABASE_POOL_RECYCLE_S, pool_pre_ping=True)
+    options.update(
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT_S,
+    )
+    return options
 
-def _enable_foreign_keys(dbapi_connection, connection_record):
+
+def _configure_sqlite_connection(dbapi_connection, connection_record):
     """
-    This function runs for every new connection to the SQLite database
-    and turns on foreign key support, which is required for cascading deletes.
+    This function runs for every new connection to a SQLite database. It turns on
+    foreign key support, which is required for cascading deletes, and WAL mode, so
+    readers don't block on episode status updates (or the other way round).
     """
     cursor = dbapi_connection.cursor()
     cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.DATABASE_SQLITE_BUSY_TIMEOUT_MS)}")
+    if settings.DATABASE_SQLITE_WAL:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # Safe with WAL: a crash can lose the last commits but never corrupts the database
+        cursor.execute("PRAGMA synchronous=NORMAL")
     cursor.close()
 
-# This is the most reliable way to attach the event listener to the engine
-listen(engine, "connect", _enable_foreign_keys)
+
+def _make_engine(url: str) -> Engine:
+    new_engine = create_engine(url, **_engine_options(url))
+    if _is_sqlite(url):
+        # This is the most reliable way to attach the event listener to the engine
+        listen(new_engine, "connect", _configure_sqlite_connection)
+    return new_engine
+
+
+engine = _make_engine(DATABASE_URL)
 
 def create_db_and_tables():
     # This function creates all the tables based on your models.
     SQLModel.metadata.create_all(engine)
+    # Then the changes to tables that already existed, which create_all leaves alone
+    return run_migrations(engine)
 
 def get_session():
     # This function provides a database session to your API endpoints.
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+# --- Async sessions ---
+_async_engine: Optional[AsyncEngine] = None
+
+
+def async_database_url() -> str:
+    if settings.DATABASE_ASYNC_URL:
+        return settings.DATABASE_ASYNC_URL
+    url = make_url(DATABASE_URL)
+    driver = _ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise DatabaseConfigurationError(f"Set DATABASE_ASYNC_URL; there's no default async driver for {url.get_backend_name()}.")
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+
+def get_async_engine() -> AsyncEngine:
+    """The engine behind async sessions, created on first use so the sync-only worker never needs an async driver."""
+    global _async_engine
+    if _async_engine is None:
+        url = async_database_url()
+        options = _engine_options(url)
+        if _is_sqlite(url):
+            # aiosqlite runs each connection on its own thread already
+            options["connect_args"] = {"timeout": settings.DATABASE_SQLITE_BUSY_TIMEOUT_MS / 1000.0}
+        try:
+            _async_engine = create_async_engine(url, **options)
+        except ImportError as e:
+            raise DatabaseConfigurationError(f"The async database driver for {make_url(url).drivername} isn't installed: {e}")
+        if _is_sqlite(url):
+            listen(_async_engine.sync_engine, "connect", _configure_sqlite_connection)
+    return _async_engine
+
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """
+    Like get_session, for async def endpoints: queries are awaited instead of blocking
+    the event loop. Objects stay loaded after commit, since lazy loading can't happen here.
+    """
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+
+async def dispose_engines():
+    """Closes pooled connections on shutdown."""
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+    engine.dispose()
@@ -0,0 +1,112 @@
+"""
+Versioned schema migrations.
+
+create_all creates missing tables with everything their models declare, but never
+changes a table that already exists. Every change to an existing table (a new column
+or index) is a migration here, numbered in the order they were written. The
+schema_version table records which ones a database has had; run_migrations applies
+the rest, each in its own transaction along with its version row.
+
+A database created after a migration was written already has its change, so
+migrations check before they alter anything and a new database goes through all of
+them. Add new ones to the end of MIGRATIONS, with the next version, and don't edit
+or renumber one that has shipped: spell out the SQL instead of reading the models,
+which move on.
+
+Run them before starting a new release:
+    python -m scripts.migrate
+The API also runs them at startup, so a single-process deployment needn't.
+"""
+from datetime import datetime, timezone
+from typing import Callable, List, Sequence, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateTable
+
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+def _add_column(connection: Connection, table: str, column: str, definition: str):
+    inspector = inspect(connection)
+    if inspector.has_table(table) and column not in {existing["name"] for existing in inspector.get_columns(table)}:
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+
+
+def _create_index(connection: Connection, name: str, table: str, columns: Sequence[str]):
+    # IF NOT EXISTS works on SQLite and PostgreSQL alike
+    connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+def _template_renderer(connection: Connection):
+    _add_column(connection, "podcasttemplate", "renderer", "VARCHAR(6) NOT NULL DEFAULT 'pydub'")
+
+
+def _episode_audio_outputs(connection: Connection):
+    _add_column(connection, "episode", "audio_outputs_json", "VARCHAR NOT NULL DEFAULT '[]'")
+
+
+def _template_cleanup_settings(connection: Connection):
+    # Templates saved before cleanup settings existed get the defaults
+    _add_column(connection, "podcasttemplate", "cleanup_json", "VARCHAR NOT NULL DEFAULT '{}'")
+
+
+def _list_pagination_indexes(connection: Connection):
+    _create_index(connection, "ix_episode_user_id_processed_at", "episode", ["user_id", "processed_at", "id"])
+    _create_index(connection, "ix_mediaitem_user_id_category", "mediaitem", ["user_id", "category", "created_at", "id"])
+
+
+def _lookup_indexes(connection: Connection):
+    _create_index(connection, "ix_podcast_user_id", "podcast", ["user_id"])
+    _create_index(connection, "ix_podcasttemplate_user_id", "podcasttemplate", ["user_id"])
+    _create_index(connection, "ix_episode_podcast_id", "episode", ["podcast_id"])
+    _create_index(connection, "ix_episode_template_id", "episode", ["template_id"])
+    # status only ever after user_id: on its own it has a handful of values and nothing queries it without a user
+    _create_index(connection, "ix_episode_user_id_status", "episode", ["user_id", "status", "processed_at", "id"])
+    _create_index(connection, "ix_mediaitem_user_id_created_at", "mediaitem", ["user_id", "created_at", "id"])
+
+
+# (version, name, migration), in the order they're applied
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "podcasttemplate.renderer", _template_renderer),
+    (2, "episode.audio_outputs_json", _episode_audio_outputs),
+    (3, "podcasttemplate.cleanup_json", _template_cleanup_settings),
+    (4, "episode and media list pagination indexes", _list_pagination_indexes),
+    (5, "user and foreign key lookup indexes", _lookup_indexes),
+]
+
+
+def current_version(engine: Engine) -> int:
+    with engine.connect() as connection:
+        if not inspect(connection).has_table(schema_version.name):
+            return 0
+        versions = connection.execute(select(schema_version.c.version)).scalars().all()
+    return max(versions, default=0)
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """Applies the migrations this database hasn't had, and returns their names."""
+    with engine.begin() as connection:
+        # Not create(checkfirst=True), which looks first and can race another process doing the same
+        connection.execute(CreateTable(schema_version, if_not_exists=True))
+    done = current_version(engine)
+    applied = []
+    for version, name, migration in MIGRATIONS:
+        if version <= done:
+            continue
+        try:
+            with engine.begin() as connection:
+                # Claimed first, so a process starting at the same time waits on the row and then skips the migration
+                connection.execute(insert(schema_version).values(version=version, name=name, applied_at=datetime.now(timezone.utc)))
+                migration(connection)
+        except IntegrityError:
+            continue
+        applied.append(name)
+    return applied
@@ -0,0 +1,65 @@
+import base64
+from datetime import datetime
+from enum import Enum
+from typing import Any, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import tuple_
+
+from .config import settings
+
+
+class InvalidCursorError(Exception):
+    """Custom exception for a page cursor that can't be decoded."""
+    pass
+
+
+class SortOrder(str, Enum):
+    newest = "newest"
+    oldest = "oldest"
+
+
+# Cursors are the (sort value, id) of the last row of a page. They're opaque to
+# clients, so the layout can change; only URL-safe base64 of "iso|hex" for now.
+def encode_cursor(sorted_at: datetime, row_id: UUID) -> str:
+    return base64.urlsafe_b64encode(f"{sorted_at.isoformat()}|{row_id.hex}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        sorted_at, row_id = raw.split("|")
+        return datetime.fromisoformat(sorted_at), UUID(row_id)
+    except ValueError as e:
+        raise InvalidCursorError(f"Invalid page cursor: {cursor}") from e
+
+
+def page_size(limit: Optional[int]) -> int:
+    return min(limit or settings.LIST_PAGE_SIZE_DEFAULT, settings.LIST_PAGE_SIZE_MAX)
+
+
+def keyset_page(statement, sort_column, id_column, order: SortOrder, cursor: Optional[str], limit: int):
+    """
+    Limits a select to one page in (sort_column, id_column) order, starting after the
+    row the cursor points at. Pages are found by seeking an index on those columns, so
+    the cost of a page doesn't grow with how far into the list it is (unlike OFFSET).
+    One extra row is fetched to tell whether there's a next page; see split_page.
+    """
+    key = tuple_(sort_column, id_column)
+    if cursor:
+        # Compared as a plain tuple so each value is bound with its column's type
+        after = decode_cursor(cursor)
+        statement = statement.where(key < after if order == SortOrder.newest else key > after)
+    if order == SortOrder.newest:
+        statement = statement.order_by(sort_column.desc(), id_column.desc())
+    else:
+        statement = statement.order_by(sort_column.asc(), id_column.asc())
+    return statement.limit(limit + 1)
+
+
+def split_page(rows: List[Any], limit: int, sort_attr: str) -> Tuple[List[Any], Optional[str]]:
+    """The rows of a page fetched with keyset_page, and the cursor for the next one (None on the last page)."""
+    if len(rows) <= limit:
+        return list(rows), None
+    rows = list(rows[:limit])
+    return rows, encode_cursor(getattr(rows[-1], sort_attr), rows[-1].id)
@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
+from anyio import to_thread
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.staticfiles import StaticFiles
@@ -7,15 +8,20 @@ import starlette
 
 print(f"Starlette version: {starlette.__version__}")
 
-from .core.database import create_db_and_tables
+from .core.database import create_db_and_tables, dispose_engines
 from .core.config import settings
 from .routers import templates, episodes, auth, media, users, admin, podcasts, importer, dev, spreaker, wizard
 from worker.tasks import celery_app
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Endpoints never block the event loop: async def ones await everything they do (async sessions,
+    # httpx) and hand anything blocking to run_in_threadpool; the rest are plain def, which FastAPI
+    # runs in this same bounded threadpool.
+    to_thread.current_default_thread_limiter().total_tokens = settings.API_THREADPOOL_SIZE
     create_db_and_tables()
     yield
+    await dispose_engines()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -40,6 +46,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Paged list endpoints return the next page's cursor in a header
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(auth.router)
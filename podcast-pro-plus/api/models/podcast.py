@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from typing import List, Optional, Literal, Union
 from datetime import datetime
 from uuid import UUID, uuid4
@@ -44,7 +45,7 @@ class PodcastBase(SQLModel):
 
 class Podcast(PodcastBase, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True, index=True)
-    user_id: UUID = Field(foreign_key="user.id")
+    user_id: UUID = Field(foreign_key="user.id", index=True)
     user: Optional[User] = Relationship()
     
     episodes: List["Episode"] = Relationship(back_populates="podcast", sa_relationship_kwargs={"cascade": "all, delete-orphan"})
@@ -82,20 +83,43 @@ class SegmentTiming(SQLModel):
     content_start_offset_s: float = -2.0
     outro_start_offset_s: float = -5.0
 
+class CleanupSettings(SQLModel):
+    """Filler word and pause removal, applied when an episode is assembled with cleanup on."""
+    filler_words: List[str] = ["um", "uh", "ah", "er", "like", "you know", "so", "actually"]
+    min_pause_s: float = 1.25    # Silences longer than this are cut...
+    leave_pause_ms: int = 500    # ...down to this much
+
+class ExportProfile(SQLModel):
+    """One encoding of a finished episode. Fields left as None keep the encoder's default or the mix's format."""
+    name: str = "default"
+    format: str = "mp3"
+    codec: Optional[str] = None
+    bitrate: Optional[str] = None
+    channels: Optional[int] = None
+    sample_rate: Optional[int] = None
+
+class TemplateRenderer(str, Enum):
+    pydub = "pydub"    # mixed in Python
+    ffmpeg = "ffmpeg"  # compiled into a single ffmpeg filter graph
+
 class PodcastTemplateCreate(SQLModel):
     name: str
     segments: List[TemplateSegment]
     background_music_rules: List[BackgroundMusicRule] = []
     timing: SegmentTiming = Field(default_factory=SegmentTiming)
+    renderer: TemplateRenderer = TemplateRenderer.pydub
+    cleanup: CleanupSettings = Field(default_factory=CleanupSettings)
 
 class PodcastTemplate(SQLModel, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True, index=True)
     name: str
-    user_id: UUID = Field(foreign_key="user.id")
+    user_id: UUID = Field(foreign_key="user.id", index=True)
     user: Optional[User] = Relationship(back_populates="templates")
     segments_json: str = Field(default="[]")
     background_music_rules_json: str = Field(default="[]")
     timing_json: str = Field(default_factory=lambda: SegmentTiming().model_dump_json())
+    renderer: TemplateRenderer = Field(default=TemplateRenderer.pydub)
+    cleanup_json: str = Field(default_factory=lambda: CleanupSettings().model_dump_json())
 
     episodes: List["Episode"] = Relationship(back_populates="template")
 
@@ -104,6 +128,12 @@ class PodcastTemplatePublic(PodcastTemplateCreate):
     user_id: UUID
 
 class MediaItem(SQLModel, table=True):
+    # The media library lists a user's files newest first a page at a time, all of them or one category
+    __table_args__ = (
+        Index("ix_mediaitem_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_mediaitem_user_id_category", "user_id", "category", "created_at", "id"),
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True, index=True)
     friendly_name: Optional[str] = Field(default=None)
     category: MediaCategory = Field(default=MediaCategory.music)
@@ -114,14 +144,33 @@ class MediaItem(SQLModel, table=True):
     user: Optional[User] = Relationship()
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class AssetLoudness(SQLModel, table=True):
+    """EBU R128 stats of a media file or generated clip, keyed by a hash of its content so it's only measured once."""
+    content_hash: str = Field(primary_key=True)
+    integrated_lufs: Optional[float] = Field(default=None)
+    true_peak_dbtp: Optional[float] = Field(default=None)
+    loudness_range_lu: float = Field(default=0.0)
+    channels: int
+    duration_s: float
+    format_version: int = Field(default=1)
+    measured_at: datetime = Field(default_factory=datetime.utcnow)
+
 class Episode(SQLModel, table=True):
+    # Episode lists page through a user's episodes in processed_at order, with id breaking ties,
+    # optionally only those with one status
+    __table_args__ = (
+        Index("ix_episode_user_id_processed_at", "user_id", "processed_at", "id"),
+        Index("ix_episode_user_id_status", "user_id", "status", "processed_at", "id"),
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True, index=True)
     
     user_id: UUID = Field(foreign_key="user.id")
     user: Optional[User] = Relationship()
-    template_id: Optional[UUID] = Field(default=None, foreign_key="podcasttemplate.id")
+    # Indexed for the lookup of a podcast's or template's episodes when it's deleted
+    template_id: Optional[UUID] = Field(default=None, foreign_key="podcasttemplate.id", index=True)
     template: Optional[PodcastTemplate] = Relationship(back_populates="episodes")
-    podcast_id: UUID = Field(foreign_key="podcast.id")
+    podcast_id: UUID = Field(foreign_key="podcast.id", index=True)
     podcast: Optional[Podcast] = Relationship(back_populates="episodes")
 
     title: str = Field(default="Untitled Episode")
@@ -130,8 +179,23 @@ class Episode(SQLModel, table=True):
     
     status: EpisodeStatus = Field(default=EpisodeStatus.pending)
     final_audio_path: Optional[str] = Field(default=None)
+    audio_outputs_json: str = Field(default="[]")  # Every encoding of the episode; final_audio_path is the first
     spreaker_episode_id: Optional[str] = Field(default=None)
     is_published_to_spreaker: bool = Field(default=False)
 
     processed_at: datetime = Field(default_factory=datetime.utcnow)
-    publish_at: Optional[datetime] = Field(default=None)
\ No newline at end of file
+    publish_at: Optional[datetime] = Field(default=None)
+
+class EpisodeSummary(SQLModel):
+    """The columns episode lists show. Leaves out show notes and output details, which can be large."""
+    id: UUID
+    podcast_id: UUID
+    template_id: Optional[UUID] = None
+    title: str
+    cover_path: Optional[str] = None
+    status: EpisodeStatus
+    final_audio_path: Optional[str] = None
+    spreaker_episode_id: Optional[str] = None
+    is_published_to_spreaker: bool
+    processed_at: datetime
+    publish_at: Optional[datetime] = None
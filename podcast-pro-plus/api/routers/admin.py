@@ -28,7 +28,7 @@ def get_current_admin_user(current_user: User = Depends(get_current_user)) -> Us
 
 # --- Admin Endpoints ---
 @router.get("/users", response_model=List[UserPublic])
-async def get_all_users(
+def get_all_users(
     session: Session = Depends(get_session),
     admin_user: User = Depends(get_current_admin_user)
 ):
@@ -2,17 +2,20 @@ from datetime import datetime, timedelta
 from uuid import uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from jose import JWTError, jwt
 from authlib.integrations.starlette_client import OAuth
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from ..core.config import settings
 from ..core.security import verify_password
 from ..models.user import User, UserCreate, UserPublic
-from ..core.database import get_session
+from ..core.database import engine, get_session, get_async_session
 from ..core import crud
+from ..services import user_cache
 
 # --- Router Setup ---
 router = APIRouter(
@@ -50,7 +53,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 
 # --- Dependency for getting current user ---
 async def get_current_user(
-    session: Session = Depends(get_session), token: str = Depends(oauth2_scheme)
+    session: AsyncSession = Depends(get_async_session), token: str = Depends(oauth2_scheme)
 ) -> User:
     """
     Decodes the JWT token to get the current user. This is our bouncer.
@@ -68,14 +71,21 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = crud.get_user_by_email(session=session, email=email)
+    # Every authenticated request comes through here, so recently resolved users are served from the cache
+    user = await user_cache.get(email)
+    if user is not None:
+        return user
+    user = await crud.get_user_by_email_async(session=session, email=email)
     if user is None:
         raise credentials_exception
+    # Detached, so endpoints on a sync session can add it to theirs to save changes
+    session.expunge(user)
+    await user_cache.put(user)
     return user
 
 # --- Standard Authentication Endpoints ---
 @router.post("/register", response_model=UserPublic, status_code=status.HTTP_201_CREATED)
-async def register_user(user_in: UserCreate, session: Session = Depends(get_session)):
+def register_user(user_in: UserCreate, session: Session = Depends(get_session)):
     """Register a new user with email and password."""
     db_user = crud.get_user_by_email(session=session, email=user_in.email)
     if db_user:
@@ -87,7 +97,7 @@ async def register_user(user_in: UserCreate, session: Session = Depends(get_sess
     return user
 
 @router.post("/token")
-async def login_for_access_token(
+def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(), 
     session: Session = Depends(get_session)
 ):
@@ -113,8 +123,26 @@ async def login_google(request: Request):
     redirect_uri = request.url_for('auth_google_callback')
     return await oauth.google.authorize_redirect(request, redirect_uri)
 
+def _get_or_create_google_user(google_user_data: dict) -> User:
+    # Runs in the threadpool with a session of its own: sessions aren't thread-safe, so the request's can't be handed over
+    with Session(engine) as session:
+        user = crud.get_user_by_email(session=session, email=google_user_data['email'])
+        if not user:
+            user_create = UserCreate(
+                email=google_user_data['email'],
+                password=str(uuid4()),
+                google_id=google_user_data['sub']
+            )
+            user = crud.create_user(session=session, user_create=user_create)
+        elif not user.google_id:
+            user.google_id = google_user_data['sub']
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+        return user
+
 @router.get('/google/callback')
-async def auth_google_callback(request: Request, session: Session = Depends(get_session)):
+async def auth_google_callback(request: Request):
     """
     Handles the callback from Google, creates/updates the user, issues a token,
     and redirects back to the frontend.
@@ -133,21 +161,8 @@ async def auth_google_callback(request: Request, session: Session = Depends(get_
     if not google_user_data:
         raise HTTPException(status_code=400, detail="Could not fetch user info from Google.")
 
-    user_email = google_user_data['email']
-    user = crud.get_user_by_email(session=session, email=user_email)
-
-    if not user:
-        user_create = UserCreate(
-            email=user_email,
-            password=str(uuid4()),
-            google_id=google_user_data['sub']
-        )
-        user = crud.create_user(session=session, user_create=user_create)
-    elif not user.google_id:
-        user.google_id = google_user_data['sub']
-        session.add(user)
-        session.commit()
-        session.refresh(user)
+    # Hashing the new user's password and the queries block, so they run in the threadpool
+    user = await run_in_threadpool(_get_or_create_google_user, google_user_data)
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
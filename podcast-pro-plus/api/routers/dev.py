@@ -3,6 +3,7 @@ from sqlmodel import Session, SQLModel
 
 from ..core.database import get_session, engine
 from ..models.user import User
+from ..services import media_cache, music_bed_cache, transcript_cache, tts_cache, user_cache
 from .auth import get_current_user
 
 router = APIRouter(
@@ -11,7 +12,7 @@ router = APIRouter(
 )
 
 @router.post("/reset-database", status_code=status.HTTP_200_OK)
-async def reset_database(
+def reset_database(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user) # Ensures only logged-in users can do this
 ):
@@ -25,10 +26,25 @@ async def reset_database(
         
         SQLModel.metadata.drop_all(engine)
         SQLModel.metadata.create_all(engine)
+        user_cache.clear()
         
         return {"message": "Database has been successfully reset."}
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred while resetting the database: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("/cache-stats", status_code=status.HTTP_200_OK)
+async def get_cache_stats(current_user: User = Depends(get_current_user)):
+    """
+    FOR DEVELOPMENT ONLY: Hit rates of this API process's caches.
+    Celery workers keep their own; each episode's processing log includes them.
+    """
+    return {
+        "media": media_cache.stats(),
+        "music_beds": music_bed_cache.cache.stats(),
+        "transcripts": transcript_cache.cache.stats(),
+        "tts": tts_cache.cache.stats(),
+        "users": user_cache.stats(),
+    }
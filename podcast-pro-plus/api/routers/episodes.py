@@ -1,20 +1,24 @@
 import shutil
-from fastapi import APIRouter, HTTPException, status, Body, Depends
+from fastapi import APIRouter, HTTPException, status, Body, Depends, Query, Response
 from pydantic import BaseModel
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 from uuid import UUID
 import os
+import json
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from worker.tasks import create_podcast_episode, celery_app, publish_episode_to_spreaker_task
 
-from ..services import audio_processor, transcription, ai_enhancer, publisher
-from ..core.database import get_session
+from ..services import audio_processor, transcription, ai_enhancer, publisher, cut_list, streaming
+from ..core.database import get_session, get_async_session
 from ..core import crud
+from ..core.pagination import InvalidCursorError, SortOrder, page_size
 from ..models.user import User
-from ..models.podcast import Episode, Podcast
+from ..models.podcast import Episode, EpisodeStatus, EpisodeSummary, Podcast, CleanupSettings
 from .auth import get_current_user
+from .media import MEDIA_DIR
 
 router = APIRouter(
     prefix="/episodes",
@@ -36,23 +40,40 @@ class AssembleRequestBody(BaseModel):
 
 
 def find_file_in_dirs(filename: str) -> Optional[Path]:
-    for directory in [UPLOAD_DIR, CLEANED_DIR, EDITED_DIR, OUTPUT_DIR]:
+    for directory in [MEDIA_DIR, UPLOAD_DIR, CLEANED_DIR, EDITED_DIR, OUTPUT_DIR]:
         path = directory / filename
         if path.exists():
             return path
     return None
 
-@router.get("/", response_model=List[Episode])
+@router.get("/", response_model=List[EpisodeSummary])
 async def get_user_episodes(
-    session: Session = Depends(get_session),
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    order: SortOrder = SortOrder.newest,
+    status_filter: Optional[EpisodeStatus] = Query(None, alias="status"),
+    podcast_id: Optional[UUID] = None,
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
-    statement = select(Episode).where(Episode.user_id == current_user.id)
-    episodes = session.exec(statement).all()
+    """
+    One page of the user's episodes, newest first unless order=oldest. When there are
+    more, the X-Next-Cursor header holds the cursor to pass for the next page.
+    """
+    limit = page_size(limit)
+    try:
+        episodes, next_cursor = await crud.list_episodes_async(
+            session, current_user.id, limit, cursor, order, status=status_filter, podcast_id=podcast_id
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return episodes
 
 @router.post("/assemble", status_code=status.HTTP_202_ACCEPTED)
-async def assemble_episode_endpoint(
+def assemble_episode_endpoint(
     body: AssembleRequestBody,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
@@ -102,7 +123,7 @@ async def assemble_episode_endpoint(
         raise HTTPException(status_code=500, detail=f"Failed to queue episode assembly: {e}")
 
 @router.get("/status/{job_id}")
-async def get_job_status(job_id: str):
+def get_job_status(job_id: str):
     task_result = celery_app.AsyncResult(job_id)
     response = {
         "job_id": job_id,
@@ -113,29 +134,60 @@ async def get_job_status(job_id: str):
 
 
 @router.post("/generate-metadata/{filename}", status_code=status.HTTP_200_OK)
-async def generate_metadata_endpoint(filename: str, current_user: User = Depends(get_current_user)):
+def generate_metadata_endpoint(filename: str, current_user: User = Depends(get_current_user)):
     file_path = find_file_in_dirs(filename)
     if not file_path:
         raise HTTPException(status_code=404, detail=f"File '{filename}' not found in any directory.")
     try:
-        temp_upload_path = UPLOAD_DIR / file_path.name
-        shutil.copy(file_path, temp_upload_path)
-
-        word_timestamps = transcription.get_word_timestamps(temp_upload_path.name)
+        # Transcribing the file in place (rather than a temp copy) lets the assembly task reuse the cached transcript
+        word_timestamps = transcription.get_word_timestamps(file_path)
         if not word_timestamps:
             raise HTTPException(status_code=400, detail="Transcript is empty.")
         
-        full_transcript = " ".join([word['word'] for word in word_timestamps])
+        full_transcript = word_timestamps.text()
         metadata = ai_enhancer.generate_metadata_from_transcript(full_transcript)
-        
-        os.remove(temp_upload_path)
 
         return metadata
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
 
+@router.post("/cleanup-preview/{filename}", status_code=status.HTTP_200_OK)
+def cleanup_preview_endpoint(
+    filename: str,
+    template_id: UUID,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    The edits filler word and pause removal would make to a file with a template's cleanup
+    settings, as [start_ms, end_ms, silence] rows, without rendering any audio. The file's
+    length comes from streaming.probe: ffprobe when it's installed, otherwise ffmpeg. A file
+    that isn't transcribed yet is decoded by pydub, which needs ffprobe for compressed formats.
+    """
+    template = crud.get_template_by_id(session=session, template_id=template_id)
+    if not template or template.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Invalid template.")
+    file_path = find_file_in_dirs(filename)
+    if not file_path:
+        raise HTTPException(status_code=404, detail=f"File '{filename}' not found in any directory.")
+    try:
+        cleanup = CleanupSettings.model_validate(json.loads(template.cleanup_json))
+        duration_s, _, _ = streaming.probe(file_path)
+        length_ms = int(duration_s * 1000)
+        timeline = transcription.get_word_timestamps(file_path)
+        edits = cut_list.build_cut_array(timeline, cleanup.filler_words, cleanup.min_pause_s, cleanup.leave_pause_ms, length_ms)
+        return {
+            "edits": edits.tolist(),
+            "original_ms": length_ms,
+            "cleaned_ms": int((edits[:, 1] - edits[:, 0]).sum()),
+        }
+    except streaming.StreamingError as e:
+        raise HTTPException(status_code=422, detail=f"Could not read the audio file: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+
 @router.post("/publish/{episode_id}", status_code=status.HTTP_202_ACCEPTED)
-async def publish_episode(
+def publish_episode(
     episode_id: UUID,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
@@ -164,7 +216,7 @@ async def publish_episode(
         raise HTTPException(status_code=500, detail=f"Failed to queue Spreaker publishing task: {e}")
 
 @router.delete("/{episode_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_episode(
+def delete_episode(
     episode_id: UUID,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
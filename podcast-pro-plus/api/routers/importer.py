@@ -1,13 +1,15 @@
 import httpx
 import feedparser
 from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlmodel import Session, select
 from datetime import datetime
 from pathlib import Path
+from typing import Optional, Tuple
 from uuid import UUID, uuid4
 
-from ..core.database import get_session
+from ..core.database import engine
 from ..models.user import User
 from ..models.podcast import Podcast, Episode, EpisodeStatus
 from .auth import get_current_user
@@ -20,33 +22,20 @@ router = APIRouter(
 class RssPayload(BaseModel):
     rss_url: str
 
-@router.post("/rss", status_code=201)
-async def import_from_rss(
-    payload: RssPayload,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
-):
-    try:
-        existing_podcast = session.exec(select(Podcast).where(Podcast.rss_url == payload.rss_url, Podcast.user_id == current_user.id)).first()
-        if existing_podcast:
-            raise HTTPException(status_code=409, detail=f"Podcast '{existing_podcast.name}' has already been imported.")
-
-        async with httpx.AsyncClient() as client:
-            response = await client.get(payload.rss_url, timeout=20.0, follow_redirects=True)
-            response.raise_for_status()
-        
-        feed = feedparser.parse(response.content)
-
-        if not feed.feed or not feed.entries:
-            raise HTTPException(status_code=400, detail="Invalid or empty RSS feed.")
+# These run in the threadpool, so each opens its own session rather than sharing the request's across threads
+def _find_imported_podcast(rss_url: str, user_id: UUID) -> Optional[Podcast]:
+    with Session(engine) as session:
+        return session.exec(select(Podcast).where(Podcast.rss_url == rss_url, Podcast.user_id == user_id)).first()
 
+def _save_feed(feed, rss_url: str, user_id: UUID) -> Tuple[Podcast, int]:
+    with Session(engine) as session:
         feed_info = feed.feed
-        
+    
         new_podcast = Podcast(
             name=feed_info.get("title", "Untitled Podcast"),
             description=feed_info.get("summary", feed_info.get("subtitle")),
-            rss_url=payload.rss_url,
-            user_id=current_user.id,
+            rss_url=rss_url,
+            user_id=user_id,
             cover_path=feed_info.get("image", {}).get("href") # We save the original URL
         )
         session.add(new_podcast)
@@ -62,7 +51,7 @@ async def import_from_rss(
             publish_date = datetime(*entry.published_parsed[:6]) if hasattr(entry, 'published_parsed') and entry.published_parsed else None
 
             new_episode = Episode(
-                user_id=current_user.id,
+                user_id=user_id,
                 podcast=new_podcast,
                 title=entry.get("title", "Untitled Episode"),
                 show_notes=entry.get("summary"),
@@ -72,15 +61,38 @@ async def import_from_rss(
                 cover_path=episode_cover_url
             )
             episodes_to_add.append(new_episode)
-        
+    
         session.add_all(episodes_to_add)
         session.commit()
+        session.refresh(new_podcast)
+        return new_podcast, len(episodes_to_add)
+
+@router.post("/rss", status_code=201)
+async def import_from_rss(
+    payload: RssPayload,
+    current_user: User = Depends(get_current_user)
+):
+    # The feed is fetched with httpx on the event loop; parsing it and the database work run in the threadpool
+    try:
+        existing_podcast = await run_in_threadpool(_find_imported_podcast, payload.rss_url, current_user.id)
+        if existing_podcast:
+            raise HTTPException(status_code=409, detail=f"Podcast '{existing_podcast.name}' has already been imported.")
+
+        async with httpx.AsyncClient() as client:
+            response = await client.get(payload.rss_url, timeout=20.0, follow_redirects=True)
+            response.raise_for_status()
+        
+        feed = await run_in_threadpool(feedparser.parse, response.content)
+
+        if not feed.feed or not feed.entries:
+            raise HTTPException(status_code=400, detail="Invalid or empty RSS feed.")
+
+        new_podcast, episodes_imported = await run_in_threadpool(_save_feed, feed, payload.rss_url, current_user.id)
         
         return {
             "message": "Import successful!",
             "podcast_name": new_podcast.name,
-            "episodes_imported": len(episodes_to_add)
+            "episodes_imported": episodes_imported
         }
     except Exception as e:
-        session.rollback()
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
@@ -1,7 +1,7 @@
 import shutil
 import json
 from uuid import uuid4
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form, Query, Response
 from pydantic import BaseModel
 from typing import List, Optional
 from uuid import UUID
@@ -11,6 +11,9 @@ from sqlmodel import Session, select
 from ..models.podcast import MediaItem, MediaCategory
 from ..models.user import User
 from ..core.database import get_session
+from ..core import crud
+from ..core.pagination import InvalidCursorError, SortOrder, page_size
+from ..services import media_cache
 from .auth import get_current_user
 
 router = APIRouter(
@@ -25,7 +28,7 @@ class MediaItemUpdate(BaseModel):
     friendly_name: str
 
 @router.post("/upload/{category}", response_model=List[MediaItem], status_code=status.HTTP_201_CREATED)
-async def upload_media_files(
+def upload_media_files(
     category: MediaCategory,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
@@ -47,6 +50,9 @@ async def upload_media_files(
         safe_filename = f"{current_user.id.hex}_{uuid4().hex}_{file.filename}"
         file_path = MEDIA_DIR / safe_filename
         
+        if file_path.exists():
+            # Re-uploaded under the same name: drop the old contents from the decoded caches first
+            media_cache.invalidate(file_path)
         try:
             with open(file_path, "wb") as buffer:
                 shutil.copyfileobj(file.file, buffer)
@@ -73,16 +79,30 @@ async def upload_media_files(
     return created_items
 
 @router.get("/", response_model=List[MediaItem])
-async def list_user_media(
+def list_user_media(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    order: SortOrder = SortOrder.newest,
+    category: Optional[MediaCategory] = None,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Retrieve a list of the current user's uploaded media files."""
-    statement = select(MediaItem).where(MediaItem.user_id == current_user.id)
-    return session.exec(statement).all()
+    """
+    Retrieve a page of the current user's uploaded media files, newest first unless order=oldest.
+    When there are more, the X-Next-Cursor header holds the cursor to pass for the next page.
+    """
+    limit = page_size(limit)
+    try:
+        items, next_cursor = crud.list_media_items(session, current_user.id, limit, cursor, order, category=category)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 @router.put("/{media_id}", response_model=MediaItem)
-async def update_media_item_name(
+def update_media_item_name(
     media_id: UUID,
     media_update: MediaItemUpdate,
     session: Session = Depends(get_session),
@@ -100,7 +120,7 @@ async def update_media_item_name(
     return media_item
 
 @router.delete("/{media_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_media_item(
+def delete_media_item(
     media_id: UUID,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
@@ -115,6 +135,7 @@ async def delete_media_item(
 
     file_path = MEDIA_DIR / media_item.filename
     if file_path.exists():
+        media_cache.invalidate(file_path)
         file_path.unlink()
         
     session.delete(media_item)
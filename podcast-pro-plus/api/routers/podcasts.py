@@ -2,11 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, status, Form, File, Uploa
 from typing import List, Optional
 from uuid import UUID, uuid4
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 import shutil
 from pathlib import Path
 import logging
 
-from ..core.database import get_session
+from ..core.database import get_session, get_async_session
 from ..models.user import User
 from ..models.podcast import Podcast, PodcastBase, PodcastType
 from ..services.publisher import SpreakerClient
@@ -37,7 +38,7 @@ class PodcastUpdate(PodcastBase):
 
 
 @router.post("/", response_model=Podcast, status_code=status.HTTP_201_CREATED)
-async def create_podcast(
+def create_podcast(
     name: str = Form(...),
     description: str = Form(...),
     cover_image: Optional[UploadFile] = File(None),
@@ -115,15 +116,15 @@ async def create_podcast(
 
 @router.get("/", response_model=List[Podcast])
 async def get_user_podcasts(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     statement = select(Podcast).where(Podcast.user_id == current_user.id)
-    return session.exec(statement).all()
+    return (await session.exec(statement)).all()
 
 
 @router.put("/{podcast_id}", response_model=Podcast)
-async def update_podcast(
+def update_podcast(
     podcast_id: UUID,
     podcast_update: PodcastUpdate,
     session: Session = Depends(get_session),
@@ -146,7 +147,7 @@ async def update_podcast(
 
 
 @router.delete("/{podcast_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_podcast(
+def delete_podcast(
     podcast_id: UUID,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
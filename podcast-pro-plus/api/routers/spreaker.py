@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status, Body, Request
 from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from ..core.database import get_session
+from sqlmodel import Session
+from ..core.database import engine, get_session
 from ..core.config import settings
 from ..core import crud
 from ..models.user import User
@@ -57,8 +57,21 @@ async def spreaker_login(request: Request, current_user: User = Depends(get_curr
     auth_url = f"https://www.spreaker.com/oauth2/authorize?{urlencode(params)}"
     return {"auth_url": auth_url}
 
+def _save_spreaker_tokens(user_id: UUID, token_data: dict) -> Optional[User]:
+    # Runs in the threadpool, so it opens its own session rather than sharing the request's across threads
+    with Session(engine) as db:
+        user = crud.get_user_by_id(db, user_id)
+        if not user:
+            return None
+        user.spreaker_access_token = token_data["access_token"]
+        user.spreaker_refresh_token = token_data["refresh_token"]
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+
 @router.get("/auth/callback")
-async def spreaker_callback(request: Request, code: str, state: str, db: Session = Depends(get_session)):
+async def spreaker_callback(request: Request, code: str, state: str):
     stored_data = _oauth_states.pop(state, None)
     if not stored_data or stored_data["user_id"] is None:
         raise HTTPException(status_code=403, detail="Invalid state parameter")
@@ -79,15 +92,9 @@ async def spreaker_callback(request: Request, code: str, state: str, db: Session
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to retrieve access token from Spreaker")
     
     token_data = response.json()
-    user = crud.get_user_by_id(db, UUID(user_id))
+    user = await run_in_threadpool(_save_spreaker_tokens, UUID(user_id), token_data)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-
-    user.spreaker_access_token = token_data["access_token"]
-    user.spreaker_refresh_token = token_data["refresh_token"]
-    db.add(user)
-    db.commit()
-    db.refresh(user)
     
     return HTMLResponse('''
         <html><head><title>Authentication Successful</title><script>
@@ -97,7 +104,7 @@ async def spreaker_callback(request: Request, code: str, state: str, db: Session
     ''')
 
 @router.post("/disconnect", status_code=status.HTTP_200_OK)
-async def disconnect_spreaker(session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+def disconnect_spreaker(session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
     current_user.spreaker_access_token = None
     current_user.spreaker_refresh_token = None
     session.add(current_user)
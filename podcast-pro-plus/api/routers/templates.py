@@ -23,11 +23,13 @@ def convert_db_template_to_public(db_template: PodcastTemplate) -> PodcastTempla
         name=db_template.name,
         segments=json.loads(db_template.segments_json),
         background_music_rules=json.loads(db_template.background_music_rules_json),
-        timing=json.loads(db_template.timing_json)
+        timing=json.loads(db_template.timing_json),
+        renderer=db_template.renderer,
+        cleanup=json.loads(db_template.cleanup_json)
     )
 
 @router.get("/", response_model=List[PodcastTemplatePublic])
-async def list_user_templates(
+def list_user_templates(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
@@ -37,7 +39,7 @@ async def list_user_templates(
 
 
 @router.post("/", response_model=PodcastTemplatePublic, status_code=status.HTTP_201_CREATED)
-async def create_template(
+def create_template(
     template_in: PodcastTemplateCreate,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
@@ -48,7 +50,7 @@ async def create_template(
 
 
 @router.get("/{template_id}", response_model=PodcastTemplatePublic)
-async def get_template(
+def get_template(
     template_id: UUID,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
@@ -63,7 +65,7 @@ async def get_template(
 
 
 @router.delete("/{template_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_template(
+def delete_template(
     template_id: UUID,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
@@ -81,7 +83,7 @@ async def delete_template(
 
 
 @router.put("/{template_id}", response_model=PodcastTemplatePublic)
-async def update_template(
+def update_template(
     template_id: UUID,
     template_in: PodcastTemplateCreate,
     session: Session = Depends(get_session),
@@ -99,6 +101,8 @@ async def update_template(
     db_template.segments_json = json.dumps([s.model_dump(mode='json') for s in template_in.segments])
     db_template.background_music_rules_json = json.dumps([r.model_dump(mode='json') for r in template_in.background_music_rules])
     db_template.timing_json = template_in.timing.model_dump_json()
+    db_template.renderer = template_in.renderer
+    db_template.cleanup_json = template_in.cleanup.model_dump_json()
     
     session.add(db_template)
     session.commit()
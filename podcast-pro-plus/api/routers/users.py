@@ -18,7 +18,7 @@ class ElevenLabsAPIKeyUpdate(BaseModel):
     api_key: str
 
 @router.get("/me/stats", response_model=Dict[str, Any])
-async def read_user_stats(
+def read_user_stats(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
@@ -26,7 +26,7 @@ async def read_user_stats(
     return crud.get_user_stats(session=session, user_id=current_user.id)
 
 @router.put("/me/elevenlabs-key", response_model=UserPublic)
-async def update_elevenlabs_api_key(
+def update_elevenlabs_api_key(
     key_update: ElevenLabsAPIKeyUpdate,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
@@ -1,17 +1,20 @@
 import openai
 import json
+import functools
 from typing import Dict, Any
 from pydub import AudioSegment
 from elevenlabs.client import ElevenLabs
 import io
-import time
 import logging
 from elevenlabs.core import ApiError
 
 from ..core.config import settings
+from . import rate_limiter, tts_cache
+from .rate_limiter import RateLimitedError
 
 # Initialize clients
 openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+elevenlabs_bucket = rate_limiter.TokenBucket("elevenlabs", settings.ELEVENLABS_REQUESTS_PER_S, settings.ELEVENLABS_BURST)
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -79,39 +82,59 @@ def get_answer_for_topic(topic: str) -> str:
     except Exception as e:
         raise AIEnhancerError(f"Failed to get answer for topic: {e}")
 
+@functools.lru_cache(maxsize=16)
 def get_elevenlabs_client(api_key: str) -> ElevenLabs:
-    """Returns an ElevenLabs client initialized with the given API key."""
+    """Returns an ElevenLabs client initialized with the given API key, reused across calls."""
     return ElevenLabs(api_key=api_key)
 
 def generate_speech_from_text(text: str, voice_id: str = "19B4gjtpL5m876wS3Dfg", api_key: str = None) -> AudioSegment:
-    """Generates an audio segment from text using ElevenLabs."""
-    max_retries = 3
-    retry_delay_seconds = 300  # 5 minutes
+    """
+    Generates an audio segment from text using ElevenLabs.
+    Speech is cached by voice, normalized text and model settings, so a repeated script isn't synthesized twice.
+
+    Requests draw from a shared ElevenLabs rate budget. When it's exhausted, or
+    ElevenLabs answers 429, this raises RateLimitedError instead of sleeping, so
+    the calling task can be requeued and the worker moves on to other work.
+    """
+    cache_key = tts_cache.cache_key(text, voice_id, settings.ELEVENLABS_MODEL_ID, settings.ELEVENLABS_OUTPUT_FORMAT)
+    cached_audio = tts_cache.load(cache_key)
+    if cached_audio is not None:
+        try:
+            return AudioSegment.from_file(io.BytesIO(cached_audio), format="mp3")
+        except Exception:
+            # A corrupt entry is just a miss
+            tts_cache.cache.delete(cache_key)
 
     final_api_key = api_key or settings.ELEVENLABS_API_KEY
     if not final_api_key or final_api_key == "YOUR_API_KEY_HERE":
         raise AIEnhancerError("ElevenLabs API key is not configured.")
 
     elevenlabs_client = get_elevenlabs_client(final_api_key)
+    elevenlabs_bucket.acquire(max_wait_s=settings.ELEVENLABS_MAX_INLINE_WAIT_S)
 
-    for attempt in range(max_retries):
-        try:
-            audio_stream = elevenlabs_client.text_to_speech.stream(
-                text=text,
-                voice_id=voice_id
-            )
-            audio_bytes = b"".join(chunk for chunk in audio_stream)
-            if not audio_bytes:
-                raise AIEnhancerError("Failed to generate speech: Received empty audio stream from ElevenLabs.")
-            audio_buffer = io.BytesIO(audio_bytes)
-            return AudioSegment.from_file(audio_buffer, format="mp3")
-        except ApiError as e:
-            if e.status_code == 429:
-                logging.warning(f"ElevenLabs API rate limit hit (429). Retrying in {retry_delay_seconds} seconds... (Attempt {attempt + 1}/{max_retries})")
-                time.sleep(retry_delay_seconds)
-            else:
-                raise AIEnhancerError(f"Failed to generate speech: {e}")
-        except Exception as e:
-            raise AIEnhancerError(f"Failed to generate speech: {e}")
-    
-    raise AIEnhancerError(f"Failed to generate speech after {max_retries} attempts due to ElevenLabs API rate limit.")
\ No newline at end of file
+    try:
+        audio_stream = elevenlabs_client.text_to_speech.stream(
+            text=text,
+            voice_id=voice_id,
+            model_id=settings.ELEVENLABS_MODEL_ID,
+            output_format=settings.ELEVENLABS_OUTPUT_FORMAT
+        )
+        audio_bytes = b"".join(chunk for chunk in audio_stream)
+        if not audio_bytes:
+            raise AIEnhancerError("Failed to generate speech: Received empty audio stream from ElevenLabs.")
+        audio_buffer = io.BytesIO(audio_bytes)
+        audio = AudioSegment.from_file(audio_buffer, format="mp3")
+        tts_cache.store(cache_key, audio_bytes)
+        return audio
+    except ApiError as e:
+        if e.status_code == 429:
+            retry_after_s = rate_limiter.parse_retry_after((e.headers or {}).get("retry-after"))
+            # Hold back every worker sharing the budget, not just this one
+            elevenlabs_bucket.block_for(retry_after_s if retry_after_s is not None else settings.RATE_LIMIT_BASE_BACKOFF_S)
+            logging.warning(f"ElevenLabs API rate limit hit (429). Retry after: {retry_after_s}s")
+            raise RateLimitedError("ElevenLabs API rate limit hit (429).", retry_after_s=retry_after_s)
+        raise AIEnhancerError(f"Failed to generate speech: {e}")
+    except AIEnhancerError:
+        raise
+    except Exception as e:
+        raise AIEnhancerError(f"Failed to generate speech: {e}")
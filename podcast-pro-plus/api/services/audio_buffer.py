@@ -0,0 +1,169 @@
+import numpy as np
+from pydub import AudioSegment
+
+# pydub stores samples as signed little-endian integers of these widths
+_SAMPLE_DTYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+# Frames converted at a time when moving between AudioSegment and AudioBuffer
+BLOCK_FRAMES = 2 ** 18
+
+
+def _conform(segment: AudioSegment, sample_rate: int = None, channels: int = None) -> AudioSegment:
+    """Converts a segment to the given format with pydub, only where it differs."""
+    if sample_rate and segment.frame_rate != sample_rate:
+        segment = segment.set_frame_rate(sample_rate)
+    if channels and segment.channels != channels:
+        segment = segment.set_channels(channels)
+    if segment.sample_width not in _SAMPLE_DTYPES:
+        segment = segment.set_sample_width(2)
+    return segment
+
+
+def _iter_blocks(segment: AudioSegment):
+    """Yields (first_frame, float32 block) pairs covering the whole segment."""
+    dtype = _SAMPLE_DTYPES[segment.sample_width]
+    scale = np.float32(1.0 / (np.iinfo(dtype).max + 1))
+    samples = np.frombuffer(segment.raw_data, dtype=dtype).reshape(-1, segment.channels)
+    for start in range(0, len(samples), BLOCK_FRAMES):
+        yield start, samples[start:start + BLOCK_FRAMES].astype(np.float32) * scale
+
+
+class AudioBuffer:
+    """
+    A mutable block of float32 audio frames, shaped (frames, channels), at a fixed sample rate.
+
+    Unlike pydub's AudioSegment, every edit here (overlay, gain, fades, normalize)
+    happens in place, so mixing an episode doesn't copy the whole raw buffer per step.
+    Samples are full scale at +/-1.0 and are only clipped when converting back
+    to an AudioSegment.
+    """
+
+    def __init__(self, samples: np.ndarray, sample_rate: int):
+        if samples.ndim != 2:
+            raise ValueError("AudioBuffer samples must be shaped (frames, channels).")
+        self.samples = samples
+        self.sample_rate = sample_rate
+
+    # --- Construction & conversion ---
+    @classmethod
+    def silent(cls, duration_ms: float, sample_rate: int, channels: int) -> "AudioBuffer":
+        frames = int(duration_ms * sample_rate / 1000.0)
+        return cls(np.zeros((frames, channels), dtype=np.float32), sample_rate)
+
+    @classmethod
+    def from_segment(cls, segment: AudioSegment, sample_rate: int = None, channels: int = None) -> "AudioBuffer":
+        """Decodes an AudioSegment, converting it to the given sample rate and channel count first."""
+        segment = _conform(segment, sample_rate, channels)
+        buffer = cls(np.empty((int(segment.frame_count()), segment.channels), dtype=np.float32), segment.frame_rate)
+        for start, block in _iter_blocks(segment):
+            buffer.samples[start:start + len(block)] = block
+        return buffer
+
+    def into_segment(self, sample_width: int = 2, gain_db: float = 0.0) -> AudioSegment:
+        """
+        Encodes the buffer into an AudioSegment, clipping anything past full scale.
+        gain_db is applied on the way, which saves a separate apply_gain pass.
+
+        The integer samples are written over the float samples as they're converted,
+        so this needs no second full-size array. The buffer is empty afterwards.
+        """
+        dtype = _SAMPLE_DTYPES[sample_width]
+        info = np.iinfo(dtype)
+        scale = np.float32((info.max + 1) * 10 ** (gain_db / 20.0))
+        flat = np.ascontiguousarray(self.samples).reshape(-1)
+        # Integer samples are never wider than float32 ones, so writing sample i
+        # only ever touches bytes of samples that were already converted.
+        out = flat.view(dtype)
+        for start in range(0, len(flat), BLOCK_FRAMES):
+            block = flat[start:start + BLOCK_FRAMES] * scale
+            np.clip(block, info.min, info.max, out=block)
+            out[start:start + len(block)] = block.astype(dtype)
+        data = out[:len(flat)].tobytes()
+        channels = self.channels
+        self.samples = np.zeros((0, channels), dtype=np.float32)
+        del flat, out
+        return AudioSegment(data=data, sample_width=sample_width, frame_rate=self.sample_rate, channels=channels)
+
+    # --- Properties ---
+    @property
+    def channels(self) -> int:
+        return self.samples.shape[1]
+
+    @property
+    def frame_count(self) -> int:
+        return self.samples.shape[0]
+
+    def __len__(self) -> int:
+        """Length in milliseconds, like AudioSegment."""
+        return round(self.frame_count * 1000.0 / self.sample_rate)
+
+    def frame_at(self, position_ms: float) -> int:
+        return int(position_ms * self.sample_rate / 1000.0)
+
+    def peak(self) -> float:
+        if not self.frame_count:
+            return 0.0
+        # max/min instead of abs() so we don't allocate a second full-size array
+        return float(max(self.samples.max(), -self.samples.min()))
+
+    # --- In-place editing ---
+    def overlay(self, other: "AudioBuffer", position_ms: float = 0) -> "AudioBuffer":
+        """Mixes another buffer into this one at position_ms. Anything past the end is dropped, as in pydub."""
+        if other.sample_rate != self.sample_rate or other.channels != self.channels:
+            raise ValueError("Cannot overlay buffers with different sample rates or channel layouts.")
+        start = max(0, self.frame_at(position_ms))
+        end = min(self.frame_count, start + other.frame_count)
+        if end > start:
+            self.samples[start:end] += other.samples[:end - start]
+        return self
+
+    def overlay_segment(self, segment: AudioSegment, position_ms: float = 0) -> "AudioBuffer":
+        """
+        Mixes an AudioSegment in at position_ms, decoding it block by block
+        so the segment never exists as a second full-size float array.
+        """
+        if len(segment) == 0:
+            return self
+        segment = _conform(segment, self.sample_rate, self.channels)
+        offset = self.frame_at(position_ms)
+        for start, block in _iter_blocks(segment):
+            dest_start = max(0, offset + start)
+            dest_end = min(self.frame_count, offset + start + len(block))
+            if dest_end > dest_start:
+                self.samples[dest_start:dest_end] += block[dest_start - offset - start:dest_end - offset - start]
+        return self
+
+    def apply_gain(self, gain_db: float) -> "AudioBuffer":
+        if gain_db:
+            self.samples *= np.float32(10 ** (gain_db / 20.0))
+        return self
+
+    def fade_in(self, duration_ms: float) -> "AudioBuffer":
+        frames = min(self.frame_at(duration_ms), self.frame_count)
+        if frames > 0:
+            self.samples[:frames] *= np.linspace(0.0, 1.0, frames, dtype=np.float32)[:, None]
+        return self
+
+    def fade_out(self, duration_ms: float) -> "AudioBuffer":
+        frames = min(self.frame_at(duration_ms), self.frame_count)
+        if frames > 0:
+            self.samples[-frames:] *= np.linspace(1.0, 0.0, frames, dtype=np.float32)[:, None]
+        return self
+
+    def normalize(self, headroom_db: float = 0.1) -> "AudioBuffer":
+        """Peak normalization with the same headroom default as pydub.effects.normalize."""
+        peak = self.peak()
+        if peak > 0:
+            self.samples *= np.float32((10 ** (-headroom_db / 20.0)) / peak)
+        return self
+
+    # --- Derived buffers ---
+    def looped(self, duration_ms: float) -> "AudioBuffer":
+        """Returns a new buffer of exactly duration_ms, repeating this one as many times as needed."""
+        frames = self.frame_at(duration_ms)
+        if self.frame_count == 0:
+            return AudioBuffer.silent(duration_ms, self.sample_rate, self.channels)
+        looped = np.empty((frames, self.channels), dtype=np.float32)
+        for offset in range(0, frames, self.frame_count):
+            count = min(self.frame_count, frames - offset)
+            looped[offset:offset + count] = self.samples[:count]
+        return AudioBuffer(looped, self.sample_rate)
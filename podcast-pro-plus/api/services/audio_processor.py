@@ -1,16 +1,22 @@
+import math
 import os
 import time
+import threading
 from datetime import datetime
 from pydub import AudioSegment
-from pydub.effects import normalize
 from pathlib import Path
-from typing import List, Optional, Dict, Any, Set, Tuple
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 import re
 import json
 
 # Import the necessary models and services
-from ..models.podcast import PodcastTemplate, TemplateSegment, BackgroundMusicRule, SegmentTiming
-from . import ai_enhancer, transcription, keyword_detector
+from ..core.config import settings
+from ..models.podcast import PodcastTemplate, TemplateSegment, BackgroundMusicRule, SegmentTiming, TemplateRenderer, ExportProfile, CleanupSettings
+from . import ai_enhancer, transcription, keyword_detector, cut_list, streaming, ffmpeg_renderer, loudness, music_bed_cache, media_cache, pipeline, checkpoints, housekeeping
+from .disk_cache import hash_file
+from .rate_limiter import RateLimitedError
+from .audio_buffer import AudioBuffer
+from .word_timeline import WordTimeline
 from api.routers.media import MEDIA_DIR # Import MEDIA_DIR
 
 # The Recommended Fix: Tell pydub directly where FFmpeg is
@@ -31,6 +37,10 @@ TRANSCRIPTS_DIR = Path("transcripts")
 for d in [MEDIA_DIR, OUTPUT_DIR, AI_SEGMENTS_DIR, CLEANED_DIR, EDITED_DIR, TRANSCRIPTS_DIR]:
     d.mkdir(exist_ok=True);
 
+# Concurrent requests per provider while preparing template segments, shared by every episode in this process
+_openai_slots = threading.BoundedSemaphore(settings.OPENAI_MAX_CONCURRENT_REQUESTS)
+_elevenlabs_slots = threading.BoundedSemaphore(settings.ELEVENLABS_MAX_CONCURRENT_REQUESTS)
+
 class AudioProcessingError(Exception):
     """Custom exception for audio processing failures."""
     pass
@@ -43,6 +53,62 @@ def _format_timestamp(seconds: float) -> str:
     millis = int((seconds * 1000) % 1000)
     return f"{hours:02}:{minutes:02}:{secs:02},{millis:03}"
 
+def _prepare_segment(
+    segment_rule: TemplateSegment,
+    tts_overrides: Dict[str, str],
+    transcript_text: str,
+    elevenlabs_api_key: Optional[str]
+) -> Tuple[Optional[AudioSegment], List[str]]:
+    """
+    Produces the audio for one non-content template segment.
+    Returns (audio or None, log lines). Runs on a worker thread;
+    calls to each provider are capped by its semaphore across all episodes in this process.
+    """
+    segment_log = []
+    audio = None
+    if segment_rule.source.source_type == 'static':
+        static_path = MEDIA_DIR / segment_rule.source.filename # Use MEDIA_DIR here
+        if not static_path.exists():
+            segment_log.append(f"WARNING: Static file not found: {segment_rule.source.filename}. Skipping.")
+        else:
+            audio = media_cache.load(static_path)
+    elif segment_rule.source.source_type == 'ai_generated':
+        contextual_prompt = f"Based on the following podcast transcript, {segment_rule.source.prompt}:\n\n---\n\n{transcript_text}"
+        with _openai_slots:
+            generated_text = ai_enhancer.get_answer_for_topic(contextual_prompt)
+        with _elevenlabs_slots:
+            audio = ai_enhancer.generate_speech_from_text(generated_text, segment_rule.source.voice_id, api_key=elevenlabs_api_key)
+        segment_log.append(f"Generated AI segment for prompt: '{segment_rule.source.prompt}'")
+    elif segment_rule.source.source_type == 'tts':
+        script = tts_overrides.get(str(segment_rule.id), segment_rule.source.script)
+        with _elevenlabs_slots:
+            audio = ai_enhancer.generate_speech_from_text(script, segment_rule.source.voice_id, api_key=elevenlabs_api_key)
+        segment_log.append(f"Generated TTS segment from script.")
+    return audio, segment_log
+
+def _segment_checkpoint_key(segment_rule: TemplateSegment, tts_overrides: Dict[str, str], transcript_key: str) -> str:
+    """Everything a segment's audio depends on: its rule, its script override, the voice model, and for AI segments the transcript."""
+    source = segment_rule.source
+    inputs = [segment_rule.model_dump(mode='json', exclude={'id'}), tts_overrides.get(str(segment_rule.id))]
+    if source.source_type == 'static':
+        static_path = MEDIA_DIR / source.filename
+        inputs.append(hash_file(static_path) if static_path.exists() else None)
+    else:
+        inputs += [settings.ELEVENLABS_MODEL_ID, settings.ELEVENLABS_OUTPUT_FORMAT]
+        if source.source_type == 'ai_generated':
+            inputs.append(transcript_key)
+    return checkpoints.stage_key('segment', *inputs)
+
+_EXTENSIONS = {"ipod": "m4a", "mp4": "m4a", "adts": "aac", "matroska": "mka"}
+
+
+def _output_filename(base: str, profile: ExportProfile, primary: bool) -> str:
+    """The first profile keeps the plain episode filename; the others get their name appended."""
+    extension = _EXTENSIONS.get(profile.format, profile.format)
+    name = base if primary else f"{base}-{re.sub(r'[^a-z0-9_-]+', '-', profile.name.lower())}"
+    return f"{name}.{extension}"
+
+
 def process_and_assemble_episode(
     template: PodcastTemplate,
     main_content_filename: str,
@@ -50,10 +116,35 @@ def process_and_assemble_episode(
     cleanup_options: Dict[str, bool],
     tts_overrides: Dict[str, str],
     cover_image_path: Optional[str] = None,
-    elevenlabs_api_key: Optional[str] = None
-) -> Tuple[Path, List[str]]:
+    elevenlabs_api_key: Optional[str] = None,
+    export_profiles: Optional[List[ExportProfile]] = None
+) -> Tuple[Path, List[str], List[Dict[str, Any]]]:
     """
     The master function for the entire episode creation workflow.
+
+    The workflow is a graph of stages (see pipeline.run_stages). Loading the content,
+    transcribing it and preparing each template segment don't depend on each other,
+    so they run at the same time; cleanup, the transcript file, the mix and the
+    export each start as soon as what they need is ready.
+
+    Generated segments (AI and TTS), the stages that call paid providers, are checkpointed
+    under keys built from the content hashes and settings of their inputs. Running the
+    same episode again, e.g. after a failed export or a requeue, reuses them instead of
+    generating them again. Everything else is rebuilt cheaply from caches that already
+    persist: the transcript, the cut list made from it, and the loudness stats. A run's
+    checkpoints are deleted once its export succeeds.
+
+    Templates with renderer "ffmpeg" skip decoding and mixing in Python: the cut list,
+    segments and music rules are compiled into one ffmpeg filter graph (see ffmpeg_renderer).
+
+    Episodes are peak-normalized by default. With NORMALIZATION_MODE "loudness" they get a
+    single gain instead, estimated from the stored EBU R128 stats of the content and every
+    template asset (see loudness), so the finished mix is only measured when its peak might
+    limit that gain.
+
+    The mix is encoded once per export profile (EXPORT_PROFILES unless export_profiles is
+    given), every encoder fed from the same pass over it. Returns the first output's path,
+    the log, and a record of every output.
     """
     log = []
     total_start_time = time.time()
@@ -62,203 +153,394 @@ def process_and_assemble_episode(
     if cover_image_path:
         log.append(f"Cover image path: {cover_image_path}")
 
-    # --- Step 1: Load Main Content & Get Initial Transcript ---
-    step_start_time = time.time()
     content_path = MEDIA_DIR / main_content_filename # Use MEDIA_DIR here
     if not content_path.exists():
         raise AudioProcessingError(f"Main content file not found: {main_content_filename}")
-    
-    main_content_audio = AudioSegment.from_file(content_path)
-    log.append(f"Loaded main content: {main_content_filename}")
-    
-    word_timestamps = transcription.get_word_timestamps(main_content_filename)
-    log.append(f"[TIMING] Initial transcription took {time.time() - step_start_time:.2f}s")
-    
-    # --- Step 2: Content Cleanup ---
-    step_start_time = time.time()
-    cleaned_audio = main_content_audio
-    if cleanup_options.get('removeFillers') or cleanup_options.get('removePauses'):
-        default_fillers = {"um", "uh", "ah", "er", "like", "you know", "so", "actually"}
-        cleaned_audio = cleanup_audio(cleaned_audio, word_timestamps, default_fillers, 1.25, 500)
-        log.append("Applied filler word and pause removal.")
-    
-    cleaned_filename = f"cleaned_{Path(main_content_filename).stem}.mp3"
-    cleaned_path = CLEANED_DIR / cleaned_filename
-    cleaned_audio.export(cleaned_path, format="mp3")
-    log.append(f"Saved cleaned content to {cleaned_filename}")
-    log.append(f"[TIMING] Content cleanup took {time.time() - step_start_time:.2f}s")
 
-    # --- Step 3: Prepare Template Segments ---
-    step_start_time = time.time()
     # Parse segments, background music rules, and timing from JSON strings
     template_segments = [TemplateSegment.model_validate(s) for s in json.loads(template.segments_json)]
     template_background_music_rules = [BackgroundMusicRule.model_validate(r) for r in json.loads(template.background_music_rules_json)]
     template_timing = SegmentTiming.model_validate(json.loads(template.timing_json))
+    template_cleanup = CleanupSettings.model_validate(json.loads(template.cleanup_json))
 
-    processed_segments = []
-    for segment_rule in template_segments:
-        audio = None
-        if segment_rule.segment_type == 'content':
-            audio = cleaned_audio
-        elif segment_rule.source.source_type == 'static':
-            static_path = MEDIA_DIR / segment_rule.source.filename # Use MEDIA_DIR here
-            if not static_path.exists():
-                log.append(f"WARNING: Static file not found: {segment_rule.source.filename}. Skipping.")
-                continue
-            audio = AudioSegment.from_file(static_path)
-        elif segment_rule.source.source_type == 'ai_generated':
-            contextual_prompt = f"Based on the following podcast transcript, {segment_rule.source.prompt}:\n\n---\n\n{final_transcript_text}"
-            generated_text = ai_enhancer.get_answer_for_topic(contextual_prompt)
-            audio = ai_enhancer.generate_speech_from_text(generated_text, segment_rule.source.voice_id)
-            log.append(f"Generated AI segment for prompt: '{segment_rule.source.prompt}'")
-        elif segment_rule.source.source_type == 'tts':
-            script = tts_overrides.get(str(segment_rule.id), segment_rule.source.script)
-            audio = ai_enhancer.generate_speech_from_text(script, segment_rule.source.voice_id)
-            log.append(f"Generated TTS segment from script.")
-        if audio:
-            processed_segments.append((segment_rule, audio))
-    log.append(f"[TIMING] Template segments prepared in {time.time() - step_start_time:.2f}s")
-
-    intros = [audio for rule, audio in processed_segments if rule.segment_type == 'intro']
-    stitched_intros = sum(intros) if intros else AudioSegment.empty()
-    intro_len_ms = len(stitched_intros)
-
-    # --- Step 4: Final Transcript for AI Context & Saving ---
-    # We use the original word_timestamps to build the final transcript
-    final_transcript_text = " ".join([word['word'] for word in word_timestamps])
-    
-    # Calculate the intro length in seconds
-    intro_length_seconds = intro_len_ms / 1000.0
+    apply_cleanup = bool(cleanup_options.get('removeFillers') or cleanup_options.get('removePauses'))
+    # Long recordings are never decoded whole; they're streamed through ffmpeg in Step 6 instead.
+    use_streaming = streaming.should_stream(content_path)
+    # Templates can have ffmpeg mix and encode the whole episode as one filter graph in Step 6
+    use_ffmpeg = template.renderer == TemplateRenderer.ffmpeg
+    # Otherwise the content is decoded and mixed here in Python
+    decode_content = not (use_streaming or use_ffmpeg)
+    # Loudness normalization works out its gain from stored per-asset stats instead of measuring the mix
+    use_loudness = settings.NORMALIZATION_MODE == 'loudness'
+    has_content = any(segment_rule.segment_type == 'content' for segment_rule in template_segments)
+
+    # --- Checkpoint keys ---
+    # Only generated segments are checkpointed. Cleaned content and the mix would be hundreds of MB
+    # of PCM for a long episode, and are quick to rebuild from the transcript cache and stored loudness stats.
+    transcript_key = transcription.transcript_key(main_content_filename)
+    segment_keys = {
+        i: _segment_checkpoint_key(segment_rule, tts_overrides, transcript_key)
+        for i, segment_rule in enumerate(template_segments) if segment_rule.segment_type != 'content'
+    }
 
+    cleaned_filename = f"cleaned_{Path(main_content_filename).stem}.mp3"
+    cleaned_path = CLEANED_DIR / cleaned_filename
     # Sanitize output_filename for file system compatibility
     sanitized_output_filename = re.sub(r'[<>:"/\\|?*\s]+', '-', output_filename).lower()
-    transcript_filename = f"{sanitized_output_filename}.txt"
-    transcript_path = TRANSCRIPTS_DIR / transcript_filename
-    with open(transcript_path, "w", encoding="utf-8") as f:
-        # Group words into sentences or phrases for a cleaner transcript
-        current_line = ""
-        line_start_time = 0
-        for i in range(len(word_timestamps)):
-            word_data = word_timestamps[i]
-            
+    if export_profiles is None:
+        export_profiles = [ExportProfile.model_validate(profile) for profile in settings.EXPORT_PROFILES]
+    if not export_profiles:
+        raise AudioProcessingError("At least one export profile is required.")
+    export_targets = [
+        streaming.EncodeTarget(
+            OUTPUT_DIR / _output_filename(sanitized_output_filename, profile, primary=(i == 0)), profile.format,
+            streaming.encoder_args(profile.codec, profile.bitrate, profile.channels, profile.sample_rate)
+        )
+        for i, profile in enumerate(export_profiles)
+    ]
+
+    # --- Step 1: Load Main Content ---
+    def load_content(results, stage_log):
+        if not decode_content:
+            duration_s, sample_rate, channels = streaming.probe(content_path)
+            mode = "Rendering main content with ffmpeg" if use_ffmpeg else "Streaming main content"
+            stage_log.append(f"{mode}: {main_content_filename} ({duration_s / 60:.1f} min)")
+            return {'decoded': False, 'audio': None, 'duration_s': duration_s, 'sample_rate': sample_rate, 'channels': channels}
+        audio = AudioSegment.from_file(content_path)
+        stage_log.append(f"Loaded main content: {main_content_filename}")
+        return {'decoded': True, 'audio': audio}
+
+    # --- Step 1b: Initial Transcript ---
+    def transcribe(results, stage_log):
+        return transcription.get_word_timestamps(main_content_filename)
+
+    # --- Step 1c: Content Loudness ---
+    def content_loudness(results, stage_log):
+        # Measured from the upload, once per file. Cleanup barely moves it: BS.1770 gating already ignores pauses.
+        return loudness.file_stats(content_path) if (use_loudness and has_content) else None
+
+    # --- Step 2: Content Cleanup ---
+    def clean_content(results, stage_log):
+        content = results['load_content']
+        word_timestamps = results['transcribe']
+        if not content['decoded']:
+            # Only the cut list is computed here; it's applied as the content is read for the mix.
+            content_length_ms = int(content['duration_s'] * 1000)
+            if apply_cleanup and word_timestamps:
+                content_cut_list = cut_list.build_cut_list(
+                    word_timestamps, template_cleanup.filler_words, template_cleanup.min_pause_s, template_cleanup.leave_pause_ms, content_length_ms
+                )
+                stage_log.append("Planned filler word and pause removal.")
+            else:
+                content_cut_list = [cut_list.Edit(0, content_length_ms)]
+            return {'audio': None, 'cut_list': content_cut_list, 'length_ms': streaming.cut_list_length_ms(content_cut_list)}
+        cleaned_audio = content['audio']
+        if apply_cleanup:
+            cleaned_audio = cleanup_audio(
+                cleaned_audio, word_timestamps, template_cleanup.filler_words, template_cleanup.min_pause_s, template_cleanup.leave_pause_ms
+            )
+            stage_log.append("Applied filler word and pause removal.")
+        cleaned_audio.export(cleaned_path, format="mp3")
+        stage_log.append(f"Saved cleaned content to {cleaned_filename}")
+        return {'audio': cleaned_audio, 'cut_list': None, 'length_ms': len(cleaned_audio)}
+
+    # --- Step 3: Prepare Template Segments ---
+    def segment_deps(segment_rule) -> Tuple[str, ...]:
+        # The transcript is needed as context for AI-generated segments; nothing else waits for it
+        return ('transcribe',) if segment_rule.source.source_type == 'ai_generated' else ()
+
+    def prepare_segment(i, segment_rule):
+        # Static segments come from the decoded media cache; only generated ones are worth checkpointing
+        checkpointed = segment_rule.source.source_type != 'static'
+
+        def run(results, stage_log):
+            if checkpointed:
+                audio = checkpoints.load_segment(segment_keys[i])
+                if audio is not None:
+                    stage_log.append(f"Resumed segment {i + 1} from checkpoint.")
+                    return audio
+            transcript_text = results['transcribe'].text() if segment_deps(segment_rule) else ""
+            audio, segment_log = _prepare_segment(segment_rule, tts_overrides, transcript_text, elevenlabs_api_key)
+            stage_log.extend(segment_log)
+            if checkpointed and audio is not None:
+                checkpoints.save_segment(segment_keys[i], audio)
+            return audio
+        return run
+
+    segment_stages = {
+        i: f"segment_{i + 1}_{segment_rule.segment_type}_{segment_rule.source.source_type}"
+        for i, segment_rule in enumerate(template_segments) if segment_rule.segment_type != 'content'
+    }
+
+    def segment_loudness(segment_rule, audio) -> loudness.LoudnessStats:
+        if segment_rule.source.source_type == 'static':
+            return loudness.file_stats(MEDIA_DIR / segment_rule.source.filename)
+        return loudness.segment_stats(audio)
+
+    def ordered_segments(results) -> List[Tuple[TemplateSegment, Any]]:
+        """Template segments paired with their audio, in template order. Content is the cleaned audio."""
+        processed_segments = []
+        for i, segment_rule in enumerate(template_segments):
+            audio = results['clean_content']['audio'] if segment_rule.segment_type == 'content' else results[segment_stages[i]]
+            # When the content isn't decoded here, the cleaned content is a placeholder until the final mix
+            if audio is not None or segment_rule.segment_type == 'content':
+                processed_segments.append((segment_rule, audio))
+        return processed_segments
+
+    # --- Step 4: Final Transcript Saving ---
+    def write_transcript(results, stage_log):
+        word_timestamps = results['transcribe']
+        # Calculate the intro length in seconds
+        intro_length_seconds = results['mix']['intro_len_ms'] / 1000.0
+
+        transcript_filename = f"{sanitized_output_filename}.txt"
+        transcript_path = TRANSCRIPTS_DIR / transcript_filename
+        with open(transcript_path, "w", encoding="utf-8") as f:
+            # Group words into sentences or phrases for a cleaner transcript
+            words = word_timestamps.words()
             # Apply time shift to timestamps
-            shifted_start_s = word_data['start'] + intro_length_seconds
-            shifted_end_s = word_data['end'] + intro_length_seconds
-
-            if not current_line:
-                line_start_time = shifted_start_s
-            
-            current_line += word_data['word'] + " "
-            
-            # End line after about 15 words or if there's a long pause
-            is_last_word = (i == len(word_timestamps) - 1)
-            long_pause = False
-            if not is_last_word:
-                pause = word_timestamps[i+1]['start'] - word_data['end']
-                if pause > 0.7:
-                    long_pause = True
-
-            if len(current_line.split()) >= 15 or is_last_word or long_pause:
-                line_end_time = shifted_end_s
-                f.write(f"[{_format_timestamp(line_start_time)} --> {_format_timestamp(line_end_time)}]\n")
-                f.write(f"{current_line.strip()}\n\n")
-                current_line = ""
-
-    log.append(f"Saved final timestamped transcript to {transcript_filename}")
+            shifted_starts = (word_timestamps.starts + intro_length_seconds).tolist()
+            shifted_ends = (word_timestamps.ends + intro_length_seconds).tolist()
+            long_pauses = (word_timestamps.starts[1:] - word_timestamps.ends[:-1] > 0.7).tolist() + [False]
+            current_line = []
+            line_word_count = 0
+            line_start_time = 0
+            for i, word in enumerate(words):
+                if not current_line:
+                    line_start_time = shifted_starts[i]
+                current_line.append(word)
+                line_word_count += len(word.split())
+
+                # End line after about 15 words or if there's a long pause
+                is_last_word = (i == len(words) - 1)
+                if line_word_count >= 15 or is_last_word or long_pauses[i]:
+                    f.write(f"[{_format_timestamp(line_start_time)} --> {_format_timestamp(shifted_ends[i])}]\n")
+                    f.write(f"{' '.join(current_line).strip()}\n\n")
+                    current_line = []
+                    line_word_count = 0
+
+        stage_log.append(f"Saved final timestamped transcript to {transcript_filename}")
+        return transcript_path
 
     # --- Step 5: Stitch with Overlaps & Apply Music ---
-    step_start_time = time.time()
-    intros = [audio for rule, audio in processed_segments if rule.segment_type == 'intro']
-    content_segments = [audio for rule, audio in processed_segments if rule.segment_type == 'content']
-    outros = [audio for rule, audio in processed_segments if rule.segment_type == 'outro']
-    
-    stitched_intros = sum(intros) if intros else AudioSegment.empty()
-    stitched_content = sum(content_segments) if content_segments else AudioSegment.empty()
-    stitched_outros = sum(outros) if outros else AudioSegment.empty()
-
-    intro_len_ms = len(stitched_intros)
-    content_len_ms = len(stitched_content)
-    outro_len_ms = len(stitched_outros)
-
-    content_start_ms = intro_len_ms + (template_timing.content_start_offset_s * 1000)
-    outro_start_ms = content_start_ms + content_len_ms + (template_timing.outro_start_offset_s * 1000)
-
-    total_duration_ms = max(intro_len_ms, content_start_ms + content_len_ms, outro_start_ms + outro_len_ms)
-    
-    final_audio = AudioSegment.silent(duration=total_duration_ms)
-
-    final_audio = final_audio.overlay(stitched_intros, position=0)
-    final_audio = final_audio.overlay(stitched_content, position=content_start_ms)
-    final_audio = final_audio.overlay(stitched_outros, position=outro_start_ms)
-    
-    for music_rule in template_background_music_rules:
-        music_path = MEDIA_DIR / music_rule.music_filename # Use MEDIA_DIR here
-        if not music_path.exists(): continue
-        background_music = AudioSegment.from_file(music_path)
-        
-        if 'intro' in music_rule.apply_to_segments and intro_len_ms > 0:
-            start_pos = music_rule.start_offset_s * 1000
-            end_pos = intro_len_ms - (music_rule.end_offset_s * 1000)
-            music_duration = end_pos - start_pos
-            if music_duration > 0:
-                music_to_apply = background_music
-                if len(music_to_apply) < music_duration:
-                    multiplier = int((music_duration / len(music_to_apply)) + 1)
-                    music_to_apply *= multiplier
-                music_to_apply = music_to_apply[:music_duration].fade_in(int(music_rule.fade_in_s * 1000)).fade_out(int(music_rule.fade_out_s * 1000))
-                final_audio = final_audio.overlay(music_to_apply + music_rule.volume_db, position=start_pos)
-
-    log.append(f"[TIMING] Stitching and music application took {time.time() - step_start_time:.2f}s")
+    def mix(results, stage_log):
+        content = results['load_content']
+        cleaned = results['clean_content']
+        processed_segments = ordered_segments(results)
+        intro_segments = [(rule, audio) for rule, audio in processed_segments if rule.segment_type == 'intro']
+        outro_segments = [(rule, audio) for rule, audio in processed_segments if rule.segment_type == 'outro']
+        intros = [audio for rule, audio in intro_segments]
+        content_segments = [audio for rule, audio in processed_segments if rule.segment_type == 'content']
+        outros = [audio for rule, audio in outro_segments]
+
+        stitched_intros = sum(intros) if intros else AudioSegment.empty()
+        stitched_outros = sum(outros) if outros else AudioSegment.empty()
+        if not content['decoded']:
+            stitched_content = AudioSegment.empty()
+            content_len_ms = cleaned['length_ms'] if content_segments else 0
+        else:
+            stitched_content = sum(content_segments) if content_segments else AudioSegment.empty()
+            content_len_ms = len(stitched_content)
+
+        intro_len_ms = len(stitched_intros)
+        outro_len_ms = len(stitched_outros)
+
+        content_start_ms = intro_len_ms + (template_timing.content_start_offset_s * 1000)
+        outro_start_ms = content_start_ms + content_len_ms + (template_timing.outro_start_offset_s * 1000)
+
+        total_duration_ms = max(intro_len_ms, content_start_ms + content_len_ms, outro_start_ms + outro_len_ms)
+
+        # Mix into a single float buffer in the widest format of the inputs (as pydub's overlay would),
+        # converting back to an AudioSegment only for export.
+        mix_inputs = [seg for seg in (stitched_intros, stitched_content, stitched_outros) if len(seg) > 0]
+        sample_rate = max((seg.frame_rate for seg in mix_inputs), default=44100)
+        channels = max((seg.channels for seg in mix_inputs), default=2)
+        sample_width = max((seg.sample_width for seg in mix_inputs), default=2)
+        if use_ffmpeg:
+            # Everything is mixed by the filter graph in Step 6; only the generated intros and outros are held here.
+            sample_rate, channels = max(sample_rate, content['sample_rate']), max(channels, content['channels'])
+            final_mix = None
+            layers = [(seg, position_ms) for seg, position_ms in ((stitched_intros, 0), (stitched_outros, outro_start_ms)) if len(seg) > 0]
+        elif not content['decoded']:
+            # Streamed content is mixed block by block in Step 6; only intros, outros and music are held here.
+            sample_rate, channels = max(sample_rate, content['sample_rate']), max(channels, content['channels'])
+            final_mix = None
+            layers = [
+                (AudioBuffer.from_segment(seg, sample_rate, channels), position_ms)
+                for seg, position_ms in ((stitched_intros, 0), (stitched_outros, outro_start_ms)) if len(seg) > 0
+            ]
+        else:
+            final_mix = AudioBuffer.silent(total_duration_ms, sample_rate, channels)
+            final_mix.overlay_segment(stitched_intros, position_ms=0)
+            final_mix.overlay_segment(stitched_content, position_ms=content_start_ms)
+            final_mix.overlay_segment(stitched_outros, position_ms=outro_start_ms)
+            layers = None
+
+        music_beds = []
+        music_layers = []
+        for music_rule in template_background_music_rules:
+            music_path = MEDIA_DIR / music_rule.music_filename # Use MEDIA_DIR here
+            if not music_path.exists(): continue
+
+            if 'intro' in music_rule.apply_to_segments and intro_len_ms > 0:
+                start_pos = music_rule.start_offset_s * 1000
+                end_pos = intro_len_ms - (music_rule.end_offset_s * 1000)
+                music_duration = end_pos - start_pos
+                if music_duration > 0 and use_loudness:
+                    music_layers.append(loudness.Layer(loudness.file_stats(music_path), start_pos, music_duration, music_rule.volume_db))
+                if music_duration > 0 and use_ffmpeg:
+                    music_beds.append(ffmpeg_renderer.MusicBed(
+                        music_path, start_pos, music_duration,
+                        music_rule.fade_in_s * 1000, music_rule.fade_out_s * 1000, music_rule.volume_db
+                    ))
+                elif music_duration > 0:
+                    # Looping, fading and gain depend only on the rule and intro length, so the bed is cached across episodes
+                    music_to_apply = music_bed_cache.get_bed(
+                        music_path, music_duration,
+                        music_rule.fade_in_s * 1000, music_rule.fade_out_s * 1000, music_rule.volume_db,
+                        sample_rate, channels
+                    )
+                    if final_mix is None:
+                        layers.append((music_to_apply, start_pos))
+                    else:
+                        final_mix.overlay(music_to_apply, position_ms=start_pos)
+
+        gain_db = None
+        peak_limited = False
+        if use_loudness:
+            layers_loudness = list(music_layers)
+            for segments, position_ms in ((intro_segments, 0), (outro_segments, outro_start_ms)):
+                for rule, audio in segments:
+                    layers_loudness.append(loudness.Layer(segment_loudness(rule, audio), position_ms, len(audio)))
+                    position_ms += len(audio)
+            if content_segments and results['content_loudness'] is not None:
+                layers_loudness.append(loudness.Layer(results['content_loudness'], content_start_ms, content_len_ms))
+            integrated_lufs, true_peak_dbtp = loudness.estimate_mix(layers_loudness, channels)
+            gain_db = loudness.normalization_gain_db(integrated_lufs, None)
+            # The estimated peak is an upper bound, so it only tells whether the peak could limit the gain.
+            # When it could, the rendered mix's peak is measured at export instead.
+            peak_limited = gain_db > loudness.normalization_gain_db(integrated_lufs, true_peak_dbtp)
+            if integrated_lufs is not None:
+                stage_log.append(
+                    f"Loudness: estimated {integrated_lufs:.1f} LUFS; applying {gain_db:+.1f}dB for {settings.LOUDNESS_TARGET_LUFS:.1f} LUFS"
+                    + (f", less if the mix peaks above {settings.LOUDNESS_MAX_TRUE_PEAK_DBTP:.1f}dB." if peak_limited else ".")
+                )
+
+        return {
+            'has_content': bool(content_segments), 'sample_rate': sample_rate, 'channels': channels,
+            'sample_width': sample_width, 'total_duration_ms': total_duration_ms,
+            'content_start_ms': content_start_ms, 'intro_len_ms': intro_len_ms, 'gain_db': gain_db,
+            'peak_ceiling_db': settings.LOUDNESS_MAX_TRUE_PEAK_DBTP if peak_limited else None,
+            'final_mix': final_mix, 'layers': layers, 'music_beds': music_beds,
+        }
 
     # --- Step 6: Finalize ---
-    step_start_time = time.time()
-    final_audio = normalize(final_audio)
-    output_path = OUTPUT_DIR / f"{sanitized_output_filename}.mp3" # Use sanitized_output_filename here
-    
-    # Export with cover image if provided
-    if cover_image_path and Path(cover_image_path).exists():
-        try:
-            final_audio.export(output_path, format="mp3", tags={'album_art': cover_image_path})
-            log.append(f"Exported final audio with cover image to {output_path}")
-        except Exception as e:
-            log.append(f"WARNING: Failed to embed cover image {cover_image_path}: {e}. Exporting without cover.")
-            final_audio.export(output_path, format="mp3")
-    else:
-        final_audio.export(output_path, format="mp3")
-    
-    log.append(f"[TIMING] Final normalization and export took {time.time() - step_start_time:.2f}s")
-    
+    def export(results, stage_log):
+        mixed = results['mix']
+        # A loudness gain is applied as is, or capped by the mix's measured peak when that could limit it;
+        # without one the renderers peak-normalize the mix
+        if mixed['gain_db'] is None:
+            normalization = {}
+        elif mixed['peak_ceiling_db'] is not None:
+            normalization = {'normalize_headroom_db': -mixed['peak_ceiling_db'], 'max_gain_db': mixed['gain_db']}
+        else:
+            normalization = {'normalize_headroom_db': None, 'gain_db': mixed['gain_db']}
+        tags = {'album_art': cover_image_path} if cover_image_path and Path(cover_image_path).exists() else None
+        output_names = ', '.join(target.path.name for target in export_targets)
+
+        if use_ffmpeg:
+            ffmpeg_renderer.render_episode(
+                export_targets, mixed['sample_rate'], mixed['channels'], mixed['total_duration_ms'],
+                mixed['layers'], mixed['music_beds'],
+                content_path=content_path if mixed['has_content'] else None,
+                content_cut_list=results['clean_content']['cut_list'],
+                content_start_ms=mixed['content_start_ms'],
+                tags=tags,
+                cleaned_output_path=cleaned_path,
+                **normalization
+            )
+            stage_log.append(f"Saved cleaned content to {cleaned_filename}")
+            stage_log.append(f"Rendered final audio with ffmpeg to {output_names}")
+        elif use_streaming:
+            sample_rate, channels = mixed['sample_rate'], mixed['channels']
+            content_cut_list = results['clean_content']['cut_list']
+            streaming.render_episode(
+                export_targets, sample_rate, channels, mixed['total_duration_ms'], mixed['layers'],
+                content_factory=(lambda: streaming.CutListStream(content_path, content_cut_list, sample_rate, channels)) if mixed['has_content'] else None,
+                content_start_ms=mixed['content_start_ms'],
+                tags=tags,
+                cleaned_output_path=cleaned_path,
+                **normalization
+            )
+            stage_log.append(f"Saved cleaned content to {cleaned_filename}")
+            stage_log.append(f"Streamed final audio to {output_names}")
+        else:
+            final_mix = mixed['final_mix']
+            gain_db = mixed['gain_db']
+            if gain_db is None:
+                final_mix.normalize()
+            elif mixed['peak_ceiling_db'] is not None and final_mix.peak() > 0:
+                gain_db = min(gain_db, mixed['peak_ceiling_db'] - 20 * math.log10(final_mix.peak()))
+            gain = 10 ** ((gain_db or 0.0) / 20.0)
+            # The mix is already in memory, so it's fed to every encoder at once rather than converted and exported per format
+            encoders = [
+                streaming.StreamEncoder.for_target(target, final_mix.sample_rate, final_mix.channels, tags=tags, sample_width=mixed['sample_width'])
+                for target in export_targets
+            ]
+            with streaming.EncoderGroup(encoders) as group:
+                for start in range(0, final_mix.frame_count, streaming.BLOCK_FRAMES):
+                    group.write(final_mix.samples[start:start + streaming.BLOCK_FRAMES], gain)
+            stage_log.append(f"Exported final audio to {output_names}")
+
+        return [
+            {
+                'profile': profile.name, 'format': profile.format, 'codec': profile.codec, 'bitrate': profile.bitrate,
+                'channels': profile.channels or mixed['channels'], 'sample_rate': profile.sample_rate or mixed['sample_rate'],
+                'path': str(target.path), 'bytes': target.path.stat().st_size,
+            }
+            for profile, target in zip(export_profiles, export_targets)
+        ]
+
+    stage_retries = settings.PIPELINE_STAGE_RETRIES
+    stages = [
+        pipeline.Stage('load_content', load_content),
+        pipeline.Stage('transcribe', transcribe, retries=stage_retries),
+        pipeline.Stage('content_loudness', content_loudness),
+        pipeline.Stage('clean_content', clean_content, ('load_content', 'transcribe')),
+        *[
+            pipeline.Stage(name, prepare_segment(i, template_segments[i]), segment_deps(template_segments[i]), retries=stage_retries)
+            for i, name in segment_stages.items()
+        ],
+        pipeline.Stage('mix', mix, ('load_content', 'content_loudness', 'clean_content', *segment_stages.values())),
+        pipeline.Stage('write_transcript', write_transcript, ('transcribe', 'mix')),
+        pipeline.Stage('export', export, ('mix',), retries=stage_retries),
+    ]
+    results = pipeline.run_stages(
+        stages, settings.PIPELINE_MAX_WORKERS, log,
+        # Throttling is handled by requeuing the task, and bad input won't get better by retrying
+        retry_if=lambda e: not isinstance(e, (RateLimitedError, AudioProcessingError))
+    )
+    log.append(f"[CACHE] Decoded media cache: {media_cache.stats()}")
+    # The episode is exported, so nothing will resume from this run's checkpoints
+    checkpoints.delete(segment_keys.values())
+
+    # Intermediate files are only reused through checkpoints, so the work directories can be trimmed freely
+    pruned = housekeeping.prune_work_dirs([AI_SEGMENTS_DIR, CLEANED_DIR, EDITED_DIR])
+    if pruned:
+        log.append(f"Pruned {pruned} old work files.")
+
     log.append(f"--- Workflow Finished. Total time: {time.time() - total_start_time:.2f}s ---")
-    return output_path, log
+    outputs = results['export']
+    return Path(outputs[0]['path']), log, outputs
 
 
 def cleanup_audio(
     audio_segment: AudioSegment,
-    word_timestamps: List[Dict[str, Any]],
-    filler_words: Set[str],
+    word_timestamps: WordTimeline,
+    filler_words: Iterable[str],
     min_pause_s: float,
     leave_pause_ms: int
 ) -> AudioSegment:
     if not word_timestamps: return audio_segment
-    final_audio = AudioSegment.empty()
-    last_cut_end_ms = 0
-    first_word_start_s = word_timestamps[0]['start']
-    if first_word_start_s > min_pause_s:
-        final_audio += AudioSegment.silent(duration=leave_pause_ms)
-        last_cut_end_ms = int(first_word_start_s * 1000)
-    for i in range(len(word_timestamps)):
-        word_data = word_timestamps[i]
-        word_text = word_data['word'].strip().lower()
-        start_s, end_s = word_data['start'], word_data['end']
-        final_audio += audio_segment[last_cut_end_ms:int(start_s * 1000)]
-        if word_text not in filler_words:
-            final_audio += audio_segment[int(start_s * 1000):int(end_s * 1000)]
-        last_cut_end_ms = int(end_s * 1000)
-        if i < len(word_timestamps) - 1:
-            start_of_next_word_s = word_timestamps[i+1]['start']
-            pause_duration_s = start_of_next_word_s - end_s
-            if pause_duration_s > min_pause_s:
-                final_audio += AudioSegment.silent(duration=leave_pause_ms)
-                last_cut_end_ms = int(start_of_next_word_s * 1000)
-    final_audio += audio_segment[last_cut_end_ms:]
-    return final_audio
\ No newline at end of file
+    edits = cut_list.build_cut_list(word_timestamps, filler_words, min_pause_s, leave_pause_ms, len(audio_segment))
+    return cut_list.render_cut_list(audio_segment, edits)
\ No newline at end of file
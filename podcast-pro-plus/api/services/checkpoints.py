@@ -0,0 +1,76 @@
+import json
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from pydub import AudioSegment
+
+from ..core.config import settings
+from .disk_cache import DiskCache, make_key
+
+# Bump when the on-disk layout changes; old checkpoints then simply stop matching.
+FORMAT_VERSION = 1
+# Entries are magic, a little-endian u32 header length, a JSON header, then raw sample data
+_MAGIC = b"PPCK"
+_PREFIX = struct.Struct("<4sI")
+
+store = DiskCache(Path(settings.CHECKPOINT_DIR), settings.CHECKPOINT_MAX_BYTES, suffix=".ckpt")
+
+
+def stage_key(stage: str, *inputs: Any) -> str:
+    """
+    A checkpoint key for a stage's output, built from content hashes and settings
+    of everything that went into it, so any change to the inputs means a fresh run.
+    """
+    return make_key(FORMAT_VERSION, stage, *inputs)
+
+
+def _write(key: str, header: Dict[str, Any], data) -> None:
+    header_bytes = json.dumps(header).encode("utf-8")
+    store.put_chunks(key, (_PREFIX.pack(_MAGIC, len(header_bytes)), header_bytes, data))
+
+
+def _read(key: str) -> Optional[Tuple[Path, Dict[str, Any], int]]:
+    """Returns (path, header, data offset) of a valid entry, or None. Invalid entries are deleted."""
+    path = store.lookup(key)
+    if path is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            magic, header_length = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != _MAGIC:
+                raise ValueError("Not a checkpoint.")
+            header = json.loads(f.read(header_length))
+        offset = _PREFIX.size + header_length
+        # A checkpoint cut short by a crash mid-write never replaced a good one (puts are atomic),
+        # but check the size anyway so a damaged file is recomputed rather than mixed in
+        if path.stat().st_size - offset != header["data_bytes"]:
+            raise ValueError("Checkpoint is truncated.")
+        return path, header, offset
+    except (OSError, ValueError, KeyError, struct.error):
+        store.delete(key)
+        return None
+
+
+def save_segment(key: str, segment: AudioSegment) -> None:
+    header = {
+        "kind": "segment", "sample_width": segment.sample_width, "frame_rate": segment.frame_rate,
+        "channels": segment.channels, "data_bytes": len(segment.raw_data),
+    }
+    _write(key, header, segment.raw_data)
+
+
+def load_segment(key: str) -> Optional[AudioSegment]:
+    entry = _read(key)
+    if entry is None or entry[1].get("kind") != "segment":
+        return None
+    path, header, offset = entry
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    return AudioSegment(data=data, sample_width=header["sample_width"], frame_rate=header["frame_rate"], channels=header["channels"])
+
+
+def delete(keys: Iterable[str]) -> None:
+    for key in keys:
+        store.delete(key)
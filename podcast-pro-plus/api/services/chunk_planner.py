@@ -0,0 +1,126 @@
+from typing import Any, Callable, Dict, List, NamedTuple
+
+import numpy as np
+from pydub import AudioSegment
+
+# OpenAI Whisper API rejects uploads over 25MB
+WHISPER_MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+# Leave room for MP3 framing/ID3 overhead on top of the nominal bitrate
+UPLOAD_SAFETY_FACTOR = 0.95
+
+# Boundaries are analysed at a low rate in mono; that's plenty to find pauses in speech
+ANALYSIS_SAMPLE_RATE = 16000
+# How far before the size limit we look for a pause to cut in
+SEARCH_WINDOW_MS = 30 * 1000
+# A pause must be at least this long to cut in it
+MIN_SILENCE_MS = 300
+FRAME_MS = 10
+# A window counts as silent if it's below this level, or this far below the window's median level
+SILENCE_THRESHOLD_DBFS = -40.0
+SILENCE_RELATIVE_DB = 20.0
+# When there's no pause to cut in, neighbouring chunks overlap by this much
+# and duplicate words are resolved at the midpoint
+OVERLAP_MS = 4 * 1000
+
+
+class Chunk(NamedTuple):
+    """
+    A span of the source to transcribe. Words whose start falls in
+    [keep_from_ms, keep_until_ms) belong to this chunk; the rest of the span
+    is overlap that the neighbouring chunk owns.
+    """
+    start_ms: int
+    end_ms: int
+    keep_from_ms: int
+    keep_until_ms: int
+
+    @property
+    def duration_ms(self) -> int:
+        return self.end_ms - self.start_ms
+
+
+def max_chunk_ms(bitrate_kbps: int, max_duration_s: float) -> int:
+    """The longest chunk that encodes under the upload limit at the given bitrate, capped at max_duration_s."""
+    by_size_ms = int(WHISPER_MAX_UPLOAD_BYTES * UPLOAD_SAFETY_FACTOR * 8 / (bitrate_kbps * 1000) * 1000)
+    return min(by_size_ms, int(max_duration_s * 1000))
+
+
+def segment_window(audio: AudioSegment, start_ms: int, duration_ms: int) -> np.ndarray:
+    """Returns part of an in-memory segment as mono float32 samples at ANALYSIS_SAMPLE_RATE."""
+    window = audio[start_ms:start_ms + duration_ms].set_channels(1).set_frame_rate(ANALYSIS_SAMPLE_RATE).set_sample_width(2)
+    return np.frombuffer(window.raw_data, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def find_pause(samples: np.ndarray) -> int:
+    """
+    Returns the offset in ms of the latest sustained pause in the samples
+    (so chunks come out as long as allowed), or -1 if nothing is quiet enough to cut in.
+    """
+    frame = ANALYSIS_SAMPLE_RATE * FRAME_MS // 1000
+    frames = len(samples) // frame
+    span = MIN_SILENCE_MS // FRAME_MS
+    if frames < span:
+        return -1
+    energy = np.square(samples[:frames * frame].reshape(frames, frame)).mean(axis=1)
+    # Mean energy over each run of `span` frames, so a single quiet frame inside speech doesn't qualify
+    cumulative = np.concatenate(([0.0], np.cumsum(energy)))
+    sustained = (cumulative[span:] - cumulative[:-span]) / span
+    levels_db = 10 * np.log10(sustained + 1e-12)
+    threshold = max(SILENCE_THRESHOLD_DBFS, float(np.median(levels_db)) - SILENCE_RELATIVE_DB)
+    quiet = np.flatnonzero(levels_db <= threshold)
+    if not len(quiet):
+        return -1
+    return (int(quiet[-1]) + span // 2) * FRAME_MS
+
+
+def plan_chunks(
+    duration_ms: int,
+    read_window: Callable[[int, int], np.ndarray],
+    chunk_limit_ms: int
+) -> List[Chunk]:
+    """
+    Splits a recording into chunks of at most chunk_limit_ms, cutting in a pause
+    shortly before each limit where there is one, and overlapping the chunks
+    where there isn't. read_window(start_ms, duration_ms) must return mono
+    float32 samples at ANALYSIS_SAMPLE_RATE.
+    """
+    boundaries = []  # (cut_ms, overlapped)
+    position, chunk_start = 0, 0
+    while duration_ms - chunk_start > chunk_limit_ms:
+        # Overlapped chunks run OVERLAP_MS / 2 past their cut, so leave room for that under the limit.
+        # The limit counts from where the chunk starts, which after an overlapped cut is OVERLAP_MS / 2 before it.
+        limit = chunk_start + chunk_limit_ms - OVERLAP_MS // 2
+        window_start = max(position + OVERLAP_MS, limit - SEARCH_WINDOW_MS)
+        pause_ms = find_pause(read_window(window_start, limit - window_start))
+        if pause_ms >= 0:
+            cut, overlapped = window_start + pause_ms, False
+        else:
+            cut, overlapped = limit, True
+        boundaries.append((cut, overlapped))
+        position = cut
+        chunk_start = cut - OVERLAP_MS // 2 if overlapped else cut
+
+    chunks = []
+    keep_from, start = 0, 0
+    for cut, overlapped in boundaries:
+        end = cut + OVERLAP_MS // 2 if overlapped else cut
+        chunks.append(Chunk(start, end, keep_from, cut))
+        start = cut - OVERLAP_MS // 2 if overlapped else cut
+        keep_from = cut
+    chunks.append(Chunk(start, duration_ms, keep_from, duration_ms + 1))
+    return chunks
+
+
+def stitch(chunks: List[Chunk], chunk_words: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Shifts each chunk's words (timed from the start of the chunk) onto the
+    recording's timeline and drops the copies of words transcribed twice in an overlap.
+    """
+    all_words = []
+    for chunk, words in zip(chunks, chunk_words):
+        offset_s = chunk.start_ms / 1000.0
+        for word in words:
+            start_s = word['start'] + offset_s
+            if chunk.keep_from_ms <= start_s * 1000 < chunk.keep_until_ms:
+                all_words.append({'word': word['word'], 'start': start_s, 'end': word['end'] + offset_s})
+    return all_words
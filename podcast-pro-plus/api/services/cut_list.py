@@ -0,0 +1,154 @@
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, NamedTuple, Union
+
+import numpy as np
+from pydub import AudioSegment
+
+from .word_timeline import WordTimeline
+
+
+class Edit(NamedTuple):
+    """
+    One entry of a cut list. Either a slice [start_ms, end_ms) of the source
+    audio, or (when silence=True) end_ms - start_ms of inserted silence.
+    """
+    start_ms: int
+    end_ms: int
+    silence: bool = False
+
+    @property
+    def duration_ms(self) -> int:
+        return max(0, self.end_ms - self.start_ms)
+
+
+def ms_to_frame(ms: float, frame_rate: int) -> int:
+    """The frame at ms, truncated exactly as pydub does it (ms * (frame_rate / 1000.0)), so every renderer cuts at the same frame."""
+    return int(ms * (frame_rate / 1000.0))
+
+
+@lru_cache(maxsize=None)
+def silence_frames(duration_ms: int, frame_rate: int) -> int:
+    """
+    Length in frames of duration_ms of inserted silence. This is sized exactly as pydub
+    converts AudioSegment.silent() (made at 11025Hz) to frame_rate, which can be a few
+    frames short of duration_ms, so every renderer cuts the same episode length.
+    """
+    return int(AudioSegment.silent(duration=duration_ms).set_frame_rate(frame_rate).frame_count())
+
+
+def edits_to_array(cut_list: List[Edit]) -> np.ndarray:
+    """A cut list as an (N, 3) int64 array of [start_ms, end_ms, silence] rows, for storing or sending as is."""
+    array = np.array([tuple(edit) for edit in cut_list], dtype=np.int64)
+    return array.reshape(-1, 3)
+
+
+def edits_from_array(array: np.ndarray) -> List[Edit]:
+    return [Edit(start_ms, end_ms, bool(silence)) for start_ms, end_ms, silence in np.asarray(array).tolist()]
+
+
+def build_cut_array(
+    timeline: WordTimeline,
+    filler_words: Iterable[str],
+    min_pause_s: float,
+    leave_pause_ms: int,
+    audio_length_ms: int
+) -> np.ndarray:
+    """
+    Computes the edit decision list for filler word and pause removal as an array
+    (see edits_to_array), with every step done over whole columns instead of per word.
+
+    Each word contributes up to three rows: inserted silence when the pause before it
+    is longer than min_pause_s, the audio between the previous word and this one (unless
+    that pause was cut), and the word itself unless it's a filler. Empty rows are dropped
+    and runs of back-to-back source ranges are merged, so a transcript of N words usually
+    collapses to a few hundred edits that can be rendered in a single pass.
+    """
+    count = len(timeline)
+    if count == 0:
+        return edits_to_array([Edit(0, audio_length_ms)] if audio_length_ms > 0 else [])
+
+    starts_ms = (timeline.starts * 1000).astype(np.int64)
+    ends_ms = (timeline.ends * 1000).astype(np.int64)
+    pause_before = np.empty(count, dtype=bool)
+    pause_before[0] = timeline.starts[0] > min_pause_s
+    pause_before[1:] = timeline.starts[1:] - timeline.ends[:-1] > min_pause_s
+    # A cut pause resumes right at the next word
+    gap_starts = np.where(pause_before, starts_ms, np.concatenate(([0], ends_ms[:-1])))
+
+    rows = np.zeros((3 * count + 1, 3), dtype=np.int64)
+    silences, gaps, words = rows[0:-1:3], rows[1:-1:3], rows[2:-1:3]
+    silences[:, 1], silences[:, 2] = leave_pause_ms, 1
+    gaps[:, 0], gaps[:, 1] = gap_starts, np.minimum(starts_ms, audio_length_ms)
+    words[:, 0], words[:, 1] = starts_ms, np.minimum(ends_ms, audio_length_ms)
+    rows[-1] = (ends_ms[-1], audio_length_ms, 0)
+
+    keep = rows[:, 1] > rows[:, 0]
+    keep[0:-1:3] &= pause_before
+    keep[2:-1:3] &= ~timeline.token_mask(filler_words)
+    rows = rows[keep]
+    if not len(rows):
+        return rows
+
+    # A new edit starts at every silence, after every silence, and wherever a range doesn't pick up where the last ended
+    silence = rows[:, 2].astype(bool)
+    run_starts = np.ones(len(rows), dtype=bool)
+    run_starts[1:] = silence[1:] | silence[:-1] | (rows[1:, 0] != rows[:-1, 1])
+    first = np.flatnonzero(run_starts)
+    last = np.concatenate((first[1:], [len(rows)])) - 1
+    merged = rows[first]
+    merged[:, 1] = rows[last, 1]
+    return merged
+
+
+def build_cut_list(
+    word_timestamps: Union[WordTimeline, List[Dict[str, Any]]],
+    filler_words: Iterable[str],
+    min_pause_s: float,
+    leave_pause_ms: int,
+    audio_length_ms: int
+) -> List[Edit]:
+    """build_cut_array as a list of Edits. Takes a WordTimeline or the transcription services' word dicts."""
+    timeline = WordTimeline.from_words(word_timestamps)
+    return edits_from_array(build_cut_array(timeline, filler_words, min_pause_s, leave_pause_ms, audio_length_ms))
+
+
+def render_cut_list(audio_segment: AudioSegment, cut_list: List[Edit]) -> AudioSegment:
+    """
+    Renders a cut list against the source audio into one preallocated buffer,
+    instead of growing an AudioSegment with += (which copies the whole buffer every time).
+    """
+    frame_rate = audio_segment.frame_rate
+    frame_width = audio_segment.frame_width
+    total_frames = int(audio_segment.frame_count())
+    length_ms = len(audio_segment)
+    source = memoryview(audio_segment.raw_data)
+
+    def to_frame(ms: int) -> int:
+        # As pydub slices: clamped to len() (rounded to the ms), then truncated to a frame
+        return ms_to_frame(min(ms, length_ms), frame_rate)
+
+    # Inserted silence is sized as pydub would convert AudioSegment.silent() to the
+    # source format. Slices are sized as pydub's: one ending at len() can run up to
+    # half a ms past the last frame, and pydub pads it with silent frames (unless it
+    # starts past the last frame, where it has no frame to copy the format from).
+    spans = []
+    output_size = 0
+    for edit in cut_list:
+        if edit.silence:
+            start_frame, copied, size = 0, 0, silence_frames(edit.duration_ms, frame_rate)
+        else:
+            start_frame, end_frame = to_frame(edit.start_ms), to_frame(edit.end_ms)
+            copied = max(0, min(end_frame, total_frames) - start_frame)
+            size = max(0, end_frame - start_frame) if copied else 0
+        spans.append((start_frame * frame_width, copied * frame_width, size * frame_width))
+        output_size += size * frame_width
+
+    # The buffer starts zeroed, so silence and padding only need the write position advanced.
+    output = bytearray(output_size)
+    position = 0
+    for start, copied, size in spans:
+        if copied:
+            output[position:position + copied] = source[start:start + copied]
+        position += size
+
+    return audio_segment._spawn(bytes(output))
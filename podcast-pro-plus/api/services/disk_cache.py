@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Reading in 1MB blocks keeps hashing large uploads from loading them whole
+_HASH_BLOCK_BYTES = 1024 * 1024
+# (path, size, mtime_ns) -> sha256, so re-hashing the same upload is free within a process
+_file_hashes: Dict[Tuple[str, int, int], str] = {}
+
+
+def hash_file(path: Path) -> str:
+    """Returns the sha256 hex digest of a file's contents."""
+    stat = path.stat()
+    memo_key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _file_hashes:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK_BYTES), b""):
+                digest.update(block)
+        _file_hashes[memo_key] = digest.hexdigest()
+    return _file_hashes[memo_key]
+
+
+def make_key(*parts: Any) -> str:
+    """Builds a cache key from any JSON-serializable parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    A directory of files named by key. Once the directory outgrows max_bytes,
+    the least recently used entries are deleted. Hits refresh an entry's mtime,
+    so mtime order is recency order.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, suffix: str = ".bin"):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str) -> Path:
+        # Two-level fan-out keeps any one directory from getting huge
+        return self.directory / key[:2] / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.path_for(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self._touch(path)
+        return data
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """Like get, but returns the entry's path instead of reading it (e.g. to memory-map it)."""
+        path = self.path_for(key)
+        if not path.exists():
+            self.misses += 1
+            return None
+        self._touch(path)
+        return path
+
+    def _touch(self, path: Path) -> None:
+        self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def put(self, key: str, data: bytes) -> Path:
+        return self.put_chunks(key, (data,))
+
+    def put_chunks(self, key: str, chunks: Iterable) -> Path:
+        """Stores the concatenation of several bytes-like chunks without joining them in memory first."""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so other processes never read a half-written entry
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def delete(self, key: str) -> None:
+        try:
+            self.path_for(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> None:
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.directory.glob(f"*/*{self.suffix}"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    # Still memory-mapped somewhere (Windows won't delete it); try again next time
+                    continue
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
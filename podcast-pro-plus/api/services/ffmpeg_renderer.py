@@ -0,0 +1,286 @@
+import functools
+import re
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from pydub import AudioSegment
+
+from .cut_list import Edit, ms_to_frame, silence_frames
+from . import streaming
+
+
+class FfmpegRenderError(Exception):
+    """Custom exception for ffmpeg filter graph rendering failures."""
+    pass
+
+
+class MusicBed(NamedTuple):
+    """A music file looped to duration_ms, faded and gained, and placed at position_ms (as music_bed_cache renders it)."""
+    path: Path
+    position_ms: float
+    duration_ms: float
+    fade_in_ms: float
+    fade_out_ms: float
+    volume_db: float
+
+
+_PEAK_PATTERN = re.compile(r"Peak level dB:\s*(\S+)")
+# Release builds report e.g. "ffmpeg version 7.1.1" or "n7.1"; git snapshots "N-113000-g..." have no number
+_VERSION_PATTERN = re.compile(r"ffmpeg version n?(\d+)\.")
+
+
+def _frame(ms: float, sample_rate: int) -> int:
+    return ms_to_frame(ms, sample_rate)
+
+
+def _layout(channels: int) -> str:
+    return {1: "mono", 2: "stereo"}.get(channels, f"{channels}c")
+
+
+def _conform(in_channels: int, sample_rate: int, channels: int) -> str:
+    """
+    Filters converting an input to float samples in the mix format, with pydub's channel
+    conversions: mono is copied to both sides at full level (ffmpeg would drop it 3dB),
+    and stereo is averaged down to mono.
+    """
+    filters = ["pan=stereo|c0=c0|c1=c0"] if (in_channels == 1 and channels == 2) else []
+    filters += [
+        f"aresample={sample_rate}:ochl={_layout(channels)}:rematrix_maxval=1",
+        f"aformat=sample_fmts=flt:channel_layouts={_layout(channels)}",
+    ]
+    return ",".join(filters)
+
+
+def _place(position: int) -> str:
+    """Moves a stream to start at frame `position`; a negative position cuts its start, as an overlay would."""
+    if position > 0:
+        return f"adelay=delays={position}S:all=1"
+    if position < 0:
+        return f"atrim=start_sample={-position},asetpts=PTS-STARTPTS"
+    return "anull"
+
+
+class _Graph:
+    """Collects ffmpeg inputs and filter graph chains."""
+
+    def __init__(self):
+        self.inputs: List[List[str]] = []
+        self.chains: List[str] = []
+        self._labels = 0
+
+    def add_input(self, path: Path, options: Optional[List[str]] = None) -> str:
+        self.inputs.append([*(options or []), "-i", str(path)])
+        return f"{len(self.inputs) - 1}:a"
+
+    def chain(self, sources: List[str], filters: str, outputs: int = 1) -> List[str]:
+        labels = [f"l{self._labels + i}" for i in range(outputs)]
+        self._labels += outputs
+        self.chains.append("".join(f"[{s}]" for s in sources) + filters + "".join(f"[{l}]" for l in labels))
+        return labels
+
+    def arguments(self) -> List[str]:
+        return [argument for input_arguments in self.inputs for argument in input_arguments]
+
+
+def _content_chain(
+    graph: _Graph,
+    content_path: Path,
+    cut_list: List[Edit],
+    sample_rate: int,
+    channels: int
+) -> Optional[str]:
+    """
+    Adds the cleaned content to the graph and returns its label. The source is decoded
+    once and split at the cut list's edit points with asegment, so kept ranges come out
+    in order without buffering. Edits that step back into already-passed audio (overlapping
+    word timestamps) are rare and short, so each gets its own seeked input instead.
+
+    Every kept range is padded with silence to its full length, as pydub pads a slice
+    that runs past the last frame, so both renderers cut the same length. (pydub leaves a
+    range that starts past the last frame empty instead; it can't be over half a ms long.)
+    """
+    conform = _conform(streaming.probe(content_path)[2], sample_rate, channels)
+    points: List[int] = []
+    # asegment output index -> (concat piece index, frames), for the ranges that are kept
+    kept_outputs: Dict[int, Tuple[int, int]] = {}
+    pieces: List[Optional[str]] = []
+    cursor = 0
+    for edit in cut_list:
+        start, end = _frame(edit.start_ms, sample_rate), _frame(edit.end_ms, sample_rate)
+        if end <= start:
+            continue
+        if edit.silence:
+            frames = silence_frames(edit.duration_ms, sample_rate)
+            pieces.append(graph.chain([], f"anullsrc=r={sample_rate}:cl={_layout(channels)},atrim=end_sample={frames},aformat=sample_fmts=flt")[0])
+        elif start >= cursor:
+            if start > cursor:
+                points.append(start)
+            points.append(end)
+            kept_outputs[len(points) - 1] = (len(pieces), end - start)
+            pieces.append(None)
+            cursor = end
+        else:
+            source = graph.add_input(content_path, [
+                "-ss", f"{edit.start_ms / 1000.0:.3f}", "-t", f"{edit.duration_ms / 1000.0:.3f}"
+            ])
+            pieces.append(graph.chain([source], f"{conform},asetpts=PTS-STARTPTS,atrim=end_sample={end - start},apad=whole_len={end - start}")[0])
+    if not pieces:
+        return None
+
+    if points:
+        source = graph.add_input(content_path)
+        outputs = graph.chain([source], f"{conform},asegment=samples={'|'.join(map(str, points))}", outputs=len(points) + 1)
+        for index, label in enumerate(outputs):
+            if index in kept_outputs:
+                piece, frames = kept_outputs[index]
+                pieces[piece] = graph.chain([label], f"asetpts=PTS-STARTPTS,apad=whole_len={frames}")[0]
+            else:
+                graph.chain([label], "anullsink", outputs=0)
+    return graph.chain(pieces, f"concat=n={len(pieces)}:v=0:a=1,asetpts=N/SR/TB")[0]
+
+
+@functools.lru_cache(maxsize=None)
+def _major_version(ffmpeg: str) -> Optional[int]:
+    try:
+        result = subprocess.run([ffmpeg, "-version"], capture_output=True)
+    except OSError:
+        return None
+    match = _VERSION_PATTERN.match(result.stdout.decode(errors="ignore"))
+    return int(match.group(1)) if match else None
+
+
+def _filter_script_arguments(script_path: Path) -> List[str]:
+    """
+    Reads the filter graph from a file. ffmpeg 7 reads any option from a file as -/option
+    and deprecates -filter_complex_script, which older releases (and builds that don't
+    report a version) still need.
+    """
+    version = _major_version(streaming._ffmpeg())
+    if version is not None and version >= 7:
+        return ["-/filter_complex", str(script_path)]
+    return ["-filter_complex_script", str(script_path)]
+
+
+def _run(command: List[str], description: str) -> str:
+    try:
+        result = subprocess.run(command, capture_output=True)
+    except OSError as e:
+        raise FfmpegRenderError(f"Could not run ffmpeg: {e}")
+    stderr = result.stderr.decode(errors="ignore")
+    if result.returncode != 0:
+        raise FfmpegRenderError(f"ffmpeg failed to {description}: {stderr.strip()[-2000:]}")
+    return stderr
+
+
+def render_episode(
+    outputs: List[streaming.EncodeTarget],
+    sample_rate: int,
+    channels: int,
+    total_duration_ms: float,
+    segments: List[Tuple[AudioSegment, float]],
+    music_beds: List[MusicBed],
+    content_path: Optional[Path] = None,
+    content_cut_list: Optional[List[Edit]] = None,
+    content_start_ms: float = 0,
+    normalize_headroom_db: Optional[float] = 0.1,
+    tags: Optional[Dict[str, str]] = None,
+    cleaned_output_path: Optional[Path] = None,
+    format: str = "mp3",
+    gain_db: float = 0.0,
+    max_gain_db: Optional[float] = None
+) -> None:
+    """
+    Renders an episode as one ffmpeg filter graph: the content is cut by its cut list,
+    segments and music beds are placed, everything is summed, and the result is
+    normalized and encoded to every output, without any of the audio passing through Python.
+    segments are (audio, position_ms) pairs of already generated audio, such as the
+    stitched intros and outros.
+
+    Like streaming.render_episode, peak normalization needs the peak before the first
+    sample is written, so the graph runs twice: once to measure it and once to encode.
+    max_gain_db caps the gain the measurement arrives at. With normalize_headroom_db=None
+    it runs once, with gain_db applied instead.
+    When cleaned_output_path is given, the cleaned content is encoded there as well, in format.
+    """
+    total_frames = _frame(total_duration_ms, sample_rate)
+    conform = _conform(channels, sample_rate, channels)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        graph = _Graph()
+        layers: List[str] = []
+
+        content = None
+        if content_path is not None and content_cut_list:
+            content = _content_chain(graph, content_path, content_cut_list, sample_rate, channels)
+        cleaned = None
+        if content is not None:
+            if cleaned_output_path:
+                content, cleaned = graph.chain([content], "asplit=2", outputs=2)
+            layers.append(graph.chain([content], _place(_frame(content_start_ms, sample_rate)))[0])
+
+        for i, (segment, position_ms) in enumerate(segments):
+            if len(segment) == 0:
+                continue
+            # Converted by pydub first, exactly as AudioBuffer.overlay_segment would
+            segment = segment.set_frame_rate(sample_rate).set_channels(channels)
+            segment_path = Path(work_dir) / f"segment_{i}.wav"
+            segment.export(segment_path, format="wav")
+            source = graph.add_input(segment_path)
+            layers.append(graph.chain([source], f"{conform},{_place(_frame(position_ms, sample_rate))}")[0])
+
+        for bed in music_beds:
+            bed_frames = _frame(bed.duration_ms, sample_rate)
+            if bed_frames <= 0:
+                continue
+            source = graph.add_input(bed.path, ["-stream_loop", "-1"])
+            filters = [_conform(streaming.probe(bed.path)[2], sample_rate, channels), f"atrim=end_sample={bed_frames}"]
+            fade_in, fade_out = min(_frame(bed.fade_in_ms, sample_rate), bed_frames), min(_frame(bed.fade_out_ms, sample_rate), bed_frames)
+            if fade_in > 0:
+                filters.append(f"afade=t=in:ss=0:ns={fade_in}")
+            if fade_out > 0:
+                filters.append(f"afade=t=out:ss={bed_frames - fade_out}:ns={fade_out}")
+            # Music overlays never cut the bed's start, even at a negative position
+            filters += [f"volume={bed.volume_db}dB:precision=float", _place(max(0, _frame(bed.position_ms, sample_rate)))]
+            layers.append(graph.chain([source], ",".join(filters))[0])
+
+        if not layers:
+            layers = graph.chain([], f"anullsrc=r={sample_rate}:cl={_layout(channels)},aformat=sample_fmts=flt")
+        mix_filters = f"amix=inputs={len(layers)}:normalize=0:duration=longest," if len(layers) > 1 else ""
+        mix = graph.chain(layers, f"{mix_filters}apad=whole_len={total_frames},atrim=end_sample={total_frames}")[0]
+
+        def run(final_filters: str, output_arguments: List[str], description: str) -> str:
+            chains = graph.chains + [f"[{mix}]{final_filters}"]
+            if cleaned:
+                chains.append(f"[{cleaned}]aformat=sample_fmts=s16[cleaned]")
+            # Cut lists make for long graphs, so they go in a script file rather than on the command line
+            script_path = Path(work_dir) / "graph.txt"
+            script_path.write_text(";\n".join(chains), encoding="utf-8")
+            command = [
+                streaming._ffmpeg(), "-y", "-hide_banner", "-nostdin", "-nostats", "-v", "info",
+                *graph.arguments(), *_filter_script_arguments(script_path), *output_arguments,
+            ]
+            return _run(command, description)
+
+        cleaned_null = ["-map", "[cleaned]", "-f", "null", "-"] if cleaned else []
+        if normalize_headroom_db is not None:
+            stderr = run("astats=measure_perchannel=none:measure_overall=Peak_level[out]", ["-map", "[out]", "-f", "null", "-", *cleaned_null], "measure the mix")
+            peaks = _PEAK_PATTERN.findall(stderr)
+            if peaks and peaks[-1] not in ("-inf", "inf", "nan"):
+                gain_db = -normalize_headroom_db - float(peaks[-1])
+            if max_gain_db is not None:
+                gain_db = min(gain_db, max_gain_db)
+
+        # One graph feeds every output; ffmpeg runs each output's encoder on its own thread
+        metadata = [argument for key, value in (tags or {}).items() for argument in ("-metadata", f"{key}={value}")]
+        output_arguments = []
+        for i, target in enumerate(outputs):
+            output_arguments += ["-map", f"[out{i}]", *metadata, *target.args, "-f", target.format, str(target.path)]
+        if cleaned:
+            output_arguments += ["-map", "[cleaned]", "-f", format, str(cleaned_output_path)]
+        split = "".join(f"[out{i}]" for i in range(len(outputs)))
+        run(
+            f"volume={gain_db:.6f}dB:precision=float,aformat=sample_fmts=s16,asplit={len(outputs)}{split}",
+            output_arguments, f"render {', '.join(str(target.path) for target in outputs)}"
+        )
@@ -0,0 +1,59 @@
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+from ..core.config import settings
+
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+
+def prune_directory(directory: Path, max_age_s: float, max_bytes: int) -> int:
+    """
+    Deletes files in a directory (not recursively) older than max_age_s, then the
+    oldest remaining ones until the rest fit in max_bytes. Returns how many were deleted.
+    """
+    if not directory.exists():
+        return 0
+    now = time.time()
+    entries = []
+    for path in directory.iterdir():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if path.is_file():
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    deleted = 0
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, path in sorted(entries):
+        if now - mtime <= max_age_s and total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # Probably still open somewhere; it'll be picked up next time
+            logging.warning(f"Could not prune {path}: {e}")
+            continue
+        total -= size
+        deleted += 1
+    return deleted
+
+
+def prune_work_dirs(directories: Iterable[Path], force: bool = False) -> int:
+    """
+    Applies the work file retention policy (WORK_FILE_MAX_AGE_DAYS, WORK_DIR_MAX_BYTES)
+    to each directory. Unless forced, runs at most once per WORK_DIR_PRUNE_INTERVAL_S per process.
+    """
+    global _last_prune
+    with _prune_lock:
+        if not force and time.time() - _last_prune < settings.WORK_DIR_PRUNE_INTERVAL_S:
+            return 0
+        _last_prune = time.time()
+    max_age_s = settings.WORK_FILE_MAX_AGE_DAYS * 24 * 3600
+    return sum(prune_directory(directory, max_age_s, settings.WORK_DIR_MAX_BYTES) for directory in directories)
@@ -1,83 +1,152 @@
-from typing import List, Dict, Any, Set, Optional, Tuple
+from typing import List, Dict, Any, Iterable, Set, Optional, Tuple, Union
+
+import numpy as np
 from thefuzz import fuzz
 
-def find_keywords(word_timestamps: List[Dict[str, Any]], keywords: Set[str]) -> List[Dict[str, Any]]:
+from .word_timeline import WordTimeline
+
+Words = Union[WordTimeline, List[Dict[str, Any]]]
+
+
+def _normalize(word: str) -> str:
+    return word.strip().strip(".,!?").lower()
+
+
+class KeywordIndex:
+    """
+    Positions of every distinct (normalized) word in a transcript, built once so
+    keyword lookups don't rescan it. Also keeps running character counts of the
+    words, so the length of any run of them joined with spaces is two lookups.
+    """
+
+    def __init__(self, word_timestamps: Words):
+        self.timeline = WordTimeline.from_words(word_timestamps)
+        vocab_keys: Dict[str, int] = {}
+        key_of_token = np.fromiter(
+            (vocab_keys.setdefault(_normalize(word), len(vocab_keys)) for word in self.timeline.vocab),
+            dtype=np.int32, count=len(self.timeline.vocab)
+        )
+        keys = key_of_token[self.timeline.tokens]
+        # A stable sort groups each word's positions together, still in transcript order
+        order = np.argsort(keys, kind="stable")
+        bounds = np.searchsorted(keys[order], np.arange(len(vocab_keys) + 1))
+        self._positions = {key: order[bounds[i]:bounds[i + 1]] for key, i in vocab_keys.items()}
+
+        # offsets[i] is the length of words[:i] joined with spaces, plus i
+        lengths = np.fromiter((len(word) for word in self.timeline.vocab), dtype=np.int64, count=len(self.timeline.vocab))
+        self._offsets = np.concatenate(([0], np.cumsum(lengths[self.timeline.tokens] + 1)))
+        self._words: Optional[List[str]] = None
+
+    def positions(self, keyword: str) -> np.ndarray:
+        """Indexes of every occurrence of keyword, in transcript order."""
+        return self._positions.get(_normalize(keyword), np.empty(0, dtype=np.int64))
+
+    def find(self, keywords: Iterable[str]) -> np.ndarray:
+        """Indexes of every occurrence of any of keywords, in transcript order."""
+        found = [self.positions(keyword) for keyword in set(keywords)]
+        return np.sort(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def joined_length(self, first: int, last: int) -> int:
+        """Length of words[first:last] joined with spaces."""
+        return max(0, int(self._offsets[last] - self._offsets[first]) - 1)
+
+    def words(self) -> List[str]:
+        if self._words is None:
+            self._words = self.timeline.words()
+        return self._words
+
+
+def find_keywords(word_timestamps: Words, keywords: Set[str], index: Optional[KeywordIndex] = None) -> List[Dict[str, Any]]:
     """
     Finds occurrences of specific keywords in a word-level transcript.
+    Pass a KeywordIndex to look up several keyword sets without rebuilding it.
+    """
+    index = index or KeywordIndex(word_timestamps)
+    timeline = index.timeline
+    return [
+        {
+            "keyword": _normalize(timeline.vocab[timeline.tokens[i]]),
+            "start_time_s": float(timeline.starts[i]),
+            "end_time_s": float(timeline.ends[i]),
+            "index": int(i),
+        }
+        for i in index.find(keywords).tolist()
+    ]
+
+
+def analyze_flubbers(
+    word_timestamps: Words,
+    flubber_word_indexes: Iterable[int],
+    window_s: int = 15,
+    similarity_threshold: int = 85,
+    index: Optional[KeywordIndex] = None
+) -> List[Optional[Tuple[float, float]]]:
+    """
+    Analyzes the text before and after each "flubber" keyword to find a repeated mistake,
+    all in one pass: the window before each flubber is found by binary search on start
+    times, and the words after it are taken until they're as long as that window's text,
+    by binary search on running character counts. Returns, per flubber, the range to
+    remove (the start of the window to the end of the flubber) or None.
     """
-    found_keywords = []
-    for i, word_data in enumerate(word_timestamps):
-        word = word_data['word'].strip(".,!?").lower()
-        if word in keywords:
-            found_keywords.append({
-                "keyword": word,
-                "start_time_s": word_data['start'],
-                "end_time_s": word_data['end'],
-                "index": i
-            })
-    return found_keywords
+    index = index or KeywordIndex(word_timestamps)
+    timeline = index.timeline
+    flubbers = np.asarray(list(flubber_word_indexes), dtype=np.int64)
+    if not len(flubbers):
+        return []
+
+    # Words before: the ones starting no more than window_s before the flubber
+    firsts = np.searchsorted(timeline.starts, timeline.starts[flubbers] - window_s, side="left")
+    firsts = np.minimum(firsts, flubbers)
+    # Words after: the fewest that join to at least the length of the text before
+    before_lengths = np.maximum(0, index._offsets[flubbers] - index._offsets[firsts] - 1)
+    afters = flubbers + 1
+    lasts = np.searchsorted(index._offsets, index._offsets[afters] + before_lengths + 1, side="left")
+    lasts = np.where(before_lengths == 0, afters, np.minimum(lasts, len(timeline)))
+
+    words = index.words()
+    results: List[Optional[Tuple[float, float]]] = []
+    for flubber, first, after, last in zip(flubbers.tolist(), firsts.tolist(), afters.tolist(), lasts.tolist()):
+        if first >= flubber or last <= after:
+            results.append(None)
+            continue
+        text_before = " ".join(words[first:flubber])
+        text_after = " ".join(words[after:last])
+        if fuzz.ratio(text_before.lower(), text_after.lower()) >= similarity_threshold:
+            results.append((float(timeline.starts[first]), float(timeline.ends[flubber])))
+        else:
+            results.append(None)
+    return results
+
 
 def analyze_flubber_instance(
-    word_timestamps: List[Dict[str, Any]],
+    word_timestamps: Words,
     flubber_word_index: int,
     window_s: int = 15,
-    similarity_threshold: int = 85
+    similarity_threshold: int = 85,
+    index: Optional[KeywordIndex] = None
 ) -> Optional[Tuple[float, float]]:
     """
     Analyzes the text before and after a "flubber" keyword to find a repeated mistake.
+    Use analyze_flubbers for every flubber in an episode at once.
     """
-    flubber_event = word_timestamps[flubber_word_index]
-    flubber_start_s = flubber_event['start']
-    words_before = []
-    for i in range(flubber_word_index - 1, -1, -1):
-        word_data = word_timestamps[i]
-        if flubber_start_s - word_data['start'] > window_s:
-            break
-        words_before.insert(0, word_data)
-    if not words_before:
-        return None
-    text_before = " ".join([w['word'] for w in words_before])
-    mistake_start_s = words_before[0]['start']
-    words_after = []
-    for i in range(flubber_word_index + 1, len(word_timestamps)):
-        word_data = word_timestamps[i]
-        if len(" ".join([w['word'] for w in words_after])) >= len(text_before):
-            break
-        words_after.append(word_data)
-    if not words_after:
-        return None
-    text_after = " ".join([w['word'] for w in words_after])
-    similarity = fuzz.ratio(text_before.lower(), text_after.lower())
-    if similarity >= similarity_threshold:
-        segment_to_remove = (mistake_start_s, flubber_event['end_time_s'])
-        return segment_to_remove
-    return None
+    return analyze_flubbers(word_timestamps, [flubber_word_index], window_s, similarity_threshold, index)[0]
+
 
 def get_text_after_keyword(
-    word_timestamps: List[Dict[str, Any]],
+    word_timestamps: Words,
     keyword_event: Dict[str, Any],
     max_pause_s: float = 1.5
 ) -> str:
     """
     Extracts the string of text spoken after a keyword, stopping at a long pause.
     """
-    command_words = []
+    timeline = WordTimeline.from_words(word_timestamps)
     start_index = keyword_event['index'] + 1
-    
-    if start_index >= len(word_timestamps):
+    if start_index >= len(timeline):
         return ""
 
-    last_word_end_s = keyword_event['end_time_s']
-
-    for i in range(start_index, len(word_timestamps)):
-        word_data = word_timestamps[i]
-        
-        # Check for a long pause before this word
-        pause_duration = word_data['start'] - last_word_end_s
-        if pause_duration > max_pause_s:
-            break
-            
-        command_words.append(word_data['word'])
-        last_word_end_s = word_data['end']
-    
-    return " ".join(command_words)
+    # Pause before each following word; the first is measured from the end of the keyword
+    previous_ends = np.concatenate(([keyword_event['end_time_s']], timeline.ends[start_index:-1]))
+    long_pauses = np.flatnonzero(timeline.starts[start_index:] - previous_ends > max_pause_s)
+    end_index = start_index + int(long_pauses[0]) if len(long_pauses) else len(timeline)
+    return timeline[start_index:end_index].text()
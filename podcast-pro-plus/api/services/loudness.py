@@ -0,0 +1,193 @@
+import hashlib
+import math
+import re
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+from pydub import AudioSegment
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from ..core.config import settings
+from ..core.database import engine
+from ..models.podcast import AssetLoudness
+from .disk_cache import hash_file
+from . import streaming
+
+# BS.1770's absolute gate. Anything measured at or below it is silence.
+SILENCE_LUFS = -70.0
+# Bump when measuring changes; stats stored under an older version are measured again.
+FORMAT_VERSION = 1
+
+_SAMPLE_FORMATS = {1: "s8", 2: "s16le", 4: "s32le"}
+_INTEGRATED_PATTERN = re.compile(r"I:\s+(\S+) LUFS")
+_RANGE_PATTERN = re.compile(r"LRA:\s+(\S+) LU")
+_PEAK_PATTERN = re.compile(r"Peak:\s+(\S+) dBFS")
+
+
+class LoudnessError(Exception):
+    """Custom exception for loudness measurement failures."""
+    pass
+
+
+class LoudnessStats(NamedTuple):
+    """EBU R128 measurements of one piece of audio. integrated_lufs is None for silence."""
+    integrated_lufs: Optional[float]
+    true_peak_dbtp: Optional[float]
+    loudness_range_lu: float
+    channels: int
+    duration_s: float
+
+
+class Layer(NamedTuple):
+    """A measured piece of audio placed in a mix at start_ms with gain_db applied."""
+    stats: LoudnessStats
+    start_ms: float
+    duration_ms: float
+    gain_db: float = 0.0
+
+
+# --- Measuring ---
+def _parse_summary(stderr: str, channels: int, duration_s: float) -> LoudnessStats:
+    integrated, loudness_range, peak = _INTEGRATED_PATTERN.findall(stderr), _RANGE_PATTERN.findall(stderr), _PEAK_PATTERN.findall(stderr)
+    if not (integrated and loudness_range and peak):
+        raise LoudnessError(f"Could not read the loudness summary: {stderr.strip()[-500:]}")
+    # The summary is printed last, after any per-frame lines
+    integrated_lufs = float(integrated[-1])
+    true_peak = float(peak[-1])
+    return LoudnessStats(
+        integrated_lufs if integrated_lufs > SILENCE_LUFS else None,
+        true_peak if math.isfinite(true_peak) else None,
+        float(loudness_range[-1]), channels, duration_s,
+    )
+
+
+def _run_ebur128(input_arguments: List[str], input_bytes: Optional[bytes] = None) -> str:
+    command = [
+        streaming._ffmpeg(), "-hide_banner", "-nostats", "-v", "info", *input_arguments,
+        "-vn", "-af", "ebur128=peak=true:framelog=verbose", "-f", "null", "-",
+    ]
+    try:
+        result = subprocess.run(command, input=input_bytes, capture_output=True)
+    except OSError as e:
+        raise LoudnessError(f"Could not run ffmpeg: {e}")
+    stderr = result.stderr.decode(errors="ignore")
+    if result.returncode != 0:
+        raise LoudnessError(f"ffmpeg failed to measure loudness: {stderr.strip()[-500:]}")
+    return stderr
+
+
+def measure_file(path: Path) -> LoudnessStats:
+    """Measures integrated loudness, loudness range and true peak in one pass, decoded and analysed by ffmpeg."""
+    duration_s, _, channels = streaming.probe(path)
+    return _parse_summary(_run_ebur128(["-i", str(path)]), channels, duration_s)
+
+
+def measure_segment(segment: AudioSegment) -> LoudnessStats:
+    """Like measure_file, for audio that's already decoded. Its samples are piped to ffmpeg as they are."""
+    input_arguments = [
+        "-f", _SAMPLE_FORMATS[segment.sample_width], "-ar", str(segment.frame_rate),
+        "-ac", str(segment.channels), "-i", "pipe:0",
+    ]
+    return _parse_summary(_run_ebur128(input_arguments, segment.raw_data), segment.channels, len(segment) / 1000.0)
+
+
+# --- Stored per-asset stats ---
+def _stored_stats(content_hash: str, measure) -> LoudnessStats:
+    """Returns the stats stored for an asset, measuring and storing them the first time it's seen."""
+    with Session(engine) as session:
+        row = session.get(AssetLoudness, content_hash)
+        if row is not None and row.format_version == FORMAT_VERSION:
+            return LoudnessStats(row.integrated_lufs, row.true_peak_dbtp, row.loudness_range_lu, row.channels, row.duration_s)
+
+        stats = measure()
+        row = row or AssetLoudness(content_hash=content_hash)
+        row.integrated_lufs, row.true_peak_dbtp, row.loudness_range_lu = stats.integrated_lufs, stats.true_peak_dbtp, stats.loudness_range_lu
+        row.channels, row.duration_s = stats.channels, stats.duration_s
+        row.format_version, row.measured_at = FORMAT_VERSION, datetime.utcnow()
+        session.add(row)
+        try:
+            session.commit()
+        except IntegrityError:
+            # Another worker measured the same asset at the same time; theirs is just as good
+            session.rollback()
+        return stats
+
+
+def file_stats(path: Path) -> LoudnessStats:
+    """Stats for a media file (static segments, music, uploaded content), keyed by its content."""
+    return _stored_stats(hash_file(path), lambda: measure_file(path))
+
+
+def segment_stats(segment: AudioSegment) -> LoudnessStats:
+    """Stats for generated audio such as TTS, keyed by its samples, so regenerating the same speech isn't measured again."""
+    digest = hashlib.sha256(f"{segment.frame_rate}:{segment.channels}:{segment.sample_width}:".encode())
+    digest.update(segment.raw_data)
+    return _stored_stats(digest.hexdigest(), lambda: measure_segment(segment))
+
+
+# --- Gain ---
+def _channel_offset_db(source_channels: int, mix_channels: int) -> float:
+    """
+    Loudness change from mixing a source into a different channel layout: mono copied
+    to both sides of a stereo mix is counted twice (+3dB), and averaging stereo
+    down to mono halves the channel count (-3dB, for the usual mostly-correlated sides).
+    """
+    return 10 * math.log10(mix_channels / source_channels)
+
+
+def estimate_mix(layers: List[Layer], mix_channels: int) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Estimates (integrated loudness, true peak) of a mix from its layers' stats, without
+    measuring the mix. Loudness is the layers' power summed over the time any of them
+    is playing, which is exact for sequential parts and for overlapping uncorrelated
+    ones (a voice over music). The peak is the worst case of overlapping layers' peaks adding up.
+    That's an upper bound, and overstates most mixes (a voice and its music bed rarely peak
+    at the same instant), so limiting a gain by it would over-attenuate: use it to decide
+    whether the rendered mix's peak needs measuring, not as the peak itself.
+    """
+    energy = 0.0
+    spans = []
+    edges = []
+    for layer in layers:
+        if layer.duration_ms <= 0:
+            continue
+        end_ms = layer.start_ms + layer.duration_ms
+        if layer.stats.integrated_lufs is not None:
+            loudness = layer.stats.integrated_lufs + layer.gain_db + _channel_offset_db(layer.stats.channels, mix_channels)
+            energy += layer.duration_ms * 10 ** (loudness / 10)
+            spans.append((layer.start_ms, end_ms))
+        if layer.stats.true_peak_dbtp is not None:
+            peak = 10 ** ((layer.stats.true_peak_dbtp + layer.gain_db) / 20)
+            edges += [(layer.start_ms, peak), (end_ms, -peak)]
+
+    # Total time covered by the audible layers
+    covered_ms, covered_until = 0.0, -math.inf
+    for start_ms, end_ms in sorted(spans):
+        if end_ms > covered_until:
+            covered_ms += end_ms - max(start_ms, covered_until)
+            covered_until = end_ms
+    integrated = 10 * math.log10(energy / covered_ms) if energy > 0 and covered_ms > 0 else None
+
+    # Sweep the layers' start and end points; ends sort first so back-to-back layers don't add up
+    peak, max_peak = 0.0, 0.0
+    for _, change in sorted(edges, key=lambda edge: (edge[0], edge[1])):
+        peak += change
+        max_peak = max(max_peak, peak)
+    true_peak = 20 * math.log10(max_peak) if max_peak > 0 else None
+    return integrated, true_peak
+
+
+def normalization_gain_db(integrated_lufs: Optional[float], true_peak_dbtp: Optional[float]) -> float:
+    """
+    The single gain that brings a mix to LOUDNESS_TARGET_LUFS, reduced if that would push
+    its true peak past LOUDNESS_MAX_TRUE_PEAK_DBTP. Silence is left alone.
+    """
+    if integrated_lufs is None:
+        return 0.0
+    gain_db = settings.LOUDNESS_TARGET_LUFS - integrated_lufs
+    if true_peak_dbtp is not None:
+        gain_db = min(gain_db, settings.LOUDNESS_MAX_TRUE_PEAK_DBTP - true_peak_dbtp)
+    return gain_db
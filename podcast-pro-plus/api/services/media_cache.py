@@ -0,0 +1,150 @@
+import array
+import mmap
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from pydub import AudioSegment
+
+from ..core.config import settings
+from .disk_cache import DiskCache, hash_file, make_key
+
+# Bump when the on-disk layout changes; old entries then simply stop matching.
+FORMAT_VERSION = 2
+# Shared entries are a header of magic, sample_width, frame_rate, channels, padded so the raw PCM
+# after it starts on a boundary mmap can map from
+_MAGIC = b"PPCM"
+_HEADER = struct.Struct("<4sIII")
+_DATA_OFFSET = mmap.ALLOCATIONGRANULARITY
+
+# (resolved path, size, mtime_ns) -> decoded segment, most recently used last.
+# Keying by size and mtime means a file replaced in place is never served stale.
+_segments: "OrderedDict[Tuple[str, int, int], AudioSegment]" = OrderedDict()
+_segments_bytes = 0
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+shared_cache = (
+    DiskCache(Path(settings.MEDIA_CACHE_SHARED_DIR), settings.MEDIA_CACHE_SHARED_MAX_BYTES, suffix=".pcm")
+    if settings.MEDIA_CACHE_SHARED_DIR else None
+)
+
+
+class MappedAudioSegment(AudioSegment):
+    """
+    An AudioSegment whose raw_data is a read-only mmap of a shared cache entry, so
+    worker processes using the same entry read the same page cache pages instead of
+    each holding a copy. Slicing an mmap returns bytes, so slices and everything
+    else derived from the segment hold their own bytes.
+    """
+
+    def append(self, seg, crossfade=100):
+        if crossfade:
+            return super().append(seg, crossfade)
+        # pydub joins with +, which an mmap doesn't support
+        seg1, seg2 = AudioSegment._sync(self, seg)
+        return AudioSegment(data=b"".join((seg1.raw_data, seg2.raw_data)), metadata={
+            "sample_width": seg1.sample_width, "frame_rate": seg1.frame_rate,
+            "frame_width": seg1.frame_width, "channels": seg1.channels,
+        })
+
+    def get_array_of_samples(self, array_type_override=None):
+        # array.array only reads bytes as raw samples; an mmap would be iterated byte by byte
+        return array.array(array_type_override or self.array_type, self._data[:])
+
+
+def _shared_key(path: Path) -> str:
+    return make_key(FORMAT_VERSION, hash_file(path))
+
+
+def _load_shared(path: Path) -> Optional[AudioSegment]:
+    entry = shared_cache.lookup(_shared_key(path))
+    if entry is None:
+        return None
+    try:
+        with open(entry, "rb") as f:
+            magic, sample_width, frame_rate, channels = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError("Not a media cache entry.")
+            if entry.stat().st_size == _DATA_OFFSET:
+                return AudioSegment(data=b"", sample_width=sample_width, frame_rate=frame_rate, channels=channels)
+            # The mapping stays valid after the file is closed, and after the entry is evicted
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ, offset=_DATA_OFFSET)
+        return MappedAudioSegment(data=mapped, sample_width=sample_width, frame_rate=frame_rate, channels=channels)
+    except (OSError, ValueError, struct.error):
+        # A corrupt entry is just a miss
+        shared_cache.delete(_shared_key(path))
+        return None
+
+
+def _store_shared(path: Path, segment: AudioSegment) -> None:
+    header = _HEADER.pack(_MAGIC, segment.sample_width, segment.frame_rate, segment.channels).ljust(_DATA_OFFSET, b"\0")
+    shared_cache.put_chunks(_shared_key(path), (header, segment.raw_data))
+
+
+def load(path: Path) -> AudioSegment:
+    """
+    Returns a decoded audio file, from this process's memory cache when it was
+    decoded recently, then from the shared on-disk PCM cache if one is configured,
+    and only otherwise by decoding it. With the shared cache the segment's raw_data
+    is a read-only mmap of the entry. AudioSegments are immutable, so callers
+    can use the result freely.
+    """
+    global _segments_bytes, _hits, _misses
+    stat = path.stat()
+    memo_key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        segment = _segments.get(memo_key)
+        if segment is not None:
+            _segments.move_to_end(memo_key)
+            _hits += 1
+            return segment
+        _misses += 1
+        # Older versions of a file replaced in place can't be hit again
+        for stale_key in [k for k in _segments if k[0] == memo_key[0]]:
+            _segments_bytes -= len(_segments.pop(stale_key).raw_data)
+
+    segment = _load_shared(path) if shared_cache else None
+    if segment is None:
+        segment = AudioSegment.from_file(path)
+        if shared_cache:
+            _store_shared(path, segment)
+            # Keep the mapped entry rather than a private copy, as every other process will
+            segment = _load_shared(path) or segment
+
+    size = len(segment.raw_data)
+    if size <= settings.MEDIA_CACHE_MAX_BYTES:
+        with _lock:
+            if memo_key not in _segments:
+                _segments[memo_key] = segment
+                _segments_bytes += size
+            while _segments_bytes > settings.MEDIA_CACHE_MAX_BYTES:
+                _, evicted = _segments.popitem(last=False)
+                _segments_bytes -= len(evicted.raw_data)
+    return segment
+
+
+def invalidate(path: Path) -> None:
+    """Drops a file from every cache. Call before the file is deleted or overwritten."""
+    global _segments_bytes
+    resolved = str(path.resolve())
+    with _lock:
+        for memo_key in [k for k in _segments if k[0] == resolved]:
+            _segments_bytes -= len(_segments.pop(memo_key).raw_data)
+    if shared_cache and path.exists():
+        shared_cache.delete(_shared_key(path))
+
+
+def stats() -> Dict[str, Any]:
+    lookups = _hits + _misses
+    return {
+        "hits": _hits,
+        "misses": _misses,
+        "hit_rate": _hits / lookups if lookups else 0.0,
+        "entries": len(_segments),
+        "bytes": _segments_bytes,
+        "shared": shared_cache.stats() if shared_cache else None,
+    }
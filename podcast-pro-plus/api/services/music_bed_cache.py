@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import numpy as np
+from pydub import AudioSegment
+
+from ..core.config import settings
+from .audio_buffer import AudioBuffer
+from .disk_cache import DiskCache, hash_file, make_key
+
+# Bump when rendering changes; old beds then simply stop matching.
+FORMAT_VERSION = 1
+
+cache = DiskCache(Path(settings.MUSIC_BED_CACHE_DIR), settings.MUSIC_BED_CACHE_MAX_BYTES, suffix=".f32")
+
+
+def render_bed(
+    music_path: Path,
+    duration_ms: float,
+    fade_in_ms: float,
+    fade_out_ms: float,
+    volume_db: float,
+    sample_rate: int,
+    channels: int
+) -> AudioBuffer:
+    """Loops a music file to duration_ms, then fades it and applies its gain."""
+    music = AudioBuffer.from_segment(AudioSegment.from_file(music_path), sample_rate, channels)
+    bed = music.looped(duration_ms)
+    bed.fade_in(fade_in_ms).fade_out(fade_out_ms)
+    bed.apply_gain(volume_db)
+    return bed
+
+
+def get_bed(
+    music_path: Path,
+    duration_ms: float,
+    fade_in_ms: float,
+    fade_out_ms: float,
+    volume_db: float,
+    sample_rate: int,
+    channels: int
+) -> AudioBuffer:
+    """
+    Returns the rendered music bed, from the cache when the same music file has
+    been rendered with the same settings before. Cached beds are memory-mapped
+    copy-on-write, so worker processes share the pages and nothing touches the file.
+    """
+    key = make_key(FORMAT_VERSION, hash_file(music_path), duration_ms, fade_in_ms, fade_out_ms, volume_db, sample_rate, channels)
+    path = cache.lookup(key)
+    if path is not None:
+        try:
+            samples = np.memmap(path, dtype=np.float32, mode="c").reshape(-1, channels)
+            return AudioBuffer(samples, sample_rate)
+        except (OSError, ValueError):
+            # Unreadable or truncated entry: render it again
+            cache.delete(key)
+
+    bed = render_bed(music_path, duration_ms, fade_in_ms, fade_out_ms, volume_db, sample_rate, channels)
+    cache.put(key, np.ascontiguousarray(bed.samples).data)
+    return bed
@@ -0,0 +1,90 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Tuple
+
+
+class PipelineError(Exception):
+    """Custom exception for a malformed stage graph."""
+    pass
+
+
+class Stage(NamedTuple):
+    """
+    One step of a pipeline. fn(results, log) is called once every stage named in
+    deps has finished; results maps those stage names to their return values,
+    and anything appended to log ends up in the pipeline's log.
+    """
+    name: str
+    fn: Callable[[Mapping[str, Any], List[str]], Any]
+    deps: Tuple[str, ...] = ()
+    retries: int = 0
+
+
+def _check_graph(stages: List[Stage]) -> None:
+    names = [stage.name for stage in stages]
+    if len(set(names)) != len(names):
+        raise PipelineError("Stage names must be unique.")
+    # Stages may only depend on stages listed before them, which also rules out cycles
+    seen = set()
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in seen]
+        if missing:
+            raise PipelineError(f"Stage '{stage.name}' depends on {missing}, which must be listed before it.")
+        seen.add(stage.name)
+
+
+def run_stages(
+    stages: List[Stage],
+    max_workers: int,
+    log: List[str],
+    retry_if: Callable[[Exception], bool] = lambda e: True
+) -> Dict[str, Any]:
+    """
+    Runs stages on a thread pool, each as soon as its dependencies are done, and
+    returns every stage's result by name.
+
+    A failing stage is retried up to stage.retries times (when retry_if allows it)
+    using the results it already has, so nothing upstream runs again. If it still
+    fails, stages that haven't started are dropped, running ones are waited for,
+    and the stage's exception is re-raised unchanged.
+
+    Each stage's log lines and timing are appended to log in stage order, so the
+    log reads the same however the stages were scheduled.
+    """
+    _check_graph(stages)
+    results: Dict[str, Any] = {}
+    stage_logs: Dict[str, List[str]] = {stage.name: [] for stage in stages}
+    attempts: Dict[str, int] = {stage.name: 0 for stage in stages}
+    pending = list(stages)
+    running: Dict[Future, Tuple[Stage, float]] = {}
+
+    def run(stage: Stage) -> Any:
+        return stage.fn(results, stage_logs[stage.name])
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            while pending or running:
+                for stage in [s for s in pending if all(dep in results for dep in s.deps)]:
+                    pending.remove(stage)
+                    running[executor.submit(run, stage)] = (stage, time.time())
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, started = running.pop(future)
+                    attempts[stage.name] += 1
+                    error = future.exception()
+                    if error is None:
+                        results[stage.name] = future.result()
+                        stage_logs[stage.name].append(f"[TIMING] Stage '{stage.name}' took {time.time() - started:.2f}s")
+                    elif attempts[stage.name] <= stage.retries and retry_if(error):
+                        stage_logs[stage.name].append(f"WARNING: Stage '{stage.name}' failed ({error}); retrying.")
+                        pending.append(stage)
+                    else:
+                        pending.clear()
+                        # Let whatever is already running finish before giving up
+                        wait(running)
+                        raise error
+    finally:
+        for stage in stages:
+            log.extend(stage_logs[stage.name])
+    return results
@@ -0,0 +1,165 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from ..core.config import settings
+
+try:
+    import redis
+except ImportError:  # Optional: only needed when RATE_LIMIT_REDIS_URL is set (requirements-redis.txt)
+    redis = None
+
+
+class RateLimiterError(Exception):
+    """Custom exception for a rate limiter that can't be set up."""
+    pass
+
+
+class RateLimitedError(Exception):
+    """
+    Raised instead of waiting when a provider is throttled. retry_after_s is how
+    long the caller should wait before trying again, if the provider said.
+    """
+
+    def __init__(self, message: str, retry_after_s: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after_s = retry_after_s
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Reads a Retry-After header, which is either a number of seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_countdown(retry_after_s: Optional[float], attempt: int) -> float:
+    """
+    Seconds to wait before retry number `attempt` (from 0). A provider's
+    Retry-After is honoured with up to 25% jitter added, so requeued tasks don't
+    all return at once; otherwise it's exponential backoff with full jitter.
+    """
+    if retry_after_s is not None:
+        return retry_after_s * random.uniform(1.0, 1.25)
+    ceiling = min(settings.RATE_LIMIT_MAX_BACKOFF_S, settings.RATE_LIMIT_BASE_BACKOFF_S * 2 ** attempt)
+    return random.uniform(settings.RATE_LIMIT_BASE_BACKOFF_S, max(settings.RATE_LIMIT_BASE_BACKOFF_S, ceiling))
+
+
+# --- Bucket stores ---
+class LocalStore:
+    """Keeps buckets in this process. Stands in for Redis in development and single-worker setups."""
+
+    def __init__(self):
+        # name -> (tokens, updated_at, blocked_until)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, name: str, rate: float, capacity: float, now: float) -> float:
+        with self._lock:
+            tokens, updated, blocked_until = self._buckets.get(name, (capacity, now, 0.0))
+            if now < blocked_until:
+                return blocked_until - now
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[name] = (tokens, now, blocked_until)
+            return wait
+
+    def block(self, name: str, until: float) -> None:
+        with self._lock:
+            tokens, updated, blocked_until = self._buckets.get(name, (0.0, until, 0.0))
+            self._buckets[name] = (0.0, max(updated, until), max(blocked_until, until))
+
+
+class RedisStore:
+    """Keeps buckets in Redis so every worker process on every node draws from the same budget."""
+
+    # Refill, then take a token if one is available, atomically. Redis truncates
+    # Lua numbers to integers on return, so the wait comes back as a string.
+    _TAKE = """
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated', 'blocked_until')
+    local rate, capacity, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    local blocked_until = tonumber(state[3]) or 0
+    if now < blocked_until then return tostring(blocked_until - now) end
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now, 'blocked_until', blocked_until)
+    redis.call('EXPIRE', KEYS[1], 3600)
+    return tostring(wait)
+    """
+    _BLOCK = """
+    local blocked_until = tonumber(redis.call('HGET', KEYS[1], 'blocked_until')) or 0
+    local until = math.max(blocked_until, tonumber(ARGV[1]))
+    redis.call('HSET', KEYS[1], 'tokens', 0, 'updated', until, 'blocked_until', until)
+    redis.call('EXPIRE', KEYS[1], 3600)
+    """
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RateLimiterError("RATE_LIMIT_REDIS_URL is set but the redis package is not installed: pip install -r requirements-redis.txt")
+        client = redis.Redis.from_url(url)
+        self._take = client.register_script(self._TAKE)
+        self._block = client.register_script(self._BLOCK)
+
+    def take(self, name: str, rate: float, capacity: float, now: float) -> float:
+        return float(self._take(keys=[f"ratelimit:{name}"], args=[rate, capacity, now]))
+
+    def block(self, name: str, until: float) -> None:
+        self._block(keys=[f"ratelimit:{name}"], args=[until])
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RedisStore(settings.RATE_LIMIT_REDIS_URL) if settings.RATE_LIMIT_REDIS_URL else LocalStore()
+        return _store
+
+
+class TokenBucket:
+    """
+    A named request budget: `rate` requests per second, with bursts of up to
+    `capacity`. Buckets with the same name share one budget through the store.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+
+    def acquire(self, max_wait_s: float = 0.0) -> None:
+        """
+        Takes a token, waiting up to max_wait_s for one. If it would take longer
+        than that, raises RateLimitedError instead so the caller can reschedule.
+        """
+        wait = get_store().take(self.name, self.rate, self.capacity, time.time())
+        while wait > 0:
+            if wait > max_wait_s:
+                raise RateLimitedError(f"Rate limit for {self.name} reached.", retry_after_s=wait)
+            time.sleep(wait)
+            max_wait_s -= wait
+            wait = get_store().take(self.name, self.rate, self.capacity, time.time())
+
+    def block_for(self, seconds: float) -> None:
+        """Stops handing out tokens for a while, e.g. after the provider answers 429."""
+        get_store().block(self.name, time.time() + seconds)
@@ -0,0 +1,498 @@
+import json
+import re
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from pydub import AudioSegment
+
+from ..core.config import settings
+from .audio_buffer import AudioBuffer
+from .cut_list import Edit
+
+# Frames decoded, mixed and encoded per step. At 48kHz stereo this is ~0.5MB of float32.
+BLOCK_FRAMES = 2 ** 16
+# How far back a cut list edit may reach into already-decoded audio. Edits are
+# almost always in order, but overlapping word timestamps can step back slightly.
+HISTORY_FRAMES = 2 ** 18
+# What ffmpeg prints about an input, for installs without ffprobe
+_TIME = r"(\d+):(\d+):(\d+(?:\.\d+)?)"
+_DURATION_PATTERN = re.compile(rf"Duration: {_TIME}")
+_DECODED_TIME_PATTERN = re.compile(rf"time={_TIME}")
+_AUDIO_STREAM_PATTERN = re.compile(r"Stream #\d+:\d+.*?: Audio: .*?(\d+) Hz, ([^,\n]+)")
+_LAYOUT_CHANNELS = {"mono": 1, "stereo": 2, "2.1": 3, "3.0": 3, "quad": 4, "4.0": 4, "5.0": 5, "5.1": 6, "6.1": 7, "7.1": 8}
+
+
+class StreamingError(Exception):
+    """Custom exception for ffmpeg streaming failures."""
+    pass
+
+
+def _ffmpeg() -> str:
+    return AudioSegment.converter
+
+
+def _ffprobe() -> str:
+    return getattr(AudioSegment, "ffprobe", "ffprobe")
+
+
+def _ffmpeg_stderr(arguments: List[str]) -> str:
+    try:
+        result = subprocess.run([_ffmpeg(), "-hide_banner", "-nostdin", *arguments], capture_output=True)
+    except OSError as e:
+        raise StreamingError(f"Could not run ffmpeg: {e}")
+    return result.stderr.decode(errors="ignore")
+
+
+def _seconds(hours: str, minutes: str, seconds: str) -> float:
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _probe_with_ffmpeg(path: Path) -> Tuple[float, int, int]:
+    """
+    probe() for installs without ffprobe, read from the input summary ffmpeg prints (duration to 10ms).
+    Inputs whose container doesn't record a duration are decoded to measure it.
+    """
+    # Given no output ffmpeg always exits with an error, so only the summary tells whether the input was read
+    stderr = _ffmpeg_stderr(["-i", str(path)])
+    duration = _DURATION_PATTERN.search(stderr)
+    stream = _AUDIO_STREAM_PATTERN.search(stderr)
+    try:
+        layout = stream.group(2).split("(")[0].strip()
+        channels = _LAYOUT_CHANNELS.get(layout) or int(layout.split()[0])  # otherwise "N channels"
+        if duration:
+            duration_s = _seconds(*duration.groups())
+        else:
+            decoded = _DECODED_TIME_PATTERN.findall(_ffmpeg_stderr(["-i", str(path), "-map", "0:a:0", "-f", "null", "-"]))
+            duration_s = _seconds(*decoded[-1])
+        return duration_s, int(stream.group(1)), channels
+    except (AttributeError, IndexError, ValueError):
+        raise StreamingError(f"Could not read audio stream info for {path}: {stderr.strip()[-500:]}")
+
+
+def probe(path: Path) -> Tuple[float, int, int]:
+    """
+    Returns (duration_s, sample_rate, channels) of the first audio stream, without decoding it.
+    Uses ffprobe, or ffmpeg's own summary of the input where ffprobe isn't installed.
+    """
+    command = [
+        _ffprobe(), "-v", "error", "-select_streams", "a:0",
+        "-show_entries", "stream=sample_rate,channels:format=duration",
+        "-of", "json", str(path),
+    ]
+    try:
+        result = subprocess.run(command, capture_output=True)
+    except FileNotFoundError:
+        # Some ffmpeg packages and container images leave ffprobe out
+        return _probe_with_ffmpeg(path)
+    except OSError as e:
+        raise StreamingError(f"Could not run ffprobe: {e}")
+    if result.returncode != 0:
+        raise StreamingError(f"ffprobe failed for {path}: {result.stderr.decode(errors='ignore').strip()}")
+    info = json.loads(result.stdout)
+    try:
+        stream = info["streams"][0]
+        return float(info["format"]["duration"]), int(stream["sample_rate"]), int(stream["channels"])
+    except (KeyError, IndexError, ValueError) as e:
+        raise StreamingError(f"Could not read audio stream info for {path}: {e}")
+
+
+def should_stream(path: Path) -> bool:
+    """Whether a file is long enough that it should be processed block by block instead of loaded whole."""
+    if not settings.AUDIO_STREAMING_ENABLED:
+        return False
+    try:
+        duration_s, _, _ = probe(path)
+    except StreamingError:
+        return False
+    return duration_s >= settings.AUDIO_STREAMING_MIN_DURATION_S
+
+
+def encode_excerpt(
+    path: Path,
+    start_ms: int,
+    duration_ms: int,
+    format: str = "mp3",
+    bitrate: Optional[str] = None,
+    channels: Optional[int] = None
+) -> bytes:
+    """Cuts and encodes part of a file with ffmpeg, without decoding the rest of it in Python."""
+    command = [_ffmpeg(), "-v", "error", "-ss", f"{start_ms / 1000.0:.3f}", "-t", f"{duration_ms / 1000.0:.3f}", "-i", str(path), "-vn"]
+    if bitrate:
+        command += ["-b:a", bitrate]
+    if channels:
+        command += ["-ac", str(channels)]
+    command += ["-f", format, "pipe:1"]
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode != 0:
+        raise StreamingError(f"ffmpeg failed to encode excerpt of {path}: {result.stderr.decode(errors='ignore').strip()}")
+    return result.stdout
+
+
+def decode_excerpt(path: Path, start_ms: int, duration_ms: int, sample_rate: int, channels: int) -> np.ndarray:
+    """Decodes part of a file to float32 (frames, channels) samples."""
+    command = [
+        _ffmpeg(), "-v", "error", "-ss", f"{start_ms / 1000.0:.3f}", "-t", f"{duration_ms / 1000.0:.3f}", "-i", str(path),
+        "-vn", "-f", "f32le", "-ar", str(sample_rate), "-ac", str(channels), "pipe:1",
+    ]
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode != 0:
+        raise StreamingError(f"ffmpeg failed to decode excerpt of {path}: {result.stderr.decode(errors='ignore').strip()}")
+    usable = len(result.stdout) - len(result.stdout) % (channels * 4)
+    return np.frombuffer(result.stdout[:usable], dtype=np.float32).reshape(-1, channels)
+
+
+def decode_blocks(path: Path, sample_rate: int, channels: int) -> Iterator[np.ndarray]:
+    """Decodes a file through an ffmpeg pipe, yielding float32 (frames, channels) blocks."""
+    command = [_ffmpeg(), "-v", "error", "-i", str(path), "-vn", "-f", "f32le", "-ar", str(sample_rate), "-ac", str(channels), "pipe:1"]
+    block_bytes = BLOCK_FRAMES * channels * 4
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+        try:
+            while True:
+                data = process.stdout.read(block_bytes)
+                if not data:
+                    break
+                usable = len(data) - len(data) % (channels * 4)
+                yield np.frombuffer(data[:usable], dtype=np.float32).reshape(-1, channels)
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        if returncode != 0:
+            stderr.seek(0)
+            raise StreamingError(f"ffmpeg failed to decode {path}: {stderr.read().decode(errors='ignore').strip()}")
+
+
+class EncodeTarget(NamedTuple):
+    """
+    One file to encode a mix to. args are extra ffmpeg output options, such as a codec,
+    bitrate, channel count or sample rate (see encoder_args).
+    """
+    path: Path
+    format: str = "mp3"
+    args: Tuple[str, ...] = ()
+
+
+def encoder_args(codec: Optional[str] = None, bitrate: Optional[str] = None, channels: Optional[int] = None, sample_rate: Optional[int] = None) -> Tuple[str, ...]:
+    """ffmpeg output options for an encoding profile. Anything left as None keeps ffmpeg's default or the mix's format."""
+    args: List[str] = []
+    if codec:
+        args += ["-c:a", codec]
+    if bitrate:
+        args += ["-b:a", bitrate]
+    if channels:
+        args += ["-ac", str(channels)]
+    if sample_rate:
+        args += ["-ar", str(sample_rate)]
+    return tuple(args)
+
+
+_PCM_FORMATS = {2: ("s16le", np.int16), 4: ("s32le", np.int32)}
+
+
+def to_pcm(block: np.ndarray, gain: float = 1.0, sample_width: int = 2) -> bytes:
+    """Converts a float32 block to little-endian integer PCM of sample_width bytes, clipping past full scale."""
+    dtype = _PCM_FORMATS[sample_width][1]
+    info = np.iinfo(dtype)
+    if sample_width == 4:
+        # float32 can't hold 32-bit full scale exactly
+        scaled = block.astype(np.float64) * (gain * (info.max + 1))
+    else:
+        scaled = block * np.float32(gain * (info.max + 1))
+    np.clip(scaled, info.min, info.max, out=scaled)
+    return scaled.astype(dtype).tobytes()
+
+
+class StreamEncoder:
+    """Feeds float32 blocks to an ffmpeg encoder process as they're produced."""
+
+    def __init__(
+        self,
+        output_path: Path,
+        sample_rate: int,
+        channels: int,
+        format: str = "mp3",
+        tags: Optional[Dict[str, str]] = None,
+        args: Sequence[str] = (),
+        sample_width: int = 2
+    ):
+        self.output_path = output_path
+        self.sample_width = sample_width if sample_width in _PCM_FORMATS else 2
+        input_format = _PCM_FORMATS[self.sample_width][0]
+        command = [_ffmpeg(), "-y", "-v", "error", "-f", input_format, "-ar", str(sample_rate), "-ac", str(channels), "-i", "pipe:0"]
+        for key, value in (tags or {}).items():
+            command += ["-metadata", f"{key}={value}"]
+        command += [*args, "-f", format, str(output_path)]
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr)
+        # ffmpeg's stderr, once it has exited
+        self._error: Optional[str] = None
+
+    @classmethod
+    def for_target(cls, target: EncodeTarget, sample_rate: int, channels: int, tags: Optional[Dict[str, str]] = None, sample_width: int = 2) -> "StreamEncoder":
+        return cls(target.path, sample_rate, channels, format=target.format, tags=tags, args=target.args, sample_width=sample_width)
+
+    def write(self, block: np.ndarray, gain: float = 1.0) -> None:
+        self.write_pcm(to_pcm(block, gain, self.sample_width))
+
+    def write_pcm(self, data: bytes) -> None:
+        try:
+            self._process.stdin.write(data)
+        except BrokenPipeError:
+            # ffmpeg exited before reading all of its input; its stderr says why
+            self._finish()
+            raise StreamingError(f"ffmpeg failed to encode {self.output_path} (exit code {self._process.returncode}): {self._error}") from None
+
+    def _finish(self) -> None:
+        """Closes ffmpeg's input, waits for it to exit and keeps its stderr. Does nothing the second time."""
+        if self._error is not None:
+            return
+        if self._process.stdin and not self._process.stdin.closed:
+            try:
+                self._process.stdin.close()
+            except BrokenPipeError:
+                pass
+        self._process.wait()
+        self._stderr.seek(0)
+        self._error = self._stderr.read().decode(errors="ignore").strip()
+        self._stderr.close()
+
+    def close(self) -> None:
+        self._finish()
+        if self._process.returncode != 0:
+            raise StreamingError(f"ffmpeg failed to encode {self.output_path} (exit code {self._process.returncode}): {self._error}")
+
+    def abort(self) -> None:
+        """Stops the encoder without waiting for it to finish the file."""
+        if self._error is not None:
+            return
+        self._process.kill()
+        self._process.wait()
+        self._error = ""
+        self._stderr.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class EncoderGroup:
+    """
+    Feeds the same float32 blocks to several encoders, each its own ffmpeg process, so
+    every output format is encoded at once from one pass over the mix. Each block is
+    converted to PCM once per sample width, not once per encoder.
+    """
+
+    def __init__(self, encoders: List[StreamEncoder]):
+        self.encoders = encoders
+
+    def write(self, block: np.ndarray, gain: float = 1.0) -> None:
+        converted: Dict[int, bytes] = {}
+        for encoder in self.encoders:
+            if encoder.sample_width not in converted:
+                converted[encoder.sample_width] = to_pcm(block, gain, encoder.sample_width)
+            encoder.write_pcm(converted[encoder.sample_width])
+
+    def close(self) -> None:
+        # Close every encoder even if one failed, then report the first failure
+        errors = []
+        for encoder in self.encoders:
+            try:
+                encoder.close()
+            except StreamingError as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+    def abort(self) -> None:
+        for encoder in self.encoders:
+            encoder.abort()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class CutListStream:
+    """
+    Renders a cut list against a file that is decoded on the fly, so the cleaned
+    content can be read sequentially in blocks without holding the source in memory.
+    """
+
+    def __init__(self, path: Path, cut_list: List[Edit], sample_rate: int, channels: int):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._decoder = decode_blocks(path, sample_rate, channels)
+        self._window = np.zeros((0, channels), dtype=np.float32)
+        self._window_start = 0
+        self._eof = False
+        self._spans = []
+        for edit in cut_list:
+            start, end = self._frame(edit.start_ms), self._frame(edit.end_ms)
+            if end > start:
+                self._spans.append((None if edit.silence else start, end - start))
+        self._span_index = 0
+        self._span_offset = 0
+
+    def _frame(self, ms: int) -> int:
+        return int(ms * self.sample_rate / 1000.0)
+
+    def _source(self, start: int, count: int) -> np.ndarray:
+        """Returns source frames [start, start + count), decoding ahead as needed. Frames past the end are silence."""
+        while not self._eof and self._window_start + len(self._window) < start + count:
+            block = next(self._decoder, None)
+            if block is None:
+                self._eof = True
+                break
+            keep_from = max(0, start - HISTORY_FRAMES - self._window_start)
+            self._window = np.concatenate((self._window[keep_from:], block))
+            self._window_start += keep_from
+        out = np.zeros((count, self.channels), dtype=np.float32)
+        lo = max(start, self._window_start)
+        hi = min(start + count, self._window_start + len(self._window))
+        if hi > lo:
+            out[lo - start:hi - start] = self._window[lo - self._window_start:hi - self._window_start]
+        return out
+
+    def read(self, count: int) -> Optional[np.ndarray]:
+        """Returns up to `count` frames of cleaned content, or None once the cut list is exhausted."""
+        parts = []
+        remaining = count
+        while remaining > 0 and self._span_index < len(self._spans):
+            source_start, length = self._spans[self._span_index]
+            take = min(remaining, length - self._span_offset)
+            if source_start is None:
+                parts.append(np.zeros((take, self.channels), dtype=np.float32))
+            else:
+                parts.append(self._source(source_start + self._span_offset, take))
+            self._span_offset += take
+            remaining -= take
+            if self._span_offset >= length:
+                self._span_index += 1
+                self._span_offset = 0
+        if not parts:
+            return None
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def close(self) -> None:
+        self._decoder.close()
+
+
+def cut_list_length_ms(cut_list: List[Edit]) -> int:
+    return sum(edit.duration_ms for edit in cut_list)
+
+
+def _mix_blocks(
+    total_frames: int,
+    sample_rate: int,
+    channels: int,
+    layers: List[Tuple[AudioBuffer, float]],
+    content: Optional[CutListStream],
+    content_start_ms: float,
+    on_content_block: Optional[Callable[[np.ndarray], None]] = None
+) -> Iterator[np.ndarray]:
+    """Yields the episode mix block by block: streamed content plus in-memory layers at their positions."""
+    placed = [(buffer, int(position_ms * sample_rate / 1000.0)) for buffer, position_ms in layers]
+    content_position = int(content_start_ms * sample_rate / 1000.0)
+    if content is not None and content_position < 0:
+        # Content that would start before the episode does is cut, as with an overlay at a negative position
+        skipped = content.read(-content_position)
+        if skipped is not None and on_content_block:
+            on_content_block(skipped)
+        content_position = 0
+
+    for block_start in range(0, total_frames, BLOCK_FRAMES):
+        block_end = min(total_frames, block_start + BLOCK_FRAMES)
+        block = np.zeros((block_end - block_start, channels), dtype=np.float32)
+
+        if content is not None and block_end > content_position:
+            offset = max(0, content_position - block_start)
+            content_block = content.read(block_end - block_start - offset)
+            if content_block is not None:
+                block[offset:offset + len(content_block)] += content_block
+                if on_content_block:
+                    on_content_block(content_block)
+
+        for buffer, position in placed:
+            lo, hi = max(block_start, position), min(block_end, position + buffer.frame_count)
+            if hi > lo:
+                block[lo - block_start:hi - block_start] += buffer.samples[lo - position:hi - position]
+        yield block
+
+    # Drain whatever content runs past the end of the episode so the cleaned copy is complete
+    if content is not None and on_content_block:
+        while (content_block := content.read(BLOCK_FRAMES)) is not None:
+            on_content_block(content_block)
+
+
+def render_episode(
+    outputs: List[EncodeTarget],
+    sample_rate: int,
+    channels: int,
+    total_duration_ms: float,
+    layers: List[Tuple[AudioBuffer, float]],
+    content_factory: Optional[Callable[[], CutListStream]] = None,
+    content_start_ms: float = 0,
+    normalize_headroom_db: Optional[float] = 0.1,
+    tags: Optional[Dict[str, str]] = None,
+    cleaned_output_path: Optional[Path] = None,
+    format: str = "mp3",
+    gain_db: float = 0.0,
+    max_gain_db: Optional[float] = None
+) -> None:
+    """
+    Mixes and encodes an episode block by block, so memory use doesn't depend on its length.
+    Every output is encoded from the same pass over the mix, in parallel encoder processes.
+    format is that of the cleaned content copy.
+
+    Peak normalization needs the peak before the first sample is written, so the
+    mix is run twice: once to measure it and once to encode. max_gain_db caps the gain it
+    arrives at (e.g. a loudness gain the peak may only reduce). With normalize_headroom_db=None
+    the mix is only run once, with gain_db applied (e.g. a loudness gain worked out beforehand).
+    When cleaned_output_path is given, the cleaned content is encoded there alongside the episode.
+    """
+    total_frames = int(total_duration_ms * sample_rate / 1000.0)
+
+    gain = 10 ** (gain_db / 20.0)
+    if normalize_headroom_db is not None:
+        content = content_factory() if content_factory else None
+        try:
+            peak = 0.0
+            for block in _mix_blocks(total_frames, sample_rate, channels, layers, content, content_start_ms):
+                if len(block):
+                    peak = max(peak, float(block.max()), float(-block.min()))
+        finally:
+            if content is not None:
+                content.close()
+        if peak > 0:
+            gain = (10 ** (-normalize_headroom_db / 20.0)) / peak
+        if max_gain_db is not None:
+            gain = min(gain, 10 ** (max_gain_db / 20.0))
+
+    content = content_factory() if content_factory else None
+    cleaned_encoder = StreamEncoder(cleaned_output_path, sample_rate, channels, format=format) if (cleaned_output_path and content) else None
+    try:
+        with EncoderGroup([StreamEncoder.for_target(target, sample_rate, channels, tags=tags) for target in outputs]) as encoders:
+            on_content_block = cleaned_encoder.write if cleaned_encoder else None
+            for block in _mix_blocks(total_frames, sample_rate, channels, layers, content, content_start_ms, on_content_block):
+                encoders.write(block, gain)
+        if cleaned_encoder:
+            cleaned_encoder.close()
+            cleaned_encoder = None
+    finally:
+        if cleaned_encoder:
+            cleaned_encoder.abort()
+        if content is not None:
+            content.close()
@@ -0,0 +1,45 @@
+import struct
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from ..core.config import settings
+from .disk_cache import DiskCache, hash_file, make_key
+from .word_timeline import WordTimeline
+
+# Bump when the on-disk layout changes; old entries then simply stop matching.
+FORMAT_VERSION = 3
+
+cache = DiskCache(Path(settings.TRANSCRIPT_CACHE_DIR), settings.TRANSCRIPT_CACHE_MAX_BYTES, suffix=".tc")
+
+
+def cache_key(audio_path: Path, model: str, options: Dict[str, Any]) -> str:
+    """Transcripts are keyed by what was transcribed and how, never by filename."""
+    return make_key(FORMAT_VERSION, hash_file(audio_path), model, options)
+
+
+def encode(word_timestamps: Union[WordTimeline, List[Dict[str, Any]]]) -> bytes:
+    """
+    Stores transcripts in WordTimeline's binary form: columns plus an interned vocab,
+    around 20 bytes a word. It's left uncompressed so a hit decodes without a pass over the data.
+    """
+    return WordTimeline.from_words(word_timestamps).to_bytes()
+
+
+def decode(data: bytes) -> WordTimeline:
+    return WordTimeline.from_bytes(data)
+
+
+def load(key: str) -> Optional[WordTimeline]:
+    data = cache.get(key)
+    if data is None:
+        return None
+    try:
+        return decode(data)
+    except (ValueError, UnicodeDecodeError, struct.error):
+        # A corrupt entry is just a miss
+        cache.delete(key)
+        return None
+
+
+def store(key: str, word_timestamps: Union[WordTimeline, List[Dict[str, Any]]]) -> None:
+    cache.put(key, encode(word_timestamps))
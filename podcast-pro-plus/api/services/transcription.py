@@ -1,68 +1,120 @@
 import os
 import io
-import openai
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
 from pydub import AudioSegment
 
 from ..core.config import settings
+from . import chunk_planner, streaming, transcript_cache, transcription_backends
+from .word_timeline import WordTimeline
 from api.routers.media import MEDIA_DIR
 
-client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-
 # UPLOAD_DIR = Path("temp_uploads") # Removed, using MEDIA_DIR
 
-# OpenAI Whisper API has a 25MB file size limit. To handle larger files,
-# we will chunk the audio into 10-minute segments, as a 10-minute MP3
-# will reliably be under the 25MB limit.
-CHUNK_DURATION_MS = 10 * 60 * 1000
+# OpenAI Whisper API has a 25MB file size limit. Larger files are split by
+# chunk_planner into chunks that encode under it at TRANSCRIPTION_CHUNK_BITRATE_KBPS.
 
 class TranscriptionError(Exception):
     """Custom exception for transcription failures."""
     pass
 
-def get_word_timestamps(filename: str) -> List[Dict[str, Any]]:
+def _export_mp3(chunk: AudioSegment, bitrate: str) -> bytes:
+    buffer = io.BytesIO()
+    chunk.set_channels(1).export(buffer, format="mp3", bitrate=bitrate)
+    return buffer.getvalue()
+
+def _resolve_audio_path(filename: Union[str, Path]) -> Path:
+    audio_path = filename if isinstance(filename, Path) else MEDIA_DIR / filename # Use MEDIA_DIR here
+    if not audio_path.exists():
+        raise TranscriptionError(f"Audio file not found: {filename}")
+    return audio_path
+
+def _get_backend() -> transcription_backends.TranscriptionBackend:
+    try:
+        return transcription_backends.get_backend(settings.TRANSCRIPTION_BACKEND)
+    except transcription_backends.TranscriptionBackendError as e:
+        raise TranscriptionError(str(e))
+
+def _backend_cache_id() -> str:
+    try:
+        return transcription_backends.backend_class(settings.TRANSCRIPTION_BACKEND).cache_id()
+    except transcription_backends.TranscriptionBackendError as e:
+        raise TranscriptionError(str(e))
+
+def _chunk_settings():
+    """(bitrate, chunk limit in ms) for chunk uploads under the current settings."""
+    bitrate = f"{settings.TRANSCRIPTION_CHUNK_BITRATE_KBPS}k"
+    return bitrate, chunk_planner.max_chunk_ms(settings.TRANSCRIPTION_CHUNK_BITRATE_KBPS, settings.TRANSCRIPTION_MAX_CHUNK_S)
+
+def transcript_key(filename: Union[str, Path]) -> str:
+    """
+    Identifies the transcript get_word_timestamps would return for a file: its content
+    hash plus the backend and chunking settings. Computing it doesn't transcribe anything,
+    or create the backend.
+    """
+    audio_path = _resolve_audio_path(filename)
+    bitrate, chunk_limit_ms = _chunk_settings()
+    return transcript_cache.cache_key(audio_path, _backend_cache_id(), {
+        "chunk_limit_ms": chunk_limit_ms,
+        "chunk_bitrate": bitrate,
+        "overlap_ms": chunk_planner.OVERLAP_MS,
+        "timestamp_granularities": ["word"],
+    })
+
+def get_word_timestamps(filename: Union[str, Path], use_cache: bool = True) -> WordTimeline:
     """
     Transcribes an audio file to get word-level timestamps, handling large files by chunking.
+    A bare filename is looked up in MEDIA_DIR. Results are cached by the file's content.
+    The words come back as a WordTimeline, which still indexes and iterates like the old word dicts.
+    Chunks are cut in pauses where possible (see chunk_planner), and transcribed by
+    the configured backend (see transcription_backends), several at a time.
     """
-    audio_path = MEDIA_DIR / filename # Use MEDIA_DIR here
-    if not audio_path.exists():
-        raise TranscriptionError(f"Audio file not found: {filename}")
+    audio_path = _resolve_audio_path(filename)
+    bitrate, chunk_limit_ms = _chunk_settings()
+    cache_key = transcript_key(audio_path)
+    if use_cache:
+        cached_words = transcript_cache.load(cache_key)
+        if cached_words is not None:
+            return cached_words
+    backend = _get_backend()
 
     try:
-        audio = AudioSegment.from_file(audio_path)
-        
-        chunks = [audio[i:i + CHUNK_DURATION_MS] for i in range(0, len(audio), CHUNK_DURATION_MS)]
-        
-        all_words = []
-        time_offset_s = 0.0
-
-        for i, chunk in enumerate(chunks):
-            buffer = io.BytesIO()
-            chunk.export(buffer, format="mp3")
-            buffer.seek(0)
+        if streaming.should_stream(audio_path):
+            # Long files are cut and encoded by ffmpeg directly, chunk by chunk, instead of decoded whole
+            duration_ms = int(streaming.probe(audio_path)[0] * 1000)
+            read_window = lambda start_ms, window_ms: streaming.decode_excerpt(
+                audio_path, start_ms, window_ms, chunk_planner.ANALYSIS_SAMPLE_RATE, 1)[:, 0]
+            encode_chunk = lambda chunk: streaming.encode_excerpt(
+                audio_path, chunk.start_ms, chunk.duration_ms, bitrate=bitrate, channels=1)
+        else:
+            audio = AudioSegment.from_file(audio_path)
+            duration_ms = len(audio)
+            read_window = lambda start_ms, window_ms: chunk_planner.segment_window(audio, start_ms, window_ms)
+            encode_chunk = lambda chunk: _export_mp3(audio[chunk.start_ms:chunk.end_ms], bitrate)
+
+        chunks = chunk_planner.plan_chunks(duration_ms, read_window, chunk_limit_ms)
+
+        def encode_input(i: int) -> transcription_backends.ChunkInput:
+            data = encode_chunk(chunks[i])
+            if len(data) > chunk_planner.WHISPER_MAX_UPLOAD_BYTES:
+                raise TranscriptionError(f"Chunk {i} encoded to {len(data)} bytes, over the upload limit.")
+            buffer = io.BytesIO(data)
             buffer.name = f"chunk_{i}.mp3"
+            return buffer, chunks[i].duration_ms / 1000.0
+
+        def transcribe_batch(batch: range) -> List[List[Dict[str, Any]]]:
+            return backend.transcribe_batch([encode_input(i) for i in batch])
+
+        batches = [range(i, min(i + backend.batch_size, len(chunks))) for i in range(0, len(chunks), backend.batch_size)]
+        max_workers = max(1, min(backend.max_workers, len(batches)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # map() returns results in chunk order regardless of which finishes first
+            chunk_words = [words for batch_words in executor.map(transcribe_batch, batches) for words in batch_words]
 
-            response = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=buffer,
-                response_format="verbose_json",
-                timestamp_granularities=["word"]
-            )
-
-            # --- FIX: Handle the 'TranscriptionWord' object correctly ---
-            # Instead of modifying the response object directly, we create a new
-            # dictionary for each word and access attributes with a dot (e.g., word_obj.start).
-            for word_obj in response.words:
-                new_word_dict = {
-                    'word': word_obj.word,
-                    'start': word_obj.start + time_offset_s,
-                    'end': word_obj.end + time_offset_s
-                }
-                all_words.append(new_word_dict)
-            
-            time_offset_s += chunk.duration_seconds
+        all_words = WordTimeline.from_words(chunk_planner.stitch(chunks, chunk_words))
 
+        transcript_cache.store(cache_key, all_words)
         return all_words
 
     except Exception as e:
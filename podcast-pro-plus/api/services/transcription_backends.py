@@ -0,0 +1,218 @@
+import bisect
+import io
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Tuple, Type
+
+import numpy as np
+import openai
+
+from ..core.config import settings
+
+try:
+    from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+except ImportError:  # Optional: only needed for TRANSCRIPTION_BACKEND="local" (requirements-local-transcription.txt)
+    BatchedInferencePipeline = WhisperModel = None
+
+WHISPER_MODEL = "whisper-1"
+
+# One encoded chunk (an MP3 in a named BytesIO) and its duration in seconds
+ChunkInput = Tuple[io.BytesIO, float]
+Words = List[Dict[str, Any]]
+
+
+class TranscriptionBackendError(Exception):
+    """Custom exception for a backend that can't be set up."""
+    pass
+
+
+class TranscriptionBackend(ABC):
+    """
+    Turns encoded chunks into word timestamps, timed from the start of each chunk.
+
+    get_word_timestamps hands each backend batches of up to batch_size chunks,
+    running up to max_workers batches at once. Subclasses implement cache_id and
+    transcribe_batch; one missing either can't be instantiated.
+    """
+    name = ""
+    batch_size = 1
+
+    @classmethod
+    @abstractmethod
+    def cache_id(cls) -> str:
+        """
+        Identifies the model and its settings in transcript cache keys. Read from
+        settings, so a key can be computed without creating the backend (and loading its model).
+        """
+
+    @property
+    def max_workers(self) -> int:
+        return settings.TRANSCRIPTION_MAX_WORKERS
+
+    @abstractmethod
+    def transcribe_batch(self, chunks: List[ChunkInput]) -> List[Words]:
+        """Word timestamps for each chunk, in the order given."""
+
+
+class OpenAIBackend(TranscriptionBackend):
+    """OpenAI's hosted Whisper. Chunks are independent requests, so they're run one per worker."""
+    name = "openai"
+
+    def __init__(self):
+        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+
+    @classmethod
+    def cache_id(cls) -> str:
+        return WHISPER_MODEL
+
+    def transcribe_batch(self, chunks: List[ChunkInput]) -> List[Words]:
+        results = []
+        for buffer, _ in chunks:
+            response = self.client.audio.transcriptions.create(
+                model=WHISPER_MODEL,
+                file=buffer,
+                response_format="verbose_json",
+                timestamp_granularities=["word"]
+            )
+            # --- FIX: Handle the 'TranscriptionWord' object correctly ---
+            # Instead of modifying the response object directly, we create a new
+            # dictionary for each word and access attributes with a dot (e.g., word_obj.start).
+            results.append([{'word': word_obj.word, 'start': word_obj.start, 'end': word_obj.end} for word_obj in response.words])
+        return results
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    Whisper on our own CPU cores via faster-whisper (CTranslate2).
+
+    The model is loaded once per process. Each call transcribes up to
+    TRANSCRIPTION_LOCAL_CHUNKS_PER_BATCH chunks together, so 30s windows from all of
+    them fill the same inference batches of TRANSCRIPTION_LOCAL_BATCH_SIZE, instead of
+    every chunk ending on a part-empty batch. Calls run one at a time because a single
+    batched inference already uses every core it's given.
+    """
+    name = "local"
+
+    def __init__(self):
+        if WhisperModel is None:
+            raise TranscriptionBackendError(
+                "The local transcription backend needs faster-whisper: pip install -r requirements-local-transcription.txt"
+            )
+        self.model_size = settings.TRANSCRIPTION_LOCAL_MODEL
+        self.compute_type = settings.TRANSCRIPTION_LOCAL_COMPUTE_TYPE
+        self.window_batch_size = settings.TRANSCRIPTION_LOCAL_BATCH_SIZE
+        try:
+            model = WhisperModel(
+                self.model_size,
+                device="cpu",
+                compute_type=self.compute_type,
+                cpu_threads=settings.TRANSCRIPTION_LOCAL_CPU_THREADS
+            )
+        except Exception as e:
+            # Usually the model isn't downloaded yet and the hub can't be reached
+            raise TranscriptionBackendError(f"Could not load the local Whisper model '{self.model_size}': {e}")
+        self.sampling_rate = model.feature_extractor.sampling_rate
+        self.window_s = model.feature_extractor.chunk_length
+        self.pipeline = BatchedInferencePipeline(model=model)
+
+    @classmethod
+    def cache_id(cls) -> str:
+        return f"faster-whisper:{settings.TRANSCRIPTION_LOCAL_MODEL}:{settings.TRANSCRIPTION_LOCAL_COMPUTE_TYPE}"
+
+    @property
+    def batch_size(self) -> int:
+        return max(1, settings.TRANSCRIPTION_LOCAL_CHUNKS_PER_BATCH)
+
+    @property
+    def max_workers(self) -> int:
+        return 1
+
+    def _speech_clips(self, audio: np.ndarray) -> List[Tuple[int, int]]:
+        """
+        (start, end) samples of the speech in one chunk, merged into clips of at most
+        one window, as the pipeline cuts a single file when it runs the VAD itself.
+        """
+        window = self.window_s * self.sampling_rate
+        speech = get_speech_timestamps(audio, VadOptions(max_speech_duration_s=self.window_s, min_silence_duration_ms=160))
+        clips: List[List[int]] = []
+        for region in speech:
+            if clips and region["end"] - clips[-1][0] <= window:
+                clips[-1][1] = region["end"]
+            else:
+                clips.append([region["start"], region["end"]])
+        return [(start, end) for start, end in clips]
+
+    def transcribe_batch(self, chunks: List[ChunkInput]) -> List[Words]:
+        # The chunks are joined end to end. Every clip lies inside one chunk, so each
+        # segment the pipeline returns can be handed back to the chunk it came from.
+        audio_parts, chunk_starts, clip_timestamps = [], [], []
+        offset = 0
+        for buffer, _ in chunks:
+            audio = decode_audio(buffer, sampling_rate=self.sampling_rate)
+            clip_timestamps += [
+                {"start": (offset + start) / self.sampling_rate, "end": (offset + end) / self.sampling_rate}
+                for start, end in self._speech_clips(audio)
+            ]
+            audio_parts.append(audio)
+            chunk_starts.append(offset / self.sampling_rate)
+            offset += len(audio)
+        results: List[Words] = [[] for _ in chunks]
+        if not clip_timestamps:
+            return results
+
+        segments, _ = self.pipeline.transcribe(
+            np.concatenate(audio_parts), clip_timestamps=clip_timestamps,
+            batch_size=self.window_batch_size, word_timestamps=True
+        )
+        for segment in segments:
+            # By its midpoint, which can't be rounded across a chunk boundary
+            index = bisect.bisect_right(chunk_starts, (segment.start + segment.end) / 2) - 1
+            chunk_start = chunk_starts[index]
+            # faster-whisper keeps Whisper's leading space on each word; the API strips it
+            results[index] += [
+                {'word': word.word.strip(), 'start': max(0.0, round(word.start - chunk_start, 3)), 'end': max(0.0, round(word.end - chunk_start, 3))}
+                for word in (segment.words or [])
+            ]
+        return results
+
+
+class FakeBackend(TranscriptionBackend):
+    """
+    Deterministic offline stand-in: one word every half second, after a
+    simulated request latency. Used for benchmarks and local testing.
+    """
+    name = "fake"
+
+    @classmethod
+    def cache_id(cls) -> str:
+        return "fake"
+
+    def transcribe_batch(self, chunks: List[ChunkInput]) -> List[Words]:
+        time.sleep(settings.TRANSCRIPTION_FAKE_LATENCY_S)
+        return [
+            [{'word': f"word{i}", 'start': i * 0.5, 'end': i * 0.5 + 0.3} for i in range(int(duration_s / 0.5))]
+            for _, duration_s in chunks
+        ]
+
+
+BACKENDS = {backend.name: backend for backend in (OpenAIBackend, LocalWhisperBackend, FakeBackend)}
+
+_instances: Dict[str, TranscriptionBackend] = {}
+_instances_lock = threading.Lock()
+
+
+def backend_class(name: str) -> Type[TranscriptionBackend]:
+    if name not in BACKENDS:
+        raise TranscriptionBackendError(f"Unknown transcription backend: {name}")
+    return BACKENDS[name]
+
+
+def get_backend(name: str) -> TranscriptionBackend:
+    """Returns the shared instance of a backend, creating it (and loading any model) on first use."""
+    cls = backend_class(name)
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = cls()
+        return _instances[name]
@@ -0,0 +1,32 @@
+import unicodedata
+from pathlib import Path
+from typing import Optional
+
+from ..core.config import settings
+from .disk_cache import DiskCache, make_key
+
+# Bump when the key scheme changes; old entries then simply stop matching.
+FORMAT_VERSION = 1
+
+cache = DiskCache(Path(settings.TTS_CACHE_DIR), settings.TTS_CACHE_MAX_BYTES, suffix=".mp3")
+
+
+def normalize_text(text: str) -> str:
+    """Scripts that differ only in Unicode form or whitespace are spoken the same, so they share an entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text: str, voice_id: str, model_id: str, output_format: str) -> str:
+    """
+    Speech is keyed by everything that changes the audio ElevenLabs returns. The text is
+    normalized for the key only; ElevenLabs is still sent the script as written.
+    """
+    return make_key(FORMAT_VERSION, voice_id, normalize_text(text), model_id, output_format)
+
+
+def load(key: str) -> Optional[bytes]:
+    return cache.get(key)
+
+
+def store(key: str, audio_bytes: bytes) -> None:
+    cache.put(key, audio_bytes)
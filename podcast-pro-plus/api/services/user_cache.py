@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy.event import listen
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from ..core.config import settings
+from ..models.user import User, UserBase
+
+try:
+    import redis
+    import redis.asyncio as redis_asyncio
+except ImportError:  # Optional: only needed when USER_CACHE_REDIS_URL is set (requirements-redis.txt)
+    redis = None
+
+
+class UserCacheError(Exception):
+    """Custom exception for a user cache that can't be set up."""
+    pass
+
+
+# Never cached, so the password hash stays in the database. A cached user reloads it from
+# there if it's read once the user is added to a session (and raises while detached).
+_UNCACHED_COLUMNS = {"hashed_password"}
+
+
+class _CachedUser(UserBase):
+    """The cached columns of a User, for reading them back from JSON (table models don't validate)."""
+    id: UUID
+    created_at: datetime
+
+
+# --- Stores ---
+class LocalStore:
+    """Keeps users in this process, most recently used last."""
+
+    def __init__(self, max_entries: int):
+        # email -> (expires_at, columns)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+    async def get(self, email: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[email]
+                return None
+            self._entries.move_to_end(email)
+            return entry[1]
+
+    async def put(self, email: str, columns: Dict[str, Any], ttl_s: float) -> None:
+        with self._lock:
+            self._entries[email] = (time.monotonic() + ttl_s, columns)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, email: str) -> None:
+        with self._lock:
+            self._entries.pop(email, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisStore:
+    """
+    Keeps users in Redis so every API worker shares them, and a change made through
+    one worker is seen by all of them straight away.
+    """
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise UserCacheError("USER_CACHE_REDIS_URL is set but the redis package is not installed: pip install -r requirements-redis.txt")
+        # Lookups are awaited on the event loop; invalidation happens on commit, in sync code
+        self._async_client = redis_asyncio.Redis.from_url(url)
+        self._client = redis.Redis.from_url(url)
+
+    async def get(self, email: str) -> Optional[Dict[str, Any]]:
+        raw = await self._async_client.get(f"usercache:{email}")
+        return _CachedUser.model_validate_json(raw).model_dump() if raw else None
+
+    async def put(self, email: str, columns: Dict[str, Any], ttl_s: float) -> None:
+        raw = _CachedUser.model_validate(columns).model_dump_json()
+        await self._async_client.set(f"usercache:{email}", raw, px=int(ttl_s * 1000))
+
+    def delete(self, email: str) -> None:
+        self._client.delete(f"usercache:{email}")
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter("usercache:*"):
+            self._client.delete(key)
+
+
+_store = None
+_store_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RedisStore(settings.USER_CACHE_REDIS_URL) if settings.USER_CACHE_REDIS_URL else LocalStore(settings.USER_CACHE_MAX_ENTRIES)
+        return _store
+
+
+async def get(email: str) -> Optional[User]:
+    """
+    The user with this email as of at most USER_CACHE_TTL_S ago, or None on a miss.
+    Each call returns a new detached User, so endpoints can change it and add it
+    to their session like one they loaded themselves.
+    """
+    global _hits, _misses
+    if settings.USER_CACHE_TTL_S <= 0:
+        return None
+    columns = await get_store().get(email)
+    if columns is None:
+        _misses += 1
+        return None
+    _hits += 1
+    user = User(**columns)
+    make_transient_to_detached(user)
+    return user
+
+
+async def put(user: User) -> None:
+    if settings.USER_CACHE_TTL_S > 0:
+        await get_store().put(user.email, user.model_dump(exclude=_UNCACHED_COLUMNS), settings.USER_CACHE_TTL_S)
+
+
+def invalidate(email: str) -> None:
+    get_store().delete(email)
+
+
+def clear() -> None:
+    get_store().clear()
+
+
+def stats() -> Dict[str, Any]:
+    total = _hits + _misses
+    store = get_store()
+    return {
+        "hits": _hits,
+        "misses": _misses,
+        "hit_rate": _hits / total if total else 0.0,
+        "entries": len(store) if isinstance(store, LocalStore) else None,
+        "shared": bool(settings.USER_CACHE_REDIS_URL),
+    }
+
+
+# --- Invalidation ---
+# Any session that changes or deletes a user drops it from the cache once the change
+# is committed, so the next request can't reload the old row and cache it again.
+def _note_changed_user(mapper, connection, target: User) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_emails", set()).add(target.email)
+
+
+def _invalidate_committed_users(session: Session) -> None:
+    emails: Set[str] = session.info.pop("changed_user_emails", set())
+    for email in emails:
+        invalidate(email)
+
+
+def _forget_rolled_back_users(session: Session) -> None:
+    session.info.pop("changed_user_emails", None)
+
+
+listen(User, "after_update", _note_changed_user)
+listen(User, "after_delete", _note_changed_user)
+listen(Session, "after_commit", _invalidate_committed_users)
+listen(Session, "after_rollback", _forget_rolled_back_users)
@@ -0,0 +1,238 @@
+"""
+Query plan audit for the crud module.
+
+Seeds a throwaway database of realistic size, calls every read function in
+api.core.crud (and the ORM loads behind deleting a podcast or template), and
+runs each SQL statement they send under EXPLAIN on the same connection.
+Statements whose plan reads a whole table or index instead of seeking one are
+reported as full scans. Statements that filter episodes on status without
+user_id are reported too: status has a handful of values, so it's only indexed
+after user_id, and a query on it alone would read most of the table once the
+data stops being as small as it is here. Exits with status 1 if it finds either
+(full scans that aren't listed in EXPECTED_SCANS), so it can run before a deploy.
+
+Functions are called with arguments picked by parameter name. A new crud
+function with a parameter the audit doesn't know is reported as skipped, so
+add a fixture for it. Optional arguments (cursor, order and the filters)
+are each audited in a second call with the filter set. Writes (create_*)
+aren't audited; inserts don't scan.
+
+Run from the podcast-pro-plus directory:
+    python -m scripts.audit_queries [users] [episodes per user]
+"""
+import asyncio
+import inspect
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+# Full scans that are the point of the query
+EXPECTED_SCANS = {
+    "get_all_users": "the admin list of every user",
+}
+# Optional filters that get a call of their own, since each changes the statement
+FILTERS = ["cursor", "order", "status", "category", "podcast_id"]
+# A statement's WHERE clause, up to whatever follows it
+WHERE_CLAUSE = re.compile(r"\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|$)", re.IGNORECASE)
+
+
+def filters_on_status_alone(statement: str) -> bool:
+    """Whether a statement's WHERE clause tests episode.status without episode.user_id."""
+    match = WHERE_CLAUSE.search(statement)
+    if match is None:
+        return False
+    where = match.group(1)
+    return "episode.status" in where and "episode.user_id" not in where
+
+
+class PlanRecorder:
+    """Runs EXPLAIN for every statement sent while a label is set, on the connection that sent it."""
+
+    def __init__(self, dialect: str):
+        self.prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+        self.dialect = dialect
+        self.label: Optional[str] = None
+        self.plans: List[Tuple[str, str, List[str]]] = []
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.label is None or executemany or not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            return
+        # A raw DBAPI cursor, so the EXPLAIN doesn't come back through this event
+        explain = conn.connection.cursor()
+        explain.execute(self.prefix + statement, parameters)
+        rows = explain.fetchall()
+        explain.close()
+        lines = [str(row[-1]) if self.dialect == "sqlite" else str(row[0]) for row in rows]
+        self.plans.append((self.label, " ".join(statement.split()), lines))
+
+    def full_scans(self, lines: List[str]) -> List[str]:
+        if self.dialect == "sqlite":
+            # "SCAN t" reads the table, "SCAN t USING [COVERING] INDEX i" the whole index; "SEARCH" seeks
+            return [line for line in lines if line.startswith("SCAN ") and not line.startswith("SCAN CONSTANT")]
+        return [line for line in lines if "Seq Scan" in line]
+
+
+def _seed(engine, users: int, episodes_per_user: int) -> Dict[str, Any]:
+    from sqlalchemy import insert, text
+    from api.models.user import User
+    from api.models.podcast import Episode, EpisodeStatus, MediaCategory, MediaItem, Podcast, PodcastTemplate
+
+    rng = random.Random(13)
+    start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    user_rows, podcast_rows, template_rows, episode_rows, media_rows = [], [], [], [], []
+    for u in range(users):
+        user_id = uuid4()
+        user_rows.append({"id": user_id, "email": f"user{u}@example.com", "hashed_password": "-", "created_at": start})
+        podcast_ids = [uuid4() for _ in range(2)]
+        podcast_rows += [{"id": p, "user_id": user_id, "name": f"Show {u}.{i}"} for i, p in enumerate(podcast_ids)]
+        template_ids = [uuid4() for _ in range(3)]
+        template_rows += [{"id": t, "user_id": user_id, "name": f"Template {u}.{i}"} for i, t in enumerate(template_ids)]
+        for e in range(episodes_per_user):
+            episode_rows.append({
+                "id": uuid4(), "user_id": user_id, "podcast_id": rng.choice(podcast_ids), "template_id": rng.choice(template_ids),
+                "title": f"Episode {e}", "status": rng.choice(list(EpisodeStatus)), "is_published_to_spreaker": False,
+                "audio_outputs_json": "[]", "processed_at": start + timedelta(hours=e + rng.random()),
+            })
+        for m in range(episodes_per_user // 3):
+            media_rows.append({
+                "id": uuid4(), "user_id": user_id, "filename": f"{m}.mp3", "category": rng.choice(list(MediaCategory)),
+                "created_at": start + timedelta(minutes=m),
+            })
+    with engine.begin() as conn:
+        for model, rows in [(User, user_rows), (Podcast, podcast_rows), (PodcastTemplate, template_rows), (Episode, episode_rows), (MediaItem, media_rows)]:
+            conn.execute(insert(model), rows)
+        # Planners pick indexes by table statistics, as they would on a live database
+        conn.execute(text("ANALYZE"))
+
+    # Arguments for a user in the middle of the tables
+    user = user_rows[users // 2]
+    episode = next(row for row in episode_rows if row["user_id"] == user["id"])
+    return {
+        "user_id": user["id"],
+        "email": user["email"],
+        "template_id": next(row["id"] for row in template_rows if row["user_id"] == user["id"]),
+        "episode_id": episode["id"],
+        "podcast_id": episode["podcast_id"],
+        "status": EpisodeStatus.processed,
+        "category": MediaCategory.music,
+    }
+
+
+def _crud_reads() -> List[Tuple[str, Callable]]:
+    from api.core import crud
+    return [
+        (name, function) for name, function in inspect.getmembers(crud, inspect.isfunction)
+        if function.__module__ == crud.__name__ and not name.startswith(("_", "create_"))
+    ]
+
+
+def _calls(function: Callable, fixtures: Dict[str, Any]) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+    """(variant, kwargs) to call function with, or None if it takes an argument there's no fixture for."""
+    parameters = inspect.signature(function).parameters
+    required = {}
+    for name, parameter in parameters.items():
+        if name == "session":
+            continue
+        if parameter.default is inspect.Parameter.empty:
+            if name not in fixtures:
+                return None
+            required[name] = fixtures[name]
+    calls = [("", required)]
+    calls += [(name, {**required, name: fixtures[name]}) for name in FILTERS if name in parameters and name in fixtures]
+    return calls
+
+
+async def _audit(recorder: PlanRecorder, fixtures: Dict[str, Any]) -> List[str]:
+    from sqlmodel import Session
+    from api.core import database
+    from api.core.config import settings
+    from api.core.pagination import SortOrder, encode_cursor
+    from api.models.podcast import Podcast, PodcastTemplate
+
+    # A first page, and one from partway through the user's list
+    fixtures["limit"] = settings.LIST_PAGE_SIZE_DEFAULT
+    fixtures["cursor"] = encode_cursor(datetime(2022, 1, 2, tzinfo=timezone.utc), uuid4())
+    fixtures["order"] = SortOrder.oldest
+    skipped = []
+    for name, function in _crud_reads():
+        calls = _calls(function, fixtures)
+        if calls is None:
+            skipped.append(name)
+            continue
+        for variant, kwargs in calls:
+            recorder.label = f"{name}[{variant}]" if variant else name
+            if inspect.iscoroutinefunction(function):
+                async with database.AsyncSession(database.get_async_engine()) as session:
+                    await function(session, **kwargs)
+            else:
+                with Session(database.engine) as session:
+                    function(session, **kwargs)
+
+    # Deleting a podcast deletes its episodes, and deleting a template detaches its episodes,
+    # so the ORM looks them up by foreign key first. Rolled back, so the data is unchanged.
+    for label, model, key in [("delete podcast", Podcast, "podcast_id"), ("delete template", PodcastTemplate, "template_id")]:
+        recorder.label = label
+        with Session(database.engine) as session:
+            session.delete(session.get(model, fixtures[key]))
+            session.flush()
+            session.rollback()
+    recorder.label = None
+    return skipped
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    episodes_per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(work_dir) / 'audit.db'}"
+        os.environ["DATABASE_ASYNC_URL"] = ""
+        os.environ["DATABASE_ECHO"] = "false"
+        from sqlalchemy.engine import Engine
+        from sqlalchemy.event import listen
+        from api.core import database
+
+        database.create_db_and_tables()
+        fixtures = _seed(database.engine, users, episodes_per_user)
+        recorder = PlanRecorder(database.engine.dialect.name)
+        # On the class, so statements from the async engine are explained too
+        listen(Engine, "after_cursor_execute", recorder.after_cursor_execute)
+        skipped = asyncio.run(_audit(recorder, fixtures))
+        asyncio.run(database.dispose_engines())
+
+    print(f"{users} users, {users * episodes_per_user} episodes, {len(recorder.plans)} statements\n")
+    unexpected = status_alone = 0
+    for label, statement, lines in recorder.plans:
+        scans = recorder.full_scans(lines)
+        expected = EXPECTED_SCANS.get(label.split("[")[0])
+        by_status = filters_on_status_alone(statement)
+        if by_status:
+            status_alone += 1
+            verdict = "STATUS WITHOUT USER"
+        elif scans and not expected:
+            unexpected += 1
+            verdict = "FULL SCAN"
+        elif scans:
+            verdict = f"full scan, expected: {expected}"
+        else:
+            verdict = "ok"
+        print(f"{label}: {verdict}")
+        for line in lines:
+            print(f"    {line}")
+        if by_status or (scans and not expected):
+            print(f"    {statement[:300]}")
+    for name in skipped:
+        print(f"{name}: SKIPPED, no fixture for one of its parameters")
+
+    print(f"\n{unexpected} unexpected full scan(s), {status_alone} status filter(s) without a user, {len(skipped)} function(s) skipped")
+    sys.exit(1 if unexpected or status_alone or skipped else 0)
+
+
+if __name__ == "__main__":
+    main()
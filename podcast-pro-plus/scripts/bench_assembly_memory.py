@@ -0,0 +1,83 @@
+"""
+Memory and time benchmark for the final mix (stitching, music, fades, normalize).
+
+Runs the old AudioSegment chain and the AudioBuffer path on the same synthetic
+episode and reports wall time and tracemalloc peak for each.
+
+Run from the podcast-pro-plus directory:
+    python -m scripts.bench_assembly_memory [content_minutes ...]
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from pydub import AudioSegment
+from pydub.effects import normalize
+
+from api.services.audio_buffer import AudioBuffer
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+
+def make_noise(duration_s: float, level: float = 0.2, seed: int = 0) -> AudioSegment:
+    rng = np.random.default_rng(seed)
+    samples = (rng.uniform(-level, level, int(duration_s * SAMPLE_RATE) * CHANNELS) * 32767).astype(np.int16)
+    return AudioSegment(data=samples.tobytes(), sample_width=2, frame_rate=SAMPLE_RATE, channels=CHANNELS)
+
+
+def mix_with_pydub(intro, content, outro, music):
+    content_start_ms = len(intro) - 2000
+    outro_start_ms = content_start_ms + len(content) - 5000
+    final_audio = AudioSegment.silent(duration=outro_start_ms + len(outro))
+    final_audio = final_audio.overlay(intro, position=0)
+    final_audio = final_audio.overlay(content, position=content_start_ms)
+    final_audio = final_audio.overlay(outro, position=outro_start_ms)
+    music_to_apply = music * int(len(intro) / len(music) + 1)
+    music_to_apply = music_to_apply[:len(intro)].fade_in(2000).fade_out(3000)
+    final_audio = final_audio.overlay(music_to_apply - 15, position=0)
+    return normalize(final_audio)
+
+
+def mix_with_buffer(intro, content, outro, music):
+    content_start_ms = len(intro) - 2000
+    outro_start_ms = content_start_ms + len(content) - 5000
+    final_mix = AudioBuffer.silent(outro_start_ms + len(outro), SAMPLE_RATE, CHANNELS)
+    final_mix.overlay_segment(intro, position_ms=0)
+    final_mix.overlay_segment(content, position_ms=content_start_ms)
+    final_mix.overlay_segment(outro, position_ms=outro_start_ms)
+    music_to_apply = AudioBuffer.from_segment(music).looped(len(intro))
+    music_to_apply.fade_in(2000).fade_out(3000).apply_gain(-15)
+    final_mix.overlay(music_to_apply, position_ms=0)
+    final_mix.normalize()
+    return final_mix.into_segment(2)
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    minutes_list = [float(m) for m in sys.argv[1:]] or [10, 30, 60]
+    intro, outro, music = make_noise(45, seed=1), make_noise(30, seed=2), make_noise(20, seed=3)
+    print(f"{'content':>8} {'pydub time':>11} {'pydub peak':>11} {'buffer time':>12} {'buffer peak':>12} {'max diff':>9}")
+    for minutes in minutes_list:
+        content = make_noise(minutes * 60)
+        legacy, legacy_s, legacy_peak = measure(mix_with_pydub, intro, content, outro, music)
+        mixed, buffer_s, buffer_peak = measure(mix_with_buffer, intro, content, outro, music)
+        diff = np.abs(
+            np.frombuffer(legacy.raw_data, dtype=np.int16).astype(np.int32)
+            - np.frombuffer(mixed.raw_data, dtype=np.int16)[:len(legacy.raw_data) // 2]
+        ).max() / 32768.0
+        print(f"{minutes:>7.0f}m {legacy_s:>10.2f}s {legacy_peak / 2**20:>9.0f}MB {buffer_s:>11.2f}s {buffer_peak / 2**20:>10.0f}MB {diff:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark for filler word / pause removal.
+
+Compares the old `+=` concatenation loop against the cut list engine on
+synthetic transcripts of increasing length, and checks both produce the
+same audio.
+
+Run from the podcast-pro-plus directory:
+    python -m scripts.bench_cleanup
+"""
+import os
+import random
+import time
+from typing import List, Dict, Any, Set
+
+from pydub import AudioSegment
+
+from api.services import cut_list
+
+FILLERS = {"um", "uh", "ah", "er", "like", "you know", "so", "actually"}
+VOCABULARY = ["the", "movie", "was", "really", "good", "and", "we", "talked", "about", "it", "um", "uh", "like"]
+WORD_COUNTS = [250, 500, 1000, 2000, 4000, 8000, 16000]
+# The legacy loop is quadratic; beyond this it takes minutes per run.
+LEGACY_MAX_WORDS = 1000
+
+
+def legacy_cleanup_audio(audio_segment: AudioSegment, word_timestamps: List[Dict[str, Any]], filler_words: Set[str], min_pause_s: float, leave_pause_ms: int) -> AudioSegment:
+    """The original implementation, kept here as the reference for timing and output."""
+    final_audio = AudioSegment.empty()
+    last_cut_end_ms = 0
+    first_word_start_s = word_timestamps[0]['start']
+    if first_word_start_s > min_pause_s:
+        final_audio += AudioSegment.silent(duration=leave_pause_ms)
+        last_cut_end_ms = int(first_word_start_s * 1000)
+    for i in range(len(word_timestamps)):
+        word_data = word_timestamps[i]
+        word_text = word_data['word'].strip().lower()
+        start_s, end_s = word_data['start'], word_data['end']
+        final_audio += audio_segment[last_cut_end_ms:int(start_s * 1000)]
+        if word_text not in filler_words:
+            final_audio += audio_segment[int(start_s * 1000):int(end_s * 1000)]
+        last_cut_end_ms = int(end_s * 1000)
+        if i < len(word_timestamps) - 1:
+            start_of_next_word_s = word_timestamps[i+1]['start']
+            if start_of_next_word_s - end_s > min_pause_s:
+                final_audio += AudioSegment.silent(duration=leave_pause_ms)
+                last_cut_end_ms = int(start_of_next_word_s * 1000)
+    final_audio += audio_segment[last_cut_end_ms:]
+    return final_audio
+
+
+def make_transcript(word_count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    words = []
+    t = 0.4
+    for _ in range(word_count):
+        duration = rng.uniform(0.15, 0.45)
+        words.append({'word': rng.choice(VOCABULARY), 'start': round(t, 3), 'end': round(t + duration, 3)})
+        # Roughly one long pause every 50 words
+        t += duration + (rng.uniform(1.5, 3.0) if rng.random() < 0.02 else rng.uniform(0.05, 0.3))
+    return words
+
+
+def make_audio(duration_s: float) -> AudioSegment:
+    # 44.1kHz stereo 16-bit noise, like a typical upload once decoded
+    frames = int((duration_s + 1) * 44100)
+    return AudioSegment(data=os.urandom(frames * 4), sample_width=2, frame_rate=44100, channels=2)
+
+
+def main():
+    print(f"{'words':>8} {'audio':>8} {'legacy':>10} {'cut list':>10} {'edits':>7} {'speedup':>8}  {'identical':>10}")
+    for word_count in WORD_COUNTS:
+        words = make_transcript(word_count)
+        audio = make_audio(words[-1]['end'])
+
+        start = time.perf_counter()
+        edits = cut_list.build_cut_list(words, FILLERS, 1.25, 500, len(audio))
+        rendered = cut_list.render_cut_list(audio, edits)
+        new_s = time.perf_counter() - start
+
+        if word_count > LEGACY_MAX_WORDS:
+            print(f"{word_count:>8} {len(audio) / 60000:>7.1f}m {'-':>10} {new_s:>9.3f}s {len(edits):>7} {'-':>8}  {'-':>10}")
+            continue
+
+        start = time.perf_counter()
+        legacy = legacy_cleanup_audio(audio, words, FILLERS, 1.25, 500)
+        legacy_s = time.perf_counter() - start
+
+        identical = legacy.raw_data == rendered.raw_data
+        print(f"{word_count:>8} {len(audio) / 60000:>7.1f}m {legacy_s:>9.3f}s {new_s:>9.3f}s {len(edits):>7} {legacy_s / new_s:>7.1f}x  {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
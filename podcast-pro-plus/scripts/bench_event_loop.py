@@ -0,0 +1,174 @@
+"""
+Benchmark for event loop blocking in the API.
+
+API clients poll /api/episodes/ on a throwaway SQLite database, first on their
+own and then while podcasts are being created one after another for a user
+with a Spreaker account. Spreaker is a local server that takes
+SPREAKER_DELAY_S to answer, so each creation keeps a Spreaker call in flight
+that long. If that call blocks the event loop, every other request waits for it.
+
+Pass a git revision to also run the project as it was then, e.g. the commit
+before endpoints were moved off the event loop.
+
+Run from the podcast-pro-plus directory:
+    python -m scripts.bench_event_loop [seconds] [clients] [git revision]
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List
+
+SPREAKER_DELAY_S = 1.0
+EPISODES = 50
+
+
+class _SlowSpreaker(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(SPREAKER_DELAY_S)
+        body = json.dumps({"response": {"show": {"show_id": "1"}}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _seed(engine):
+    from datetime import datetime, timezone
+    from sqlmodel import Session
+    from api.models.user import User
+    from api.models.podcast import Episode, Podcast
+
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        user = User(email="bench@example.com", hashed_password="-", spreaker_access_token="token", created_at=now)
+        podcast = Podcast(name="Bench Show", user_id=user.id)
+        session.add(user)
+        session.add(podcast)
+        for i in range(EPISODES):
+            session.add(Episode(user_id=user.id, podcast_id=podcast.id, title=f"Episode {i}", processed_at=now))
+        session.commit()
+        return user.email
+
+
+async def _poll(http, headers, stop, latencies: List[float]):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await http.get("/api/episodes/", headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def _create_podcasts(http, headers, stop, created: List[float]):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await http.post("/api/podcasts/", headers=headers, data={"name": "New Show", "description": "-"})
+        response.raise_for_status()
+        created.append(time.perf_counter() - start)
+
+
+async def _phase(http, headers, seconds: float, clients: int, with_spreaker: bool) -> dict:
+    stop = threading.Event()
+    latencies, created = [], []
+    tasks = [asyncio.create_task(_poll(http, headers, stop, latencies)) for _ in range(clients)]
+    if with_spreaker:
+        tasks.append(asyncio.create_task(_create_podcasts(http, headers, stop, created)))
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "spreaker_calls": len(created),
+    }
+
+
+async def _run(seconds: float, clients: int) -> dict:
+    import logging
+    import httpx
+    from api.core import database
+    from api.main import app
+    from api.routers.auth import create_access_token
+    from api.services.publisher import SpreakerClient
+
+    logging.disable(logging.INFO)
+    spreaker = ThreadingHTTPServer(("127.0.0.1", 0), _SlowSpreaker)
+    threading.Thread(target=spreaker.serve_forever, daemon=True).start()
+    SpreakerClient.BASE_URL = f"http://127.0.0.1:{spreaker.server_port}"
+
+    # httpx's ASGI transport doesn't run the lifespan, which sets up the database and threadpool
+    async with app.router.lifespan_context(app):
+        email = _seed(database.engine)
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=None) as http:
+            idle = await _phase(http, headers, seconds, clients, with_spreaker=False)
+            busy = await _phase(http, headers, seconds, clients, with_spreaker=True)
+    spreaker.shutdown()
+    return {"idle": idle, "spreaker": busy}
+
+
+def _child(result_path: str, seconds: float, clients: int):
+    result = asyncio.run(_run(seconds, clients))
+    Path(result_path).write_text(json.dumps(result))
+
+
+def _run_in_subprocess(source_dir: Path, seconds: float, clients: int) -> dict:
+    with tempfile.TemporaryDirectory() as work_dir:
+        # The app serves media_uploads/ relative to the working directory
+        (Path(work_dir) / "media_uploads").mkdir()
+        result_path = Path(work_dir) / "result.json"
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{Path(work_dir) / 'database.db'}",
+            "DATABASE_ASYNC_URL": "",
+            "DATABASE_ECHO": "false",
+            "PYTHONPATH": str(source_dir),
+        }
+        # Loaded by path so the api package comes from source_dir
+        code = f"import runpy; runpy.run_path({str(Path(__file__).resolve())!r})['_child']({str(result_path)!r}, {seconds}, {clients})"
+        child = subprocess.run([sys.executable, "-c", code], cwd=work_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if child.returncode != 0:
+            sys.exit(child.stderr[-4000:])
+        return json.loads(result_path.read_text())
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    before_rev = sys.argv[3] if len(sys.argv) > 3 else None
+    project_dir = Path(__file__).resolve().parent.parent
+
+    print(f"{seconds:.0f}s per phase, {clients} clients polling /api/episodes/, Spreaker answers in {SPREAKER_DELAY_S:.1f}s")
+    print(f"{'tree':>8} {'phase':>9} {'requests':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'spreaker calls':>15}")
+    with tempfile.TemporaryDirectory() as before_dir:
+        runs = [("current", project_dir)]
+        if before_rev:
+            archive = subprocess.run(["git", "archive", before_rev, "."], cwd=project_dir, check=True, capture_output=True).stdout
+            subprocess.run(["tar", "-x", "-C", before_dir], input=archive, check=True)
+            runs.insert(0, (before_rev[:8], Path(before_dir)))
+        for name, source_dir in runs:
+            result = _run_in_subprocess(source_dir, seconds, clients)
+            for phase, r in result.items():
+                print(
+                    f"{name:>8} {phase:>9} {r['requests']:>9} {r['p50_ms']:>7.1f}ms {r['p95_ms']:>7.1f}ms"
+                    f" {r['p99_ms']:>7.1f}ms {r['max_ms']:>7.1f}ms {r['spreaker_calls']:>15}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark for keyword and flubber detection.
+
+Builds a synthetic transcript (20k words by default) where the speaker says
+"flubber" every so often and then repeats (most of) what they said just before.
+Times the old per-call scan and per-flubber analysis against one KeywordIndex
+and a single batched analyze_flubbers pass, and checks both find the same
+keywords and the same ranges to cut.
+
+Run from the podcast-pro-plus directory:
+    python -m scripts.bench_keywords [word_count]
+"""
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from thefuzz import fuzz
+
+from api.services import keyword_detector
+from api.services.word_timeline import WordTimeline
+
+VOCABULARY = ["the", "movie", "was", "really", "good", "and", "we", "talked", "about", "it", "so", "then", "maybe"]
+KEYWORDS = {"flubber", "intern"}
+# Roughly one flubber per this many words
+FLUBBER_EVERY = 150
+
+
+def make_transcript(word_count: int, seed: int = 11) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    words: List[Dict[str, Any]] = []
+    t = 0.3
+
+    def say(text: str) -> None:
+        nonlocal t
+        duration = rng.uniform(0.15, 0.45)
+        words.append({'word': " " + text, 'start': t, 'end': t + duration})
+        t += duration + rng.uniform(0.02, 0.2)
+
+    while len(words) < word_count:
+        for _ in range(rng.randint(FLUBBER_EVERY // 2, FLUBBER_EVERY)):
+            say(rng.choice(VOCABULARY) + rng.choice(["", "", ","]))
+        # Say "flubber", then repeat what was said in the window before it, sometimes with a slip
+        repeated = [word['word'].strip() for word in words if t - word['start'] <= 15]
+        if rng.random() < 0.3:
+            repeated = [rng.choice(VOCABULARY) for _ in repeated]
+        say("Flubber.")
+        for text in repeated:
+            say(text)
+    return words[:word_count]
+
+
+def legacy_find_keywords(word_timestamps: List[Dict[str, Any]], keywords: Set[str]) -> List[Dict[str, Any]]:
+    """The original scan, kept here as the reference for timing and output (whitespace stripped as the index does)."""
+    found_keywords = []
+    for i, word_data in enumerate(word_timestamps):
+        word = word_data['word'].strip().strip(".,!?").lower()
+        if word in keywords:
+            found_keywords.append({"keyword": word, "start_time_s": word_data['start'], "end_time_s": word_data['end'], "index": i})
+    return found_keywords
+
+
+def legacy_analyze_flubber_instance(
+    word_timestamps: List[Dict[str, Any]],
+    flubber_word_index: int,
+    window_s: int = 15,
+    similarity_threshold: int = 85
+) -> Optional[Tuple[float, float]]:
+    """The original per-flubber analysis, kept here as the reference for timing and output."""
+    flubber_event = word_timestamps[flubber_word_index]
+    flubber_start_s = flubber_event['start']
+    words_before = []
+    for i in range(flubber_word_index - 1, -1, -1):
+        word_data = word_timestamps[i]
+        if flubber_start_s - word_data['start'] > window_s:
+            break
+        words_before.insert(0, word_data)
+    if not words_before:
+        return None
+    text_before = " ".join([w['word'] for w in words_before])
+    mistake_start_s = words_before[0]['start']
+    words_after = []
+    for i in range(flubber_word_index + 1, len(word_timestamps)):
+        word_data = word_timestamps[i]
+        if len(" ".join([w['word'] for w in words_after])) >= len(text_before):
+            break
+        words_after.append(word_data)
+    if not words_after:
+        return None
+    text_after = " ".join([w['word'] for w in words_after])
+    similarity = fuzz.ratio(text_before.lower(), text_after.lower())
+    if similarity >= similarity_threshold:
+        # The original read a key the word dicts don't have; the flubber's end is what was meant
+        return (mistake_start_s, flubber_event['end'])
+    return None
+
+
+def main():
+    word_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    words = make_transcript(word_count)
+    keyword_sets = [KEYWORDS, {"flubber"}, {"intern"}, {"movie", "good"}]
+
+    start = time.perf_counter()
+    legacy_found = [legacy_find_keywords(words, keywords) for keywords in keyword_sets]
+    flubber_indexes = [event['index'] for event in legacy_find_keywords(words, {"flubber"})]
+    legacy_ranges = [legacy_analyze_flubber_instance(words, i) for i in flubber_indexes]
+    legacy_s = time.perf_counter() - start
+
+    # Transcripts come back from transcription as timelines
+    timeline = WordTimeline.from_words(words)
+    start = time.perf_counter()
+    index = keyword_detector.KeywordIndex(timeline)
+    index_s = time.perf_counter() - start
+    found = [keyword_detector.find_keywords(timeline, keywords, index=index) for keywords in keyword_sets]
+    flubbers = index.positions("flubber")
+    ranges = keyword_detector.analyze_flubbers(timeline, flubbers, index=index)
+    new_s = time.perf_counter() - start
+
+    cuts = sum(r is not None for r in ranges)
+    same = found == legacy_found and ranges == legacy_ranges
+    print(f"words: {word_count}, flubbers: {len(flubbers)}, cuts found: {cuts}")
+    print(f"legacy: {legacy_s * 1000:.1f}ms  indexed: {new_s * 1000:.1f}ms (index build {index_s * 1000:.1f}ms)  speedup: {legacy_s / new_s:.1f}x  same: {same}")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
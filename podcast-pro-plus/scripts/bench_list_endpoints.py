@@ -0,0 +1,136 @@
+"""
+Benchmark for the episode and media list endpoints as catalogues grow.
+
+For users with more and more episodes (imported back catalogues, each with
+RSS-sized show notes) and media items, times the first page of
+/api/episodes/ and /api/media/ and reports its size in bytes. Each catalogue
+size runs in its own process on a throwaway SQLite database.
+
+Pass a git revision to also run the project as it was then, e.g. the commit
+before the list endpoints were paged.
+
+Run from the podcast-pro-plus directory:
+    python -m scripts.bench_list_endpoints [git revision]
+"""
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CATALOGUE_SIZES = [100, 1000, 5000]
+SHOW_NOTES_BYTES = 1500
+REQUESTS = 30
+
+
+def _seed(engine, episodes: int):
+    from datetime import datetime, timedelta, timezone
+    from sqlmodel import Session
+    from api.models.user import User
+    from api.models.podcast import Episode, MediaCategory, MediaItem, Podcast
+
+    rng = random.Random(5)
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    with Session(engine) as session:
+        user = User(email="bench@example.com", hashed_password="-", created_at=start)
+        podcast = Podcast(name="Back Catalogue", user_id=user.id)
+        session.add(user)
+        session.add(podcast)
+        session.add_all(
+            Episode(
+                user_id=user.id, podcast_id=podcast.id, title=f"Episode {i}", status="processed",
+                show_notes="Notes " * (SHOW_NOTES_BYTES // 6), final_audio_path=f"https://example.com/{i}.mp3",
+                processed_at=start + timedelta(hours=i),
+            )
+            for i in range(episodes)
+        )
+        session.add_all(
+            MediaItem(
+                user_id=user.id, filename=f"{i}.mp3", friendly_name=f"Clip {i}", category=rng.choice(list(MediaCategory)),
+                created_at=start + timedelta(minutes=i),
+            )
+            for i in range(episodes // 10)
+        )
+        session.commit()
+        return user.email
+
+
+async def _run(episodes: int) -> dict:
+    import logging
+    import httpx
+    from api.core import database
+    from api.main import app
+    from api.routers.auth import create_access_token
+
+    logging.disable(logging.INFO)
+    results = {}
+    async with app.router.lifespan_context(app):
+        email = _seed(database.engine, episodes)
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+            for path in ["/api/episodes/", "/api/media/"]:
+                response = await http.get(path, headers=headers)
+                response.raise_for_status()
+                latencies = []
+                for _ in range(REQUESTS):
+                    start = time.perf_counter()
+                    (await http.get(path, headers=headers)).raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                latencies.sort()
+                results[path] = {
+                    "rows": len(response.json()),
+                    "bytes": len(response.content),
+                    "p50_ms": latencies[len(latencies) // 2] * 1000,
+                }
+    return results
+
+
+def _child(result_path: str, episodes: int):
+    result = asyncio.run(_run(episodes))
+    Path(result_path).write_text(json.dumps(result))
+
+
+def _run_in_subprocess(source_dir: Path, episodes: int) -> dict:
+    with tempfile.TemporaryDirectory() as work_dir:
+        # The app serves media_uploads/ relative to the working directory
+        (Path(work_dir) / "media_uploads").mkdir()
+        result_path = Path(work_dir) / "result.json"
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{Path(work_dir) / 'database.db'}",
+            "DATABASE_ASYNC_URL": "",
+            "DATABASE_ECHO": "false",
+            "PYTHONPATH": str(source_dir),
+        }
+        # Loaded by path so the api package comes from source_dir
+        code = f"import runpy; runpy.run_path({str(Path(__file__).resolve())!r})['_child']({str(result_path)!r}, {episodes})"
+        child = subprocess.run([sys.executable, "-c", code], cwd=work_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if child.returncode != 0:
+            sys.exit(child.stderr[-4000:])
+        return json.loads(result_path.read_text())
+
+
+def main():
+    before_rev = sys.argv[1] if len(sys.argv) > 1 else None
+    project_dir = Path(__file__).resolve().parent.parent
+
+    print(f"first page of each list, p50 of {REQUESTS} requests; media items are a tenth of the episodes")
+    print(f"{'tree':>8} {'episodes':>9} {'endpoint':>15} {'rows':>6} {'bytes':>10} {'p50':>9}")
+    with tempfile.TemporaryDirectory() as before_dir:
+        runs = [("current", project_dir)]
+        if before_rev:
+            archive = subprocess.run(["git", "archive", before_rev, "."], cwd=project_dir, check=True, capture_output=True).stdout
+            subprocess.run(["tar", "-x", "-C", before_dir], input=archive, check=True)
+            runs.insert(0, (before_rev[:8], Path(before_dir)))
+        for name, source_dir in runs:
+            for episodes in CATALOGUE_SIZES:
+                for path, r in _run_in_subprocess(source_dir, episodes).items():
+                    print(f"{name:>8} {episodes:>9} {path:>15} {r['rows']:>6} {r['bytes']:>10} {r['p50_ms']:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark harness for transcription backends.
+
+Transcribes the same synthetic recording with each requested backend (at several
+worker counts for backends that send chunks concurrently, and several chunks per
+batch for the local backend), reporting wall time
+and throughput in audio-seconds per second, and checks every run of a backend
+stitches back to the same words. The "fake" backend sleeps to stand in for a
+request round-trip; "local" needs faster-whisper installed; "openai" needs an
+API key and is billed.
+
+Run from the podcast-pro-plus directory:
+    python -m scripts.bench_transcription [--minutes 60] [--backends fake,local] [--fake-latency 2.0] [--chunks-per-batch 1,4]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from pydub import AudioSegment
+
+from api.core.config import settings
+from api.services import chunk_planner, transcription, transcription_backends
+
+WORKER_COUNTS = [1, 2, 4, 8]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--backends", default="fake")
+    parser.add_argument("--fake-latency", type=float, default=2.0)
+    parser.add_argument("--chunks-per-batch", default="1,4")
+    args = parser.parse_args()
+    settings.TRANSCRIPTION_FAKE_LATENCY_S = args.fake_latency
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 16kHz mono noise keeps the fixture small; chunk encoding cost is still real
+        samples = (np.random.default_rng(0).uniform(-0.2, 0.2, int(args.minutes * 60 * 16000)) * 32767).astype(np.int16)
+        audio_path = Path(tmp) / "episode.wav"
+        AudioSegment(data=samples.tobytes(), sample_width=2, frame_rate=16000, channels=1).export(audio_path, format="wav")
+        audio_s = args.minutes * 60
+
+        chunk_limit_ms = chunk_planner.max_chunk_ms(settings.TRANSCRIPTION_CHUNK_BITRATE_KBPS, settings.TRANSCRIPTION_MAX_CHUNK_S)
+        chunk_count = -(-int(audio_s * 1000) // chunk_limit_ms)
+        print(f"{args.minutes:.0f} min recording, ~{chunk_count} chunks, {args.fake_latency:.1f}s simulated latency per fake request")
+        print(f"{'backend':>8} {'workers':>8} {'batch':>6} {'time':>8} {'audio s/s':>10} {'words':>7} {'consistent':>11}")
+        for name in args.backends.split(","):
+            try:
+                backend = transcription_backends.get_backend(name)
+            except transcription_backends.TranscriptionBackendError as e:
+                print(f"{name:>8} skipped: {e}")
+                continue
+            settings.TRANSCRIPTION_BACKEND = name
+            # Backends that fix their own concurrency only need one run
+            concurrent = type(backend).max_workers is transcription_backends.TranscriptionBackend.max_workers
+            # The local backend takes its chunks per batch from settings on every call
+            batch_sizes = [int(n) for n in args.chunks_per_batch.split(",")] if name == "local" else [None]
+            reference = None
+            for workers in (WORKER_COUNTS if concurrent else [backend.max_workers]):
+                for batch_size in batch_sizes:
+                    settings.TRANSCRIPTION_MAX_WORKERS = workers
+                    if batch_size:
+                        settings.TRANSCRIPTION_LOCAL_CHUNKS_PER_BATCH = batch_size
+                    start = time.perf_counter()
+                    words = transcription.get_word_timestamps(audio_path, use_cache=False)
+                    elapsed = time.perf_counter() - start
+                    reference = reference or words
+                    print(f"{name:>8} {workers:>8} {backend.batch_size:>6} {elapsed:>7.2f}s {audio_s / elapsed:>10.1f} {len(words):>7} {str(words == reference):>11}")
+
+
+if __name__ == "__main__":
+    main()
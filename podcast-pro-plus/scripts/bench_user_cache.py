@@ -0,0 +1,122 @@
+"""
+Benchmark for the authenticated user cache.
+
+Sends requests one at a time to /api/episodes/ and /api/media/ on a throwaway
+SQLite database, with the user cache off (USER_CACHE_TTL_S=0) and on, and
+reports per-request latency and database queries per request. Each setting
+runs in its own process, since settings are read at import.
+
+Run from the podcast-pro-plus directory:
+    python -m scripts.bench_user_cache [requests per endpoint]
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CONFIGURATIONS = {
+    "off": {"USER_CACHE_TTL_S": "0"},
+    "on": {},
+}
+ENDPOINTS = ["/api/episodes/", "/api/media/"]
+EPISODES = 20
+
+
+def _seed(engine):
+    from datetime import datetime, timezone
+    from sqlmodel import Session
+    from api.models.user import User
+    from api.models.podcast import Episode, Podcast
+
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        user = User(email="bench@example.com", hashed_password="-", created_at=now)
+        podcast = Podcast(name="Bench Show", user_id=user.id)
+        session.add(user)
+        session.add(podcast)
+        for i in range(EPISODES):
+            session.add(Episode(user_id=user.id, podcast_id=podcast.id, title=f"Episode {i}", processed_at=now))
+        session.commit()
+        return user.email
+
+
+async def _run(requests: int) -> dict:
+    import logging
+    import httpx
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.event import listen
+    from api.core import database
+    from api.main import app
+    from api.routers.auth import create_access_token
+
+    logging.disable(logging.INFO)
+    queries = [0]
+
+    def count(*args):
+        queries[0] += 1
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        email = _seed(database.engine)
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+        # Registered on the class, so both the sync and the async engine are counted
+        listen(Engine, "before_cursor_execute", count)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+            for path in ENDPOINTS:
+                # Warm up (and fill the cache, when it's on)
+                for _ in range(20):
+                    (await http.get(path, headers=headers)).raise_for_status()
+                latencies = []
+                queries[0] = 0
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    (await http.get(path, headers=headers)).raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                latencies.sort()
+                results[path] = {
+                    "mean_ms": sum(latencies) / len(latencies) * 1000,
+                    "p50_ms": latencies[len(latencies) // 2] * 1000,
+                    "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+                    "queries": queries[0] / requests,
+                }
+    return results
+
+
+def _child(result_path: str, requests: int):
+    result = asyncio.run(_run(requests))
+    Path(result_path).write_text(json.dumps(result))
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    project_dir = Path(__file__).resolve().parent.parent
+
+    print(f"{requests} sequential requests per endpoint")
+    print(f"{'cache':>6} {'endpoint':>15} {'mean':>9} {'p50':>9} {'p95':>9} {'queries/req':>12}")
+    for name, overrides in CONFIGURATIONS.items():
+        with tempfile.TemporaryDirectory() as work_dir:
+            # The app serves media_uploads/ relative to the working directory
+            (Path(work_dir) / "media_uploads").mkdir()
+            result_path = Path(work_dir) / "result.json"
+            env = {
+                **os.environ, **overrides,
+                "DATABASE_URL": f"sqlite:///{Path(work_dir) / 'database.db'}",
+                "DATABASE_ASYNC_URL": "",
+                "USER_CACHE_REDIS_URL": "",
+                "PYTHONPATH": str(project_dir),
+            }
+            code = f"from scripts.bench_user_cache import _child; _child({str(result_path)!r}, {requests})"
+            child = subprocess.run([sys.executable, "-c", code], cwd=work_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            if child.returncode != 0:
+                sys.exit(child.stderr[-4000:])
+            result = json.loads(result_path.read_text())
+        for path, r in result.items():
+            print(f"{name:>6} {path:>15} {r['mean_ms']:>7.2f}ms {r['p50_ms']:>7.2f}ms {r['p95_ms']:>7.2f}ms {r['queries']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark for the columnar word timeline.
+
+For synthetic transcripts of increasing length, compares a list of word dicts
+against a WordTimeline: memory held (measured with tracemalloc), time to
+decode a transcript cache entry (the old zlib-compressed layout against the
+timeline's binary form), and time to rebuild the full transcript text.
+Checks the timeline round-trips to the same words.
+
+Run from the podcast-pro-plus directory:
+    python -m scripts.bench_word_timeline
+"""
+import random
+import struct
+import time
+import tracemalloc
+import zlib
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from api.services.word_timeline import WordTimeline
+
+VOCABULARY = ["the", "movie", "was", "really", "good", "and", "we", "talked", "about", "it", "um", "uh", "like"]
+WORD_COUNTS = [1000, 10000, 50000, 200000]
+
+
+def make_transcript(word_count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    # A bigger vocabulary than the filler benchmarks, closer to real speech
+    vocabulary = VOCABULARY + [f"word{i}" for i in range(4000)]
+    words, t = [], 0.5
+    for _ in range(word_count):
+        duration = rng.uniform(0.1, 0.6)
+        words.append({'word': " " + rng.choice(vocabulary), 'start': t, 'end': t + duration})
+        t += duration + rng.uniform(0.05, 0.3)
+    return words
+
+
+def legacy_encode(word_timestamps: List[Dict[str, Any]]) -> bytes:
+    """The transcript cache's previous entry layout, kept here as the reference."""
+    starts = np.array([w['start'] for w in word_timestamps], dtype="<f8")
+    ends = np.array([w['end'] for w in word_timestamps], dtype="<f8")
+    words = "\0".join(w['word'] for w in word_timestamps).encode("utf-8")
+    return zlib.compress(struct.pack("<I", len(word_timestamps)) + starts.tobytes() + ends.tobytes() + words, 6)
+
+
+def legacy_decode(data: bytes) -> List[Dict[str, Any]]:
+    payload = zlib.decompress(data)
+    (count,) = struct.unpack_from("<I", payload)
+    starts = np.frombuffer(payload, dtype="<f8", count=count, offset=4).tolist()
+    ends = np.frombuffer(payload, dtype="<f8", count=count, offset=4 + 8 * count).tolist()
+    words = payload[4 + 16 * count:].decode("utf-8").split("\0")
+    return [{'word': word, 'start': start, 'end': end} for word, start, end in zip(words, starts, ends)]
+
+
+def measure(build: Callable[[], Any]):
+    """Returns (result, seconds, bytes still allocated by the result)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, held
+
+
+def main():
+    print(f"{'words':>8} {'dicts MB':>9} {'timeline MB':>12} {'ratio':>6} {'decode old':>11} {'decode new':>11} {'text old':>9} {'text new':>9} {'same':>5}")
+    for word_count in WORD_COUNTS:
+        words = make_transcript(word_count)
+        legacy_entry = legacy_encode(words)
+        entry = WordTimeline.from_words(words).to_bytes()
+        del words
+
+        decoded_words, legacy_decode_s, dicts_bytes = measure(lambda: legacy_decode(legacy_entry))
+        timeline, decode_s, _ = measure(lambda: WordTimeline.from_bytes(entry))
+        # The decoded timeline's columns are views of the entry, so count the columns and vocab it holds
+        timeline_bytes = timeline.nbytes
+
+        start = time.perf_counter()
+        " ".join([word['word'] for word in decoded_words])
+        legacy_text_s = time.perf_counter() - start
+        start = time.perf_counter()
+        timeline.text()
+        text_s = time.perf_counter() - start
+
+        same = timeline == decoded_words
+        print(
+            f"{word_count:>8} {dicts_bytes / 1e6:>9.2f} {timeline_bytes / 1e6:>12.2f} {dicts_bytes / timeline_bytes:>5.1f}x"
+            f" {legacy_decode_s * 1000:>9.1f}ms {decode_s * 1000:>9.2f}ms {legacy_text_s * 1000:>7.1f}ms {text_s * 1000:>7.1f}ms {str(same):>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Checks plan_chunks against the limits its chunks must keep to.
+
+Plans synthetic recordings of several lengths at several chunk limits: one
+with no pauses at all, so every boundary falls back to overlapping (the case
+where a chunk starting in its predecessor's overlap used to run past the
+limit), one that is silent throughout, and one with a pause every few
+seconds. Every chunk must be at most chunk_limit_ms long, the chunks must
+cover the recording in order, and the spans each chunk keeps must tile it
+with no gap or double-counted word. Exits non-zero on the first failure.
+
+Run from the podcast-pro-plus directory:
+    python -m scripts.check_chunk_planner
+"""
+import sys
+from typing import Callable, List
+
+import numpy as np
+
+from api.services.chunk_planner import ANALYSIS_SAMPLE_RATE, OVERLAP_MS, Chunk, plan_chunks
+
+CHUNK_LIMITS_MS = [10 * 1000, 45 * 1000, 10 * 60 * 1000]
+DURATIONS_MS = [1000, 10 * 1000, 10 * 1000 + 1, 95 * 1000, 60 * 60 * 1000 + 137]
+# Speech-level noise with a 500ms pause every PAUSE_EVERY_MS
+PAUSE_EVERY_MS = 7 * 1000
+
+
+def no_pauses(start_ms: int, duration_ms: int) -> np.ndarray:
+    rng = np.random.default_rng(start_ms)
+    return rng.uniform(-0.3, 0.3, duration_ms * ANALYSIS_SAMPLE_RATE // 1000).astype(np.float32)
+
+
+def silence(start_ms: int, duration_ms: int) -> np.ndarray:
+    return np.zeros(duration_ms * ANALYSIS_SAMPLE_RATE // 1000, dtype=np.float32)
+
+
+def regular_pauses(start_ms: int, duration_ms: int) -> np.ndarray:
+    samples = no_pauses(start_ms, duration_ms)
+    times_ms = start_ms + np.arange(len(samples)) * 1000 // ANALYSIS_SAMPLE_RATE
+    samples[times_ms % PAUSE_EVERY_MS < 500] = 0.0
+    return samples
+
+
+RECORDINGS = {"no pauses": no_pauses, "silence": silence, "regular pauses": regular_pauses}
+
+
+def problems(chunks: List[Chunk], duration_ms: int, chunk_limit_ms: int) -> List[str]:
+    found = []
+    if chunks[0].start_ms != 0 or chunks[-1].end_ms != duration_ms:
+        found.append(f"chunks span {chunks[0].start_ms}-{chunks[-1].end_ms}ms, not the whole recording")
+    if chunks[0].keep_from_ms != 0 or chunks[-1].keep_until_ms <= duration_ms:
+        found.append("kept spans don't reach both ends of the recording")
+    for i, chunk in enumerate(chunks):
+        if chunk.duration_ms > chunk_limit_ms:
+            found.append(f"chunk {i} is {chunk.duration_ms}ms, over the {chunk_limit_ms}ms limit")
+        if not chunk.start_ms <= chunk.keep_from_ms < chunk.keep_until_ms:
+            found.append(f"chunk {i} keeps {chunk.keep_from_ms}-{chunk.keep_until_ms}ms, outside its span")
+        if i and chunk.keep_from_ms != chunks[i - 1].keep_until_ms:
+            found.append(f"chunk {i} keeps from {chunk.keep_from_ms}ms, not where chunk {i - 1} stops keeping")
+        if i and chunk.start_ms < chunks[i - 1].keep_until_ms - OVERLAP_MS // 2:
+            found.append(f"chunk {i} starts more than the overlap before its cut")
+    return found
+
+
+def check(name: str, read_window: Callable[[int, int], np.ndarray]) -> int:
+    planned = 0
+    for chunk_limit_ms in CHUNK_LIMITS_MS:
+        for duration_ms in DURATIONS_MS:
+            chunks = plan_chunks(duration_ms, read_window, chunk_limit_ms)
+            found = problems(chunks, duration_ms, chunk_limit_ms)
+            if found:
+                sys.exit(f"{name}, {duration_ms}ms at a {chunk_limit_ms}ms limit: " + "; ".join(found))
+            planned += 1
+    return planned
+
+
+def main():
+    planned = sum(check(name, read_window) for name, read_window in RECORDINGS.items())
+    print(f"{planned} plans keep every chunk under its limit and tile the recording")
+
+
+if __name__ == "__main__":
+    main()
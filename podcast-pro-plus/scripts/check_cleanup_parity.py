@@ -0,0 +1,81 @@
+"""
+Regression check: the cut list engine against the original cleanup loop.
+
+Renders random transcripts both ways (scripts.bench_cleanup.legacy_cleanup_audio
+is the reference) and compares the output byte for byte. The transcripts
+include overlapping word timestamps, fillers, long pauses, and last words
+that reach or run past the end of the audio, which is where pydub pads a
+slice with silence. Exits non-zero on the first mismatch, printing a case
+that reproduces it.
+
+Sources are 16 or 32-bit at 11025Hz or more. Below that the old loop
+converted the whole output to the format of its inserted silence
+(AudioSegment.silent() is 16-bit 11025Hz) while render_cut_list keeps the
+source format, so those outputs aren't expected to match.
+
+Run from the podcast-pro-plus directory:
+    python -m scripts.check_cleanup_parity [cases]
+"""
+import random
+import sys
+from typing import Any, Dict, List
+
+from pydub import AudioSegment
+
+from api.services import cut_list
+from scripts.bench_cleanup import legacy_cleanup_audio
+
+FILLERS = {"um", "uh", "like"}
+VOCABULARY = ["the", "show", "um", "uh", "like", "and"]
+FRAME_RATES = [11025, 16000, 22050, 44100, 48000]
+# pydub keeps 24-bit audio as 32-bit, so 32 covers it
+SAMPLE_WIDTHS = [2, 4]
+
+
+def make_case(rng: random.Random) -> Dict[str, Any]:
+    overlapping = rng.random() < 0.3
+    words: List[Dict[str, Any]] = []
+    t = rng.uniform(0, 2)
+    for _ in range(rng.randint(1, 40)):
+        duration = rng.uniform(0.01, 0.5)
+        words.append({'word': rng.choice(VOCABULARY), 'start': round(t, 3), 'end': round(t + duration, 3)})
+        gap = rng.uniform(-0.3, 0.1) if overlapping else rng.uniform(0, 2.5)
+        t = max(0.0, t + duration + gap)
+    frame_rate = rng.choice(FRAME_RATES)
+    # The audio ends before, at, or a fraction of a ms after the last word
+    duration_s = max(word['end'] for word in words) + rng.choice([-0.3, -0.01, 0, 0.0004, 0.0007, 0.01, 0.5])
+    return {
+        'words': words,
+        'frame_rate': frame_rate,
+        'channels': rng.choice([1, 2]),
+        'sample_width': rng.choice(SAMPLE_WIDTHS),
+        'frames': max(1, int(duration_s * frame_rate) + rng.randint(0, 3)),
+        'min_pause_s': rng.choice([0.3, 1.25]),
+        'leave_pause_ms': rng.choice([0, 10, 500]),
+    }
+
+
+def check(case: Dict[str, Any], rng: random.Random) -> bool:
+    frame_width = case['channels'] * case['sample_width']
+    audio = AudioSegment(
+        data=rng.randbytes(case['frames'] * frame_width),
+        sample_width=case['sample_width'], frame_rate=case['frame_rate'], channels=case['channels'],
+    )
+    legacy = legacy_cleanup_audio(audio, case['words'], FILLERS, case['min_pause_s'], case['leave_pause_ms'])
+    edits = cut_list.build_cut_list(case['words'], FILLERS, case['min_pause_s'], case['leave_pause_ms'], len(audio))
+    rendered = cut_list.render_cut_list(audio, edits)
+    return legacy.raw_data == rendered.raw_data and legacy.frame_width == rendered.frame_width
+
+
+def main():
+    cases = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rng = random.Random(1)
+    for i in range(cases):
+        case = make_case(rng)
+        if not check(case, rng):
+            sys.exit(f"case {i} differs from the legacy loop: {case}")
+    print(f"{cases} cases identical to the legacy loop")
+
+
+if __name__ == "__main__":
+    main()
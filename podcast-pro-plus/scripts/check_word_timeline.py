@@ -0,0 +1,67 @@
+"""
+Round-trip check for WordTimeline's binary form (the transcript cache layout).
+
+Serializes timelines through to_bytes/from_bytes and compares them with what
+went in. The cases cover what a separator-joined vocab got wrong: a timeline
+whose only word is empty, empty words among others, text containing "\\0",
+non-ASCII text, and an empty timeline. Then random transcripts drawn from the
+same kinds of words. Also checks that a truncated entry is rejected with a
+ValueError, which the transcript cache treats as a miss. Exits non-zero on the
+first failure.
+
+Run from the podcast-pro-plus directory:
+    python -m scripts.check_word_timeline [cases]
+"""
+import random
+import sys
+from typing import Any, Dict, List
+
+from api.services.word_timeline import WordTimeline
+
+UNUSUAL_WORDS = ["", " ", "\0", "a\0b", "\0\0", "café", "日本語", "🎙️", "um", "\n"]
+
+
+def words(*texts: str) -> List[Dict[str, Any]]:
+    return [{'word': text, 'start': i * 0.5, 'end': i * 0.5 + 0.25} for i, text in enumerate(texts)]
+
+
+CASES = {
+    "empty timeline": [],
+    "only word is empty": words(""),
+    "empty words among others": words("", "hello", "", "world", ""),
+    "words containing \\0": words("a\0b", "c", "\0", "d\0\0e", "c"),
+    "non-ASCII words": words("café", "日本語", "🎙️", "café"),
+}
+
+
+def round_trips(word_timestamps: List[Dict[str, Any]]) -> bool:
+    timeline = WordTimeline.from_words(word_timestamps)
+    return WordTimeline.from_bytes(timeline.to_bytes()).to_words() == word_timestamps
+
+
+def main():
+    cases = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    for name, word_timestamps in CASES.items():
+        if not round_trips(word_timestamps):
+            sys.exit(f"{name}: doesn't round-trip: {word_timestamps}")
+
+    rng = random.Random(1)
+    for i in range(cases):
+        texts = [rng.choice(UNUSUAL_WORDS + [f"w{rng.randint(0, 50)}"]) for _ in range(rng.randint(0, 60))]
+        if not round_trips(words(*texts)):
+            sys.exit(f"case {i} doesn't round-trip: {texts}")
+
+    data = WordTimeline.from_words(words("", "a\0b", "café")).to_bytes()
+    for cut in range(len(data)):
+        try:
+            WordTimeline.from_bytes(data[:cut])
+        except ValueError:
+            continue
+        except Exception as e:
+            sys.exit(f"truncated to {cut} bytes: {type(e).__name__} instead of ValueError: {e}")
+        sys.exit(f"truncated to {cut} bytes: read back without an error")
+    print(f"{len(CASES)} edge cases and {cases} random timelines round-trip, truncated entries are rejected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Waveform diff between the pydub mix and the ffmpeg filter graph renderer.
+
+Builds a synthetic episode (mono content with a cut list that drops ranges,
+inserts silence and steps back once, stereo intro and outro segments at a
+negative content offset, and a mono music bed with fades), renders it both
+ways to WAV, and compares the samples. Exits non-zero if they differ by more
+than the threshold.
+
+Needs ffmpeg on the PATH. ffprobe is used to read the music bed's format when
+it's installed; without it the format comes from ffmpeg's summary of the input.
+
+Run from the podcast-pro-plus directory:
+    python -m scripts.compare_renderers [min_snr_db]
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from pydub import AudioSegment
+
+from api.services import cut_list, ffmpeg_renderer, music_bed_cache, streaming
+from api.services.audio_buffer import AudioBuffer
+from api.services.cut_list import Edit
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+
+def _tone(seconds: float, frequency: float, channels: int, amplitude: float = 0.3) -> AudioSegment:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    # A little noise on top so a misplaced edit can't line up by accident
+    wave = amplitude * np.sin(2 * np.pi * frequency * t) + np.random.default_rng(int(frequency)).uniform(-0.05, 0.05, len(t))
+    samples = np.repeat((wave * 32767).astype(np.int16)[:, None], channels, axis=1)
+    return AudioSegment(data=samples.tobytes(), sample_width=2, frame_rate=SAMPLE_RATE, channels=channels)
+
+
+def main():
+    min_snr_db = float(sys.argv[1]) if len(sys.argv) > 1 else 60.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        content = _tone(30, 220, channels=1)
+        content_path = tmp / "content.wav"
+        content.export(content_path, format="wav")
+        music_path = tmp / "music.wav"
+        _tone(4, 550, channels=1, amplitude=0.5).export(music_path, format="wav")
+        intro, outro = _tone(6, 330, CHANNELS), _tone(5, 660, CHANNELS)
+
+        edits = [
+            Edit(0, 500, silence=True), Edit(1000, 4000), Edit(4250, 9000), Edit(0, 500, silence=True),
+            Edit(8800, 12000), Edit(15000, 25000), Edit(26000, 31000),
+        ]
+        music = ffmpeg_renderer.MusicBed(music_path, 1000, 5000, 2000, 3000, -15)
+
+        # Positions are worked out as the mix stage does
+        cleaned = cut_list.render_cut_list(content, edits)
+        content_start_ms = len(intro) - 2000
+        outro_start_ms = content_start_ms + len(cleaned) - 5000
+        total_ms = max(len(intro), content_start_ms + len(cleaned), outro_start_ms + len(outro))
+
+        reference = AudioBuffer.silent(total_ms, SAMPLE_RATE, CHANNELS)
+        reference.overlay_segment(intro, 0)
+        reference.overlay_segment(cleaned, content_start_ms)
+        reference.overlay_segment(outro, outro_start_ms)
+        reference.overlay(music_bed_cache.render_bed(
+            music.path, music.duration_ms, music.fade_in_ms, music.fade_out_ms, music.volume_db, SAMPLE_RATE, CHANNELS
+        ), music.position_ms)
+        reference.normalize()
+        expected = np.frombuffer(reference.into_segment(2).raw_data, dtype=np.int16).astype(np.float64)
+
+        output_path = tmp / "ffmpeg.wav"
+        ffmpeg_renderer.render_episode(
+            [streaming.EncodeTarget(output_path, "wav")], SAMPLE_RATE, CHANNELS, total_ms,
+            [(intro, 0), (outro, outro_start_ms)], [music],
+            content_path=content_path, content_cut_list=edits, content_start_ms=content_start_ms
+        )
+        rendered = AudioSegment.from_file(output_path, format="wav")
+        actual = np.frombuffer(rendered.raw_data, dtype=np.int16).astype(np.float64)
+
+    print(f"samples: pydub {len(expected)}, ffmpeg {len(actual)}")
+    length = min(len(expected), len(actual))
+    diff = expected[:length] - actual[:length]
+    snr_db = 10 * np.log10(np.sum(expected[:length] ** 2) / max(np.sum(diff ** 2), 1e-9))
+    print(f"max abs diff: {np.max(np.abs(diff)):.0f} LSB, rms diff: {np.sqrt(np.mean(diff ** 2)):.2f} LSB, snr: {snr_db:.1f}dB")
+    if len(expected) != len(actual) or snr_db < min_snr_db:
+        print(f"FAIL: renders differ (threshold {min_snr_db}dB)")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
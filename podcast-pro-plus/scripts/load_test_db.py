@@ -0,0 +1,199 @@
+"""
+Load test for the database layer.
+
+Seeds a throwaway SQLite database, then for a fixed time runs authenticated
+API clients polling the episode and podcast lists alongside writer threads
+that update episode statuses the way the Celery tasks do. Each database
+configuration runs in its own process (the engine is built at import):
+
+    legacy  the old settings: SQL echo on, rollback journal, 5s lock timeout
+    tuned   the current defaults: echo off, WAL, synchronous=NORMAL, busy timeout
+
+Pass a git revision to also run the project as it was then (old code and
+old settings), e.g. the commit before the async sessions were added.
+
+Reports API requests/sec and latency, failed requests, writer commits/sec,
+and writes that failed on a locked database or an exhausted connection pool.
+
+Run from the podcast-pro-plus directory:
+    python -m scripts.load_test_db [seconds] [clients] [writers] [git revision]
+"""
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+
+CONFIGURATIONS = {
+    "legacy": {"DATABASE_ECHO": "true", "DATABASE_SQLITE_WAL": "false", "DATABASE_SQLITE_BUSY_TIMEOUT_MS": "5000"},
+    "tuned": {},
+}
+EPISODES = 200
+WRITE_INTERVAL_S = 0.02
+
+
+def _seed(engine):
+    from datetime import datetime, timezone
+    from sqlmodel import Session
+    from api.models.user import User
+    from api.models.podcast import Episode, Podcast
+
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        # Requests authenticate with a token, so the password is never checked
+        user = User(email="load@example.com", hashed_password="-", created_at=now)
+        podcast = Podcast(name="Load Test Show", user_id=user.id)
+        session.add(user)
+        session.add(podcast)
+        episode_ids = []
+        for i in range(EPISODES):
+            episode = Episode(user_id=user.id, podcast_id=podcast.id, title=f"Episode {i}", processed_at=now)
+            session.add(episode)
+            episode_ids.append(episode.id)
+        session.commit()
+        return user.email, episode_ids
+
+
+def _writer(engine, episode_ids, stop, counts, lock):
+    from sqlalchemy.exc import OperationalError, TimeoutError
+    from sqlmodel import Session
+    from api.models.podcast import Episode
+
+    rng = random.Random(threading.get_ident())
+    while not stop.is_set():
+        try:
+            # One short session per update, like a task marking an episode processed or errored
+            with Session(engine) as session:
+                episode = session.get(Episode, rng.choice(episode_ids))
+                episode.status = rng.choice(["processing", "processed", "error"])
+                session.add(episode)
+                session.commit()
+            key = "commits"
+        except (OperationalError, TimeoutError):
+            # A locked database, or no free connection in the pool
+            key = "failed"
+        with lock:
+            counts[key] += 1
+        # Tasks update now and then rather than in a tight loop
+        stop.wait(WRITE_INTERVAL_S)
+
+
+async def _client(http, headers, stop, latencies, failures):
+    paths = ["/api/episodes/", "/api/podcasts/"]
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await http.get(paths[i % len(paths)], headers=headers)
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            failures.append(response.status_code)
+        i += 1
+        # A request that never touches the database completes without yielding to the event loop
+        await asyncio.sleep(0)
+
+
+async def _run(seconds: float, clients: int, writers: int) -> dict:
+    import logging
+    import httpx
+    from api.core import database
+    from api.main import app
+    from api.routers.auth import create_access_token
+
+    # httpx logs every request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    database.create_db_and_tables()
+    engine = database.engine
+    email, episode_ids = _seed(engine)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+    stop = threading.Event()
+    counts, lock = {"commits": 0, "failed": 0}, threading.Lock()
+    threads = [threading.Thread(target=_writer, args=(engine, episode_ids, stop, counts, lock)) for _ in range(writers)]
+    latencies, failures = [], []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://test") as http:
+        for thread in threads:
+            thread.start()
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(_client(http, headers, stop, latencies, failures)) for _ in range(clients)]
+        await asyncio.sleep(seconds)
+        stop.set()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+        for thread in threads:
+            thread.join()
+    if hasattr(database, "dispose_engines"):
+        await database.dispose_engines()
+
+    latencies.sort()
+    return {
+        "requests_per_s": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else None,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+        "failed_requests": len(failures),
+        "commits_per_s": counts["commits"] / elapsed,
+        "failed_writes": counts["failed"],
+    }
+
+
+def _child(result_path: str, seconds: float, clients: int, writers: int):
+    result = asyncio.run(_run(seconds, clients, writers))
+    Path(result_path).write_text(json.dumps(result))
+
+
+def _run_in_subprocess(source_dir: Path, overrides: Dict[str, str], seconds: float, clients: int, writers: int) -> dict:
+    with tempfile.TemporaryDirectory() as work_dir:
+        # The app serves media_uploads/ relative to the working directory
+        (Path(work_dir) / "media_uploads").mkdir()
+        result_path = Path(work_dir) / "result.json"
+        env = {
+            **os.environ, **overrides,
+            # Older trees ignore this and use database.db in the working directory
+            "DATABASE_URL": f"sqlite:///{Path(work_dir) / 'database.db'}",
+            "DATABASE_ASYNC_URL": "",
+            "PYTHONPATH": str(source_dir),
+        }
+        # Loaded by path so the api package comes from source_dir
+        code = (
+            f"import runpy; runpy.run_path({str(Path(__file__).resolve())!r})['_child']"
+            f"({str(result_path)!r}, {seconds}, {clients}, {writers})"
+        )
+        # SQL echo is logged, as it would be to a server's log; keep it off the report
+        child = subprocess.run([sys.executable, "-c", code], cwd=work_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if child.returncode != 0:
+            sys.exit(child.stderr[-4000:])
+        return json.loads(result_path.read_text())
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    writers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    before_rev = sys.argv[4] if len(sys.argv) > 4 else None
+    project_dir = Path(__file__).resolve().parent.parent
+
+    print(f"{seconds:.0f}s per run, {clients} API clients, {writers} status writers")
+    print(f"{'config':>8} {'req/s':>8} {'p50':>8} {'p95':>8} {'failed':>7} {'commits/s':>10} {'failed writes':>13}")
+    with tempfile.TemporaryDirectory() as before_dir:
+        runs = [(name, project_dir, overrides) for name, overrides in CONFIGURATIONS.items()]
+        if before_rev:
+            # The project as of before_rev, to compare against the code as well as the settings
+            archive = subprocess.run(["git", "archive", before_rev, "."], cwd=project_dir, check=True, capture_output=True).stdout
+            subprocess.run(["tar", "-x", "-C", before_dir], input=archive, check=True)
+            runs.insert(0, (before_rev[:8], Path(before_dir), {}))
+        for name, source_dir, overrides in runs:
+            r = _run_in_subprocess(source_dir, overrides, seconds, clients, writers)
+            print(
+                f"{name:>8} {r['requests_per_s']:>8.1f} {r['p50_ms'] or 0:>6.1f}ms {r['p95_ms'] or 0:>6.1f}ms"
+                f" {r['failed_requests']:>7} {r['commits_per_s']:>10.1f} {r['failed_writes']:>13}"
+            )
+
+
+if __name__ == "__main__":
+    main()
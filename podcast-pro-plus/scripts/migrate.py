@@ -0,0 +1,22 @@
+"""
+Brings the database at DATABASE_URL up to date: creates missing tables, then
+applies the schema migrations in api.core.migrations it hasn't had yet. Run it
+before starting a new release, so API and worker processes don't race to alter
+tables as they come up.
+
+Run from the podcast-pro-plus directory:
+    python -m scripts.migrate
+"""
+from api.core import database, migrations
+
+
+def main():
+    before = migrations.current_version(database.engine)
+    applied = database.create_db_and_tables()
+    for name in applied:
+        print(f"applied: {name}")
+    print(f"schema version {before} -> {migrations.current_version(database.engine)}")
+
+
+if __name__ == "__main__":
+    main()
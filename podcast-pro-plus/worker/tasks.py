@@ -2,6 +2,7 @@ from celery import Celery
 from dotenv import load_dotenv
 import os
 import logging
+import json
 from pathlib import Path
 import sys
 from typing import Optional
@@ -43,8 +44,8 @@ celery_app.conf.update(
     broker_connection_retry_on_startup=True,
 )
 
-@celery_app.task(name="create_podcast_episode")
-def create_podcast_episode(episode_id: str, template_id: str, main_content_filename: str, output_filename: str, tts_values: dict, episode_details: dict, user_id: str, podcast_id: str, spreaker_show_id: Optional[str] = None, spreaker_access_token: Optional[str] = None, auto_published_at: Optional[str] = None, elevenlabs_api_key: Optional[str] = None):
+@celery_app.task(name="create_podcast_episode", bind=True)
+def create_podcast_episode(self, episode_id: str, template_id: str, main_content_filename: str, output_filename: str, tts_values: dict, episode_details: dict, user_id: str, podcast_id: str, spreaker_show_id: Optional[str] = None, spreaker_access_token: Optional[str] = None, auto_published_at: Optional[str] = None, elevenlabs_api_key: Optional[str] = None):
     """
     Celery task to process and assemble a podcast episode.
     This task will run in the background and handle the entire audio processing workflow.
@@ -62,8 +63,9 @@ def create_podcast_episode(episode_id: str, template_id: str, main_content_filen
     # This requires a bit of setup to make sure the task has access to the database
     from api.core.database import get_session
     from api.core import crud
+    from api.core.config import settings
     from api.models.podcast import Episode
-    from api.services import audio_processor
+    from api.services import audio_processor, rate_limiter
 
     db = next(get_session())
     
@@ -85,7 +87,7 @@ def create_podcast_episode(episode_id: str, template_id: str, main_content_filen
         logging.info(f"Updating existing episode record with ID: {episode.id}")
 
         # Call the audio processing function
-        final_path, log = audio_processor.process_and_assemble_episode(
+        final_path, log, outputs = audio_processor.process_and_assemble_episode(
             template=template,
             main_content_filename=main_content_filename,
             output_filename=output_filename,
@@ -97,6 +99,7 @@ def create_podcast_episode(episode_id: str, template_id: str, main_content_filen
         # Update the episode status to "processed"
         episode.status = "processed"
         episode.final_audio_path = str(final_path)
+        episode.audio_outputs_json = json.dumps(outputs)
         episode.cover_path = episode_details.get('cover_image_path') # Update cover path
         db.add(episode)
         db.commit()
@@ -106,6 +109,19 @@ def create_podcast_episode(episode_id: str, template_id: str, main_content_filen
 
         return {"message": "Episode assembled successfully!", "episode_id": episode.id, "log": log}
 
+    except rate_limiter.RateLimitedError as e:
+        # Throttled by a provider: give the worker slot back and try again later instead of sleeping in it.
+        # Anything already transcribed or synthesized is cached, so the retry picks up where this left off.
+        if self.request.retries < settings.RATE_LIMIT_MAX_REQUEUES:
+            countdown = rate_limiter.retry_countdown(e.retry_after_s, self.request.retries)
+            logging.warning(f"Rate limited while assembling {output_filename}: {e}. Requeuing in {countdown:.0f}s.")
+            raise self.retry(exc=e, countdown=countdown, max_retries=settings.RATE_LIMIT_MAX_REQUEUES)
+        logging.error(f"Giving up on {output_filename} after {self.request.retries} rate-limited attempts: {e}")
+        if 'episode' in locals() and episode.id:
+            episode.status = "error"
+            db.add(episode)
+            db.commit()
+        raise
     except Exception as e:
         logging.error(f"Error during episode assembly for {output_filename}: {e}", exc_info=True)
         # Update the episode status to "error"